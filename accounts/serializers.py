@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
+from config.values import Computed
 from .models import User, UserProfile
 
 
@@ -102,6 +103,14 @@ class UserPublicSerializer(serializers.ModelSerializer):
             "identity_verified",
         ]
 
+    # get_full_name for the values read path
+    values_fields = {
+        "full_name": Computed(
+            ["first_name", "last_name", "username"],
+            lambda first, last, username: f"{first} {last}".strip() or username,
+        ),
+    }
+
     def get_full_name(self, obj):
         return f"{obj.first_name} {obj.last_name}".strip() or obj.username
 
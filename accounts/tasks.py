@@ -0,0 +1,24 @@
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from PIL import Image, UnidentifiedImageError
+
+User = get_user_model()
+
+
+@shared_task
+def validate_profile_photo(user_id, name):
+    """Clear a directly uploaded profile photo that isn't an image"""
+    user = User.objects.filter(pk=user_id, profile_photo=name).first()
+    if user is None:
+        return None
+
+    try:
+        with user.profile_photo.open("rb") as photo:
+            Image.open(photo).verify()
+    except UnidentifiedImageError:
+        user.profile_photo.storage.delete(name)
+        User.objects.filter(pk=user_id, profile_photo=name).update(profile_photo=None)
+        return False
+    except OSError:
+        return None
+    return True
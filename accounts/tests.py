@@ -1,7 +1,12 @@
+import shutil
+import tempfile
+from io import BytesIO
 from django.test import TestCase
+from django.test.utils import override_settings
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
+from PIL import Image
 
 User = get_user_model()
 
@@ -48,3 +53,57 @@ class UserRegistrationTest(TestCase):
         response = self.client.post("/api/auth/register/", data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertIn("tokens", response.data)
+
+
+class ProfilePhotoUploadTest(TestCase):
+    """Test ticketed direct uploads of profile photos"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass123",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content):
+        response = self.client.post(
+            "/api/users/profile/photo/upload-ticket/",
+            {"content_type": "image/png"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        ticket = response.data
+        response = APIClient().put(
+            ticket["upload"]["url"], content, content_type="image/png"
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                "/api/users/profile/photo/finalize/",
+                {"token": ticket["token"]},
+                format="json",
+            )
+
+    def test_profile_photo_upload(self):
+        """A valid image becomes the profile photo"""
+        buffer = BytesIO()
+        Image.new("RGB", (64, 64), "navy").save(buffer, "PNG")
+        response = self.upload(buffer.getvalue())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.profile_photo.name.startswith("profiles/"))
+
+    def test_invalid_profile_photo_is_cleared(self):
+        """A file that isn't an image is removed by the validation task"""
+        response = self.upload(b"not a png")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.profile_photo)
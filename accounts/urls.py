@@ -7,6 +7,8 @@ from rest_framework_simplejwt.views import (
 from .views import (
     UserRegistrationView,
     UserProfileView,
+    ProfilePhotoUploadTicketView,
+    ProfilePhotoFinalizeView,
     UserPublicProfileView,
     EmailVerificationView,
     PasswordResetView,
@@ -27,6 +29,16 @@ urlpatterns = [
     ),
     # User profile endpoints
     path("profile/", UserProfileView.as_view(), name="profile"),
+    path(
+        "profile/photo/upload-ticket/",
+        ProfilePhotoUploadTicketView.as_view(),
+        name="profile-photo-upload-ticket",
+    ),
+    path(
+        "profile/photo/finalize/",
+        ProfilePhotoFinalizeView.as_view(),
+        name="profile-photo-finalize",
+    ),
     path("<int:id>/", UserPublicProfileView.as_view(), name="user-detail"),
     path("verify-email/", EmailVerificationView.as_view(), name="verify-email"),
 ]
@@ -4,7 +4,15 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.shortcuts import get_object_or_404
+from config.uploads import (
+    FinalizeUploadSerializer,
+    UploadTicketError,
+    UploadTicketSerializer,
+    claim_upload,
+    issue_upload_ticket,
+)
 from .models import UserProfile
 from .serializers import (
     UserRegistrationSerializer,
@@ -15,6 +23,7 @@ from .serializers import (
     PasswordResetConfirmSerializer,
 )
 from .permissions import IsOwner
+from .tasks import validate_profile_photo
 
 User = get_user_model()
 
@@ -57,6 +66,47 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
         return self.request.user
 
 
+class ProfilePhotoUploadTicketView(generics.GenericAPIView):
+    """Issue a signed ticket to upload a profile photo straight to storage"""
+
+    serializer_class = UploadTicketSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ticket = issue_upload_ticket(
+            request.user,
+            "profile-photo",
+            User._meta.get_field("profile_photo").upload_to,
+            serializer.validated_data["content_type"],
+        )
+        return Response(ticket, status=status.HTTP_201_CREATED)
+
+
+class ProfilePhotoFinalizeView(generics.GenericAPIView):
+    """Set a ticket-uploaded file as the profile photo; it is checked async"""
+
+    serializer_class = FinalizeUploadSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            name = claim_upload(
+                serializer.validated_data["token"], request.user, "profile-photo"
+            )
+        except UploadTicketError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = request.user
+        user.profile_photo = name
+        user.save(update_fields=["profile_photo", "updated_at"])
+        transaction.on_commit(lambda: validate_profile_photo.delay(user.pk, name))
+        return Response(UserSerializer(user).data)
+
+
 class UserPublicProfileView(generics.RetrieveAPIView):
     """View for getting public user profile"""
 
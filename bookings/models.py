@@ -2,8 +2,15 @@ from django.db import models
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 from datetime import timedelta
+from decimal import Decimal
 from accounts.models import User
 from properties.models import Property
+from properties.availability import refresh_availability_index
+from properties.pricing import quote_stay, to_money
+
+
+# Share of the total refunded by the partial-refund cancellation tiers
+HALF_REFUND = Decimal("0.5")
 
 
 class Booking(models.Model):
@@ -118,30 +125,35 @@ class Booking(models.Model):
                     )
 
     def save(self, *args, **kwargs):
-        """Override save to validate and calculate price"""
-        self.full_clean()
-        if not self.pk or self._state.adding:
-            # Calculate price on creation
+        """Override save to calculate price and validate"""
+        if self._state.adding:
+            # Price the stay first: validation requires the price fields
             self.calculate_price()
             # Set cancellation policy from property
             if not self.cancellation_policy:
                 self.cancellation_policy = self.property_obj.cancellation_policy
+        self.full_clean()
         super().save(*args, **kwargs)
+        refresh_availability_index(self.property_obj_id)
 
-    def calculate_price(self):
-        """Calculate total booking price"""
-        from datetime import timedelta
+    def delete(self, *args, **kwargs):
+        """Release the booked nights in the availability index"""
+        property_id = self.property_obj_id
+        result = super().delete(*args, **kwargs)
+        refresh_availability_index(property_id)
+        return result
 
-        nights = (self.check_out - self.check_in).days
-        self.base_price = self.property_obj.base_price * nights
-        self.cleaning_fee = self.property_obj.cleaning_fee
-        self.service_fee = self.property_obj.service_fee
+    def calculate_price(self):
+        """Price the stay night by night and return the itemised quote"""
+        quote = quote_stay(self.property_obj, self.check_in, self.check_out)
+        self.base_price = quote.base_price
+        self.cleaning_fee = quote.cleaning_fee
+        self.service_fee = quote.service_fee
         # Security deposit is typically a percentage of base price
         if not self.security_deposit:
-            self.security_deposit = self.base_price * 0.1  # 10% default
-        self.total_price = (
-            self.base_price + self.cleaning_fee + self.service_fee
-        )
+            self.security_deposit = quote.security_deposit
+        self.total_price = quote.total_price
+        return quote
 
     def calculate_refund(self):
         """Calculate refund based on cancellation policy"""
@@ -155,7 +167,7 @@ class Booking(models.Model):
             if days_until_checkin > 1:
                 return self.total_price
             # 50% refund if cancelled 1 day or less before check-in
-            return self.total_price * 0.5
+            return to_money(self.total_price * HALF_REFUND)
 
         elif self.cancellation_policy == Property.CancellationPolicy.MODERATE:
             # Full refund if cancelled more than 5 days before check-in
@@ -163,14 +175,14 @@ class Booking(models.Model):
                 return self.total_price
             # 50% refund if cancelled 1-5 days before check-in
             elif days_until_checkin > 1:
-                return self.total_price * 0.5
+                return to_money(self.total_price * HALF_REFUND)
             # No refund if cancelled less than 1 day before check-in
             return 0
 
         elif self.cancellation_policy == Property.CancellationPolicy.STRICT:
             # 50% refund if cancelled more than 7 days before check-in
             if days_until_checkin > 7:
-                return self.total_price * 0.5
+                return to_money(self.total_price * HALF_REFUND)
             # No refund otherwise
             return 0
 
@@ -1,10 +1,13 @@
 from rest_framework import serializers
+from django.utils import timezone
+from config.serializers import ExpandableFieldsMixin
+from config.values import Computed
 from accounts.serializers import UserPublicSerializer
 from properties.serializers import PropertyListSerializer
 from .models import Booking
 
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     """Serializer for booking list/detail"""
 
     property_obj = PropertyListSerializer(read_only=True)
@@ -55,6 +58,26 @@ class BookingSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
 
+    # Booking's computed properties, for the values read path
+    values_fields = {
+        "nights": Computed(
+            ["check_in", "check_out"],
+            lambda check_in, check_out: (check_out - check_in).days,
+        ),
+        "is_past": Computed(
+            ["check_out"], lambda check_out: check_out < timezone.now().date()
+        ),
+        "is_upcoming": Computed(
+            ["check_in"], lambda check_in: check_in > timezone.now().date()
+        ),
+        "is_current": Computed(
+            ["check_in", "check_out"],
+            lambda check_in, check_out: (
+                check_in <= timezone.now().date() <= check_out
+            ),
+        ),
+    }
+
 
 class BookingCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating a booking"""
@@ -118,12 +141,26 @@ class BookingCreateSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data["guest"] = self.context["request"].user
+        # Booking.save prices the stay before validating it
         booking = Booking(**validated_data)
-        booking.calculate_price()
         booking.save()
         return booking
 
 
+def stay_error(property_obj, check_in, check_out):
+    """Why a stay can't be priced for this property, or None"""
+    if check_out <= check_in:
+        return "Check-out date must be after check-in date."
+
+    nights = (check_out - check_in).days
+    if nights < property_obj.min_stay:
+        return f"Minimum stay is {property_obj.min_stay} nights."
+
+    if nights > property_obj.max_stay:
+        return f"Maximum stay is {property_obj.max_stay} nights."
+    return None
+
+
 class PriceCalculationSerializer(serializers.Serializer):
     """Serializer for price calculation"""
 
@@ -135,25 +172,67 @@ class PriceCalculationSerializer(serializers.Serializer):
     def validate(self, attrs):
         from properties.models import Property
 
-        property_obj = Property.objects.get(id=attrs["property_id"])
-        check_in = attrs["check_in"]
-        check_out = attrs["check_out"]
+        try:
+            property_obj = Property.objects.get(id=attrs["property_id"])
+        except Property.DoesNotExist:
+            raise serializers.ValidationError({"property_id": "Property not found."})
 
-        if check_out <= check_in:
-            raise serializers.ValidationError(
-                "Check-out date must be after check-in date."
-            )
+        error = stay_error(property_obj, attrs["check_in"], attrs["check_out"])
+        if error:
+            raise serializers.ValidationError(error)
 
-        nights = (check_out - check_in).days
-        if nights < property_obj.min_stay:
-            raise serializers.ValidationError(
-                f"Minimum stay is {property_obj.min_stay} nights."
-            )
+        attrs["property"] = property_obj
+        return attrs
 
-        if nights > property_obj.max_stay:
+
+# Largest number of stays one batch quote request may price
+MAX_BATCH_QUOTES = 100
+
+
+class StaySerializer(serializers.Serializer):
+    """One (property, dates) pair in a batch quote"""
+
+    property_id = serializers.IntegerField()
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+
+
+class BatchPriceCalculationSerializer(serializers.Serializer):
+    """Serializer for batch price calculation.
+
+    Send ``property_ids`` with one ``check_in``/``check_out``, or a list of
+    ``stays`` with their own dates.
+    """
+
+    property_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        max_length=MAX_BATCH_QUOTES,
+    )
+    check_in = serializers.DateField(required=False)
+    check_out = serializers.DateField(required=False)
+    stays = StaySerializer(many=True, required=False, max_length=MAX_BATCH_QUOTES)
+
+    def validate(self, attrs):
+        if "stays" in attrs:
+            if "property_ids" in attrs:
+                raise serializers.ValidationError(
+                    "Send either property_ids or stays, not both."
+                )
+            return attrs
+
+        if "property_ids" not in attrs:
+            raise serializers.ValidationError("Send property_ids or stays.")
+        if "check_in" not in attrs or "check_out" not in attrs:
             raise serializers.ValidationError(
-                f"Maximum stay is {property_obj.max_stay} nights."
+                "check_in and check_out are required with property_ids."
             )
-
+        attrs["stays"] = [
+            {
+                "property_id": property_id,
+                "check_in": attrs["check_in"],
+                "check_out": attrs["check_out"],
+            }
+            for property_id in attrs["property_ids"]
+        ]
         return attrs
-
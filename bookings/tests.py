@@ -1,7 +1,11 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.test import APIClient
 from datetime import date, timedelta
-from properties.models import Property
+from decimal import Decimal
+from properties.models import Availability, Property
+from properties.pricing import quote_stay
 from .models import Booking
 
 User = get_user_model()
@@ -66,3 +70,289 @@ class BookingModelTest(TestCase):
         )
         # Base price should be 100 * 3 nights = 300
         self.assertEqual(booking.base_price, 300.00)
+
+
+class BookingFieldsTest(TestCase):
+    """Test ?fields= and ?expand= on the booking list"""
+
+    def setUp(self):
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        self.guest = User.objects.create_user(
+            username="guest",
+            email="guest@example.com",
+            password="testpass123",
+            role=User.Role.GUEST,
+        )
+        self.property = Property.objects.create(
+            title="Test Property",
+            description="Test Description",
+            property_type=Property.PropertyType.APARTMENT,
+            host=self.host,
+            address="123 Test St",
+            city="Test City",
+            country="Test Country",
+            latitude=6.5244,
+            longitude=3.3792,
+            base_price=100.00,
+            max_guests=4,
+            bedrooms=2,
+            beds=2,
+            bathrooms=1.0,
+        )
+        for week in range(1, 4):
+            check_in = date.today() + timedelta(weeks=week)
+            Booking.objects.create(
+                property_obj=self.property,
+                guest=self.guest,
+                check_in=check_in,
+                check_out=check_in + timedelta(days=2),
+                guest_count=2,
+                base_price=200.00,
+                total_price=200.00,
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.guest)
+
+    def test_sparse_fields(self):
+        """Only the requested fields are rendered, without joins"""
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/bookings/", {"fields": "id,status"})
+        for booking in response.data["results"]:
+            self.assertEqual(set(booking), {"id", "status"})
+
+        response = self.client.get(
+            "/api/bookings/", {"fields": "id,property_obj.title,property_obj.host"}
+        )
+        booking = response.data["results"][0]
+        self.assertEqual(set(booking), {"id", "property_obj"})
+        self.assertEqual(set(booking["property_obj"]), {"title", "host"})
+        self.assertEqual(booking["property_obj"]["host"]["username"], "host")
+
+    def test_expand(self):
+        """Relations that aren't expanded render as primary keys"""
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/bookings/", {"expand": ""})
+        booking = response.data["results"][0]
+        self.assertEqual(booking["property_obj"], self.property.pk)
+        self.assertEqual(booking["guest"], self.guest.pk)
+
+        response = self.client.get("/api/bookings/", {"expand": "property_obj"})
+        booking = response.data["results"][0]
+        self.assertEqual(booking["guest"], self.guest.pk)
+        self.assertEqual(booking["property_obj"]["title"], "Test Property")
+        self.assertEqual(booking["property_obj"]["host"], self.host.pk)
+
+
+class PricingEngineTest(TestCase):
+    """Test per-night pricing with host price overrides"""
+
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        self.guest = User.objects.create_user(
+            username="guest",
+            email="guest@example.com",
+            password="testpass123",
+            role=User.Role.GUEST,
+        )
+        self.property = Property.objects.create(
+            title="Test Property",
+            description="Test Description",
+            property_type=Property.PropertyType.APARTMENT,
+            host=self.host,
+            address="123 Test St",
+            city="Test City",
+            country="Test Country",
+            latitude=6.5244,
+            longitude=3.3792,
+            base_price=100.10,
+            cleaning_fee=20.00,
+            service_fee=15.55,
+            max_guests=4,
+            bedrooms=2,
+            beds=2,
+            bathrooms=1.0,
+        )
+        self.check_in = date.today() + timedelta(days=7)
+        self.check_out = self.check_in + timedelta(days=3)
+        # Weekend rate on the second night
+        Availability.objects.create(
+            property=self.property,
+            date=self.check_in + timedelta(days=1),
+            price_override=150.25,
+        )
+
+    def test_quote_itemises_nights(self):
+        """Overrides replace the base rate and sums stay exact"""
+        with self.assertNumQueries(1):
+            quote = quote_stay(self.property, self.check_in, self.check_out)
+        self.assertEqual(
+            [night["price"] for night in quote.nightly],
+            [Decimal("100.10"), Decimal("150.25"), Decimal("100.10")],
+        )
+        self.assertEqual(
+            [night["is_override"] for night in quote.nightly], [False, True, False]
+        )
+        self.assertEqual(quote.base_price, Decimal("350.45"))
+        self.assertEqual(quote.security_deposit, Decimal("35.05"))
+        self.assertEqual(quote.total_price, Decimal("386.00"))
+
+    def test_booking_and_price_view_use_quote(self):
+        """Bookings and the price calculator agree on the total"""
+        booking = Booking.objects.create(
+            property_obj=self.property,
+            guest=self.guest,
+            check_in=self.check_in,
+            check_out=self.check_out,
+            guest_count=2,
+        )
+        self.assertEqual(booking.total_price, Decimal("386.00"))
+
+        client = APIClient()
+        client.force_authenticate(self.guest)
+        response = client.post(
+            "/api/bookings/calculate-price/",
+            {
+                "property_id": self.property.pk,
+                "check_in": self.check_in + timedelta(days=7),
+                "check_out": self.check_out + timedelta(days=7),
+                "guest_count": 2,
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["total_price"], "335.85")
+        self.assertEqual(len(response.data["nightly"]), 3)
+
+    def test_search_stay_price_matches_quote(self):
+        """Date searches annotate the same nightly total"""
+        for offset in range(3):
+            Availability.objects.update_or_create(
+                property=self.property,
+                date=self.check_in + timedelta(days=offset),
+                defaults={"is_available": True},
+            )
+        Property.objects.filter(pk=self.property.pk).update(status="active")
+        response = self.client.get(
+            "/api/properties/",
+            {"check_in": self.check_in, "check_out": self.check_out},
+        )
+        self.assertEqual(response.data["results"][0]["stay_price"], "350.45")
+
+
+class BatchPriceCalculationTest(TestCase):
+    """Test quoting many stays in one request"""
+
+    def setUp(self):
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        self.guest = User.objects.create_user(
+            username="guest",
+            email="guest@example.com",
+            password="testpass123",
+            role=User.Role.GUEST,
+        )
+        self.properties = [
+            Property.objects.create(
+                title=f"Property {i}",
+                description="Test Description",
+                host=self.host,
+                address="123 Test St",
+                city="Test City",
+                country="Test Country",
+                latitude=6.5244,
+                longitude=3.3792,
+                base_price=100 + i,
+                max_guests=4,
+                bedrooms=2,
+                beds=2,
+                bathrooms=1.0,
+                min_stay=2,
+            )
+            for i in range(5)
+        ]
+        self.check_in = date.today() + timedelta(days=14)
+        self.check_out = self.check_in + timedelta(days=2)
+        for property_obj in self.properties:
+            Availability.objects.create(
+                property=property_obj, date=self.check_in, price_override=200
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.guest)
+
+    def test_shared_dates_in_constant_queries(self):
+        """Every property is quoted from one property and one override query"""
+        ids = [property_obj.pk for property_obj in self.properties]
+        with self.assertNumQueries(2):
+            response = self.client.post(
+                "/api/bookings/calculate-price/batch/",
+                {
+                    "property_ids": ids,
+                    "check_in": self.check_in,
+                    "check_out": self.check_out,
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        quotes = response.data["quotes"]
+        self.assertEqual([quote["property_id"] for quote in quotes], ids)
+        self.assertEqual(
+            [quote["base_price"] for quote in quotes],
+            [f"{300 + i}.00" for i in range(5)],
+        )
+
+    def test_stays_report_errors_per_item(self):
+        """Invalid stays get an error without failing the batch"""
+        response = self.client.post(
+            "/api/bookings/calculate-price/batch/",
+            {
+                "stays": [
+                    {
+                        "property_id": self.properties[0].pk,
+                        "check_in": self.check_in,
+                        "check_out": self.check_out,
+                    },
+                    {
+                        "property_id": self.properties[1].pk,
+                        "check_in": self.check_in,
+                        "check_out": self.check_in + timedelta(days=1),
+                    },
+                    {
+                        "property_id": 0,
+                        "check_in": self.check_in,
+                        "check_out": self.check_out,
+                    },
+                ]
+            },
+            format="json",
+        )
+        quotes = response.data["quotes"]
+        self.assertEqual(quotes[0]["total_price"], "300.00")
+        self.assertEqual(quotes[1]["error"], "Minimum stay is 2 nights.")
+        self.assertEqual(quotes[2]["error"], "Property not found.")
+
+    def test_batch_size_is_capped(self):
+        """More than MAX_BATCH_QUOTES stays is rejected"""
+        response = self.client.post(
+            "/api/bookings/calculate-price/batch/",
+            {
+                "property_ids": list(range(1, 102)),
+                "check_in": self.check_in,
+                "check_out": self.check_out,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
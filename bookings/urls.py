@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import BookingViewSet, PriceCalculationView
+from .views import BookingViewSet, PriceCalculationView, BatchPriceCalculationView
 
 router = DefaultRouter()
 router.register(r"", BookingViewSet, basename="booking")
@@ -8,8 +8,14 @@ router.register(r"", BookingViewSet, basename="booking")
 app_name = "bookings"
 
 urlpatterns = [
-    path("", include(router.urls)),
+    # Before the router, whose detail route would otherwise match it
     path("calculate-price/", PriceCalculationView.as_view(), name="calculate-price"),
+    path(
+        "calculate-price/batch/",
+        BatchPriceCalculationView.as_view(),
+        name="calculate-price-batch",
+    ),
+    path("", include(router.urls)),
 ]
 
 
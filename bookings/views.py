@@ -3,21 +3,31 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
+from config.pagination import OptionalCursorPagination
+from config.serializers import select_related_for
+from config.values import ValuesListMixin
 from accounts.permissions import IsHost, IsOwner
-from properties.models import Property
+from properties.pricing import (
+    load_priced_properties,
+    price_overrides_for_stays,
+    quote_stay,
+)
 from .models import Booking
 from .serializers import (
     BookingSerializer,
     BookingCreateSerializer,
     PriceCalculationSerializer,
+    BatchPriceCalculationSerializer,
+    stay_error,
 )
 
 
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(ValuesListMixin, viewsets.ModelViewSet):
     """ViewSet for booking operations"""
 
     serializer_class = BookingSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalCursorPagination
 
     def get_queryset(self):
         """Filter bookings based on user role"""
@@ -26,14 +36,19 @@ class BookingViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if user.is_host:
             # Hosts see bookings for their properties
-            return Booking.objects.filter(property__host=user).select_related(
-                "property", "guest"
-            )
+            queryset = Booking.objects.filter(property_obj__host=user)
         else:
             # Guests see their own bookings
-            return Booking.objects.filter(guest=user).select_related(
-                "property", "guest"
-            )
+            queryset = Booking.objects.filter(guest=user)
+        # Join only what the requested ?fields=/?expand= shape renders
+        return select_related_for(
+            queryset,
+            BookingSerializer,
+            self.request,
+            "property_obj__host",
+            "property_obj__primary_photo",
+            "guest",
+        )
 
     def get_serializer_class(self):
         if self.action == "create":
@@ -128,30 +143,56 @@ class PriceCalculationView(generics.GenericAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        property_obj = Property.objects.get(
-            id=serializer.validated_data["property_id"]
+        quote = quote_stay(
+            serializer.validated_data["property"],
+            serializer.validated_data["check_in"],
+            serializer.validated_data["check_out"],
         )
-        check_in = serializer.validated_data["check_in"]
-        check_out = serializer.validated_data["check_out"]
-        guest_count = serializer.validated_data["guest_count"]
-
-        # Create temporary booking to calculate price
-        temp_booking = Booking(
-            property=property_obj,
-            guest=request.user,
-            check_in=check_in,
-            check_out=check_out,
-            guest_count=guest_count,
-        )
-        temp_booking.calculate_price()
-
-        return Response(
-            {
-                "base_price": str(temp_booking.base_price),
-                "cleaning_fee": str(temp_booking.cleaning_fee),
-                "service_fee": str(temp_booking.service_fee),
-                "security_deposit": str(temp_booking.security_deposit),
-                "total_price": str(temp_booking.total_price),
-                "nights": temp_booking.nights,
+        return Response(quote.as_dict())
+
+
+class BatchPriceCalculationView(generics.GenericAPIView):
+    """View for pricing many stays at once, e.g. a page of search results"""
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = BatchPriceCalculationSerializer
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        stays = serializer.validated_data["stays"]
+
+        # Two queries however many stays: the properties, then the overrides
+        properties = load_priced_properties(stay["property_id"] for stay in stays)
+        priceable = [
+            (stay["property_id"], stay["check_in"], stay["check_out"])
+            for stay in stays
+            if stay["property_id"] in properties
+        ]
+        overrides = price_overrides_for_stays(priceable)
+
+        quotes = []
+        for stay in stays:
+            item = {
+                "property_id": stay["property_id"],
+                "check_in": stay["check_in"].isoformat(),
+                "check_out": stay["check_out"].isoformat(),
             }
-        )
+            property_obj = properties.get(stay["property_id"])
+            error = (
+                "Property not found."
+                if property_obj is None
+                else stay_error(property_obj, stay["check_in"], stay["check_out"])
+            )
+            if error:
+                item["error"] = error
+            else:
+                quote = quote_stay(
+                    property_obj,
+                    stay["check_in"],
+                    stay["check_out"],
+                    overrides=overrides.get(property_obj.pk, {}),
+                )
+                item.update(quote.as_dict())
+            quotes.append(item)
+        return Response({"quotes": quotes})
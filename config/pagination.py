@@ -0,0 +1,59 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """Cursor pagination over the newest-first (created_at, id) ordering"""
+
+    ordering = ("-created_at", "-id")
+
+
+class OptionalCursorPagination(PageNumberPagination):
+    """Page-number pagination, or cursor pagination when the client opts in.
+
+    Clients send ``?pagination=cursor`` on the first request and then follow
+    the ``next``/``previous`` links, which carry a ``cursor`` parameter.
+    Cursor pages skip the COUNT(*) and OFFSET of page-number pagination, so
+    deep pages cost the same as the first one.
+    """
+
+    mode_query_param = "pagination"
+    cursor_pagination_class = CreatedAtCursorPagination
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == "cursor"
+            or self.cursor_pagination_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        cursor_query_param = self.cursor_pagination_class.cursor_query_param
+        cursor_parameters = [
+            parameter
+            for parameter in self.cursor_pagination_class().get_schema_operation_parameters(view)
+            if parameter["name"] == cursor_query_param
+        ]
+        return [
+            *super().get_schema_operation_parameters(view),
+            *cursor_parameters,
+            {
+                "name": self.mode_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Set to 'cursor' to use cursor pagination.",
+                "schema": {"type": "string", "enum": ["cursor"]},
+            },
+        ]
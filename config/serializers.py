@@ -0,0 +1,119 @@
+from rest_framework import serializers
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+
+def parse_field_tree(value):
+    """Parse ``id,property_obj.title`` into ``{"id": {}, "property_obj": {"title": {}}}``"""
+    tree = {}
+    for path in value.split(","):
+        node = tree
+        for name in path.split("."):
+            name = name.strip()
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+
+def requested_shape(request):
+    """The (fields, expand) trees asked for by ?fields= and ?expand=.
+
+    None means unrestricted: every field, or every nested serializer
+    expanded. An empty ?expand= collapses all nested serializers.
+    """
+    if request is None:
+        return None, None
+    params = request.query_params
+    fields = params.get(FIELDS_PARAM)
+    expand = params.get(EXPAND_PARAM)
+    return (
+        parse_field_tree(fields) if fields else None,
+        parse_field_tree(expand) if expand is not None else None,
+    )
+
+
+def _child_shape(name, fields, expand):
+    return (
+        (fields.get(name) or None) if fields is not None else None,
+        expand.get(name) if expand is not None else None,
+    )
+
+
+def _nested_serializer(field):
+    nested = getattr(field, "child", field)
+    return nested if isinstance(nested, serializers.BaseSerializer) else None
+
+
+class ExpandableFieldsMixin:
+    """Serializer mixin for ?fields= sparse fieldsets and ?expand= control.
+
+    ``?fields=id,status,property_obj.title`` limits the rendered fields, with
+    dotted names reaching into nested serializers. Without ``?expand=`` nested
+    serializers render in full as before; with it only the listed relations
+    (``?expand=booking,booking.property_obj``) are expanded and the others
+    render as primary keys.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Only the root serializer sees the request; nested ones are shaped
+        # by their parent in get_fields
+        self.shape = requested_shape(self.context.get("request"))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        only, expand = self.shape
+        if only is not None:
+            fields = {name: field for name, field in fields.items() if name in only}
+
+        for name, field in list(fields.items()):
+            nested = _nested_serializer(field)
+            if nested is None:
+                continue
+            if expand is not None and name not in expand:
+                fields[name] = self.collapsed_field(name, field)
+            elif isinstance(nested, ExpandableFieldsMixin):
+                nested.shape = _child_shape(name, only, expand)
+        return fields
+
+    def collapsed_field(self, name, field):
+        """Primary key(s) in place of a nested serializer that wasn't expanded"""
+        source = field.source or name
+        model_field = self.Meta.model._meta.get_field(source)
+        if model_field.many_to_one or model_field.one_to_one:
+            # Read the FK column so the related row is never loaded
+            return serializers.ReadOnlyField(source=model_field.attname)
+        kwargs = {"source": source} if source != name else {}
+        return serializers.PrimaryKeyRelatedField(many=True, read_only=True, **kwargs)
+
+
+def _renders(serializer, names, only, expand):
+    name = names[0]
+    field = serializer.fields.get(name)
+    if field is None:
+        # Relations the serializer doesn't render may be used elsewhere
+        return True
+    if only is not None and name not in only:
+        return False
+    nested = _nested_serializer(field)
+    if nested is None:
+        # Method fields read the related row themselves
+        return True
+    if expand is not None and name not in expand:
+        return False
+    if len(names) == 1:
+        return True
+    return _renders(nested, names[1:], *_child_shape(name, only, expand))
+
+
+def select_related_for(queryset, serializer_class, request, *paths):
+    """select_related only the paths the requested serializer shape renders"""
+    only, expand = requested_shape(request)
+    serializer = serializer_class()
+    paths = [
+        path for path in paths if _renders(serializer, path.split("__"), only, expand)
+    ]
+    if not paths:
+        return queryset
+    return queryset.select_related(*paths)
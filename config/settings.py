@@ -12,8 +12,10 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 from datetime import timedelta
+from celery.schedules import crontab
 from dotenv import load_dotenv
 import os
+import sys
 
 load_dotenv()
 
@@ -43,6 +45,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 ]
 
 # Add GeoDjango only if enabled (requires GDAL to be installed)
@@ -169,6 +172,24 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Media goes to Cloudinary when it is configured (as in production), and to
+# MEDIA_ROOT otherwise, including under tests
+CLOUDINARY_MEDIA = (
+    bool(os.environ.get("CLOUDINARY_CLOUD_NAME")) and sys.argv[1:2] != ["test"]
+)
+STORAGES = {
+    "default": {
+        "BACKEND": (
+            "cloudinary_storage.storage.MediaCloudinaryStorage"
+            if CLOUDINARY_MEDIA
+            else "django.core.files.storage.FileSystemStorage"
+        ),
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -195,6 +216,45 @@ REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
+# Property search
+PROPERTY_FACETS_CACHE_TIMEOUT = 60  # seconds
+PROPERTY_RESPONSE_CACHE_TIMEOUT = 300  # seconds
+PROPERTY_HTTP_CACHE_MAX_AGE = 60  # seconds, Cache-Control max-age for detail reads
+MAP_PIN_ZOOM = 14  # map zoom from which viewports return pins instead of clusters
+MAP_MAX_PINS = 500  # above this many pins a viewport falls back to clusters
+SIMILAR_PROPERTIES_COUNT = 10  # neighbours stored per property by the nightly job
+SIMILAR_PROPERTIES_BLOCK_SIZE = 512  # rows compared per matrix product
+# Weights of the ?ordering=relevance components; rating, price and freshness
+# are precomputed into Property.quality_score by a periodic job
+PROPERTY_RELEVANCE_WEIGHTS = {
+    "text": 2.0,
+    "distance": 1.0,
+    "rating": 1.0,
+    "price": 0.5,
+    "freshness": 0.5,
+}
+
+# Property photos
+PROPERTY_PHOTO_UPLOAD_WORKERS = 4  # threads per batch upload request
+
+# Direct uploads: clients send files straight to storage with a signed ticket
+DIRECT_UPLOAD_BACKEND = os.environ.get(
+    "DIRECT_UPLOAD_BACKEND",
+    (
+        "config.uploads.CloudinaryDirectUploadBackend"
+        if CLOUDINARY_MEDIA
+        else "config.uploads.LocalDirectUploadBackend"
+    ),
+)
+DIRECT_UPLOAD_TICKET_TTL = 15 * 60  # seconds
+DIRECT_UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+
+# Calendar sync
+CALENDAR_FEED_TIMEOUT = 10  # seconds per iCal feed request
+CALENDAR_FEED_MAX_BYTES = 2 * 1024 * 1024
+# Only for development and tests, where feeds are served locally
+CALENDAR_FEED_ALLOW_PRIVATE_ADDRESSES = False
+
 # Simple JWT
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
@@ -226,8 +286,6 @@ CLOUDINARY_STORAGE = {
     "API_SECRET": os.environ.get("CLOUDINARY_API_SECRET", ""),
 }
 
-DEFAULT_FILE_STORAGE = "cloudinary_storage.storage.MediaCloudinaryStorage"
-
 # Paystack Settings
 PAYSTACK_SECRET_KEY = os.environ.get("PAYSTACK_SECRET_KEY", "")
 PAYSTACK_PUBLIC_KEY = os.environ.get("PAYSTACK_PUBLIC_KEY", "")
@@ -239,6 +297,42 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    "refresh-availability-indexes": {
+        "task": "properties.tasks.refresh_availability_indexes",
+        "schedule": crontab(hour=0, minute=5),
+    },
+    "sync-calendar-feeds": {
+        "task": "properties.tasks.sync_calendar_feeds",
+        "schedule": crontab(minute="*/30"),
+    },
+    "refresh-quality-scores": {
+        "task": "properties.tasks.refresh_quality",
+        "schedule": crontab(minute=15),
+    },
+    "refresh-similar-properties": {
+        "task": "properties.tasks.refresh_similar",
+        "schedule": crontab(hour=2, minute=30),
+    },
+}
+# Tests run tasks in-process instead of through the broker
+CELERY_TASK_ALWAYS_EAGER = sys.argv[1:2] == ["test"]
+
+# Cache: the Redis server Celery already uses; tests use an in-process cache
+REDIS_CACHE_URL = os.environ.get("REDIS_CACHE_URL", CELERY_BROKER_URL)
+if sys.argv[1:2] == ["test"]:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_CACHE_URL,
+        }
+    }
 
 # Email Configuration
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
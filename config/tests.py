@@ -0,0 +1,151 @@
+from datetime import date, timedelta
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from bookings.models import Booking
+from notifications.models import Notification
+from properties.models import Availability, Property, PropertyPhoto
+
+User = get_user_model()
+
+
+class ValuesReadPathTest(TestCase):
+    """The values read path renders byte-identical JSON to the serializers"""
+
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            first_name="Ada",
+            last_name="Host",
+            role=User.Role.HOST,
+            profile_photo="profiles/host.jpg",
+        )
+        self.other_host = User.objects.create_user(
+            username="otherhost",
+            email="other@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        self.guest = User.objects.create_user(
+            username="guest",
+            email="guest@example.com",
+            password="testpass123",
+            role=User.Role.GUEST,
+        )
+        self.properties = []
+        for i in range(25):
+            property_obj = Property.objects.create(
+                title=f"Beach House {i}",
+                description="A quiet place by the beach",
+                property_type=Property.PropertyType.HOUSE,
+                host=self.host if i % 2 else self.other_host,
+                address="123 Test St",
+                city="Lagos",
+                country="Nigeria",
+                latitude=6.45 + i / 100,
+                longitude=3.39,
+                base_price=75.50 + i,
+                max_guests=4,
+                bedrooms=i % 4,
+                beds=2,
+                bathrooms=1.5,
+                status=Property.PropertyStatus.ACTIVE,
+                rating_sum=i * 4,
+                rating_count=i,
+            )
+            if i % 3:
+                PropertyPhoto.objects.create(
+                    property=property_obj, image=f"properties/{i}.jpg"
+                )
+            self.properties.append(property_obj)
+
+        today = date.today()
+        self.stay_start = today + timedelta(days=60)
+        for property_obj in self.properties[:3]:
+            for offset in range(2):
+                Availability.objects.create(
+                    property=property_obj,
+                    date=self.stay_start + timedelta(days=offset),
+                    price_override=99.99 if offset else None,
+                )
+        for i, start in enumerate([-10, -1, 5, 30]):
+            Booking.objects.create(
+                property_obj=self.properties[i],
+                guest=self.guest,
+                check_in=today + timedelta(days=start),
+                check_out=today + timedelta(days=start + 3),
+                guest_count=2,
+                base_price=300.00,
+                service_fee=30.00,
+                total_price=330.00,
+            )
+        for i in range(3):
+            Notification.objects.create(
+                user=self.guest,
+                type=Notification.NotificationType.BOOKING_CONFIRMATION,
+                title=f"Notification {i}",
+                message="Your booking is confirmed",
+                is_read=bool(i % 2),
+            )
+
+    def assertMatchesSerializer(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["results"])
+        view = response.renderer_context["view"]
+        queryset = view.filter_queryset(view.get_queryset())
+        page = view.paginate_queryset(queryset)
+        expected = view.get_paginated_response(
+            view.get_serializer(page, many=True).data
+        )
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(response.data), renderer.render(expected.data))
+
+    def test_property_list(self):
+        """Property lists match across filters, ordering and pagination"""
+        for params in [
+            {},
+            {"page": 2},
+            {"pagination": "cursor"},
+            {"latitude": 6.45, "longitude": 3.39, "radius_km": 20, "ordering": "distance"},
+            {"search": "beach", "ordering": "-base_price"},
+            {
+                "check_in": self.stay_start,
+                "check_out": self.stay_start + timedelta(days=2),
+                "ordering": "stay_price",
+            },
+            {"fields": "id,title,host.full_name,primary_photo"},
+            {"expand": ""},
+            # Cursor positions on fields the rendered shape may not include
+            {"search": "beach", "pagination": "cursor"},
+            {"ordering": "relevance", "pagination": "cursor"},
+            {"fields": "id", "ordering": "base_price", "pagination": "cursor"},
+            {"city": "Lagoss", "pagination": "cursor"},
+        ]:
+            with self.subTest(params=params):
+                self.assertMatchesSerializer(self.client.get("/api/properties/", params))
+
+    def test_booking_list(self):
+        """Booking lists match, including computed properties"""
+        client = APIClient()
+        client.force_authenticate(self.guest)
+        for params in [
+            {},
+            {"pagination": "cursor"},
+            {"expand": "property_obj"},
+            {"fields": "id,nights,is_current,property_obj.primary_photo"},
+        ]:
+            with self.subTest(params=params):
+                self.assertMatchesSerializer(client.get("/api/bookings/", params))
+
+    def test_notification_list(self):
+        """Notification lists match in both pagination modes"""
+        client = APIClient()
+        client.force_authenticate(self.guest)
+        for params in [{}, {"pagination": "cursor"}]:
+            with self.subTest(params=params):
+                self.assertMatchesSerializer(client.get("/api/notifications/", params))
@@ -0,0 +1,225 @@
+import os
+import time
+import uuid
+from django.conf import settings
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils.module_loading import import_string
+from rest_framework import serializers, status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+TICKET_SALT = "config.uploads.ticket"
+
+# Image types a ticket may be issued for, with the extension stored
+IMAGE_CONTENT_TYPES = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+}
+
+
+class UploadTicketError(Exception):
+    """A ticket that is invalid, expired, or whose upload isn't usable"""
+
+
+def _too_large():
+    megabytes = settings.DIRECT_UPLOAD_MAX_BYTES // (1024 * 1024)
+    return f"Image file too large. Maximum size is {megabytes}MB."
+
+
+class DirectUploadBackend:
+    """Where clients send direct uploads and how the server finds them.
+
+    Uploaded files are read back through the Django storage, so subclasses
+    only describe the upload request and map keys to stored names.
+    """
+
+    storage = default_storage
+
+    def upload_target(self, key, content_type, token):
+        """The request the client makes: method, url, and form fields or headers"""
+        raise NotImplementedError
+
+    def stored_name(self, key):
+        """Name the uploaded file has in the storage"""
+        return key
+
+    def size(self, key):
+        """Byte size of the uploaded file, or None if nothing was uploaded"""
+        name = self.stored_name(key)
+        if not self.storage.exists(name):
+            return None
+        return self.storage.size(name)
+
+    def delete(self, key):
+        self.storage.delete(self.stored_name(key))
+
+
+class LocalDirectUploadBackend(DirectUploadBackend):
+    """Stand-in backend: clients PUT the file to DirectUploadView.
+
+    Used in development and tests, where the storage is the local
+    filesystem.
+    """
+
+    def upload_target(self, key, content_type, token):
+        return {
+            "method": "PUT",
+            "url": reverse("direct-upload", args=[token]),
+            "headers": {"Content-Type": content_type},
+        }
+
+    def receive(self, key, content):
+        name = self.storage.save(key, ContentFile(content))
+        if name != key:
+            self.storage.delete(name)
+            raise UploadTicketError("This ticket has already been used.")
+
+
+class CloudinaryDirectUploadBackend(DirectUploadBackend):
+    """Signed uploads straight to Cloudinary, for MediaCloudinaryStorage.
+
+    Uploads are addressed by Cloudinary public id, named the way the
+    storage names files: its media prefix plus the key, without extension.
+    """
+
+    def upload_target(self, key, content_type, token):
+        import cloudinary
+        import cloudinary.utils
+
+        config = cloudinary.config()
+        fields = {"public_id": self.stored_name(key), "timestamp": int(time.time())}
+        fields["signature"] = cloudinary.utils.api_sign_request(
+            fields, config.api_secret
+        )
+        fields["api_key"] = config.api_key
+        return {
+            "method": "POST",
+            "url": f"https://api.cloudinary.com/v1_1/{config.cloud_name}/image/upload",
+            "fields": fields,
+        }
+
+    def stored_name(self, key):
+        prefix = settings.CLOUDINARY_STORAGE.get("PREFIX", settings.MEDIA_URL)
+        prefix = prefix.strip("/")
+        name = os.path.splitext(key)[0]
+        return f"{prefix}/{name}" if prefix else name
+
+    def size(self, key):
+        import cloudinary.api
+        from cloudinary.exceptions import NotFound
+
+        try:
+            resource = cloudinary.api.resource(self.stored_name(key))
+        except NotFound:
+            return None
+        return resource["bytes"]
+
+    def delete(self, key):
+        import cloudinary.uploader
+
+        cloudinary.uploader.destroy(self.stored_name(key), invalidate=True)
+
+
+def get_upload_backend():
+    return import_string(settings.DIRECT_UPLOAD_BACKEND)()
+
+
+def issue_upload_ticket(user, purpose, upload_to, content_type):
+    """Sign a short-lived ticket for one direct upload.
+
+    ``purpose`` names what the file is for (say ``property-photo:12``);
+    the finalize call must present the same purpose and user.
+    """
+    key = f"{upload_to}{uuid.uuid4().hex}{IMAGE_CONTENT_TYPES[content_type]}"
+    token = signing.dumps(
+        {"key": key, "user": user.pk, "purpose": purpose, "type": content_type},
+        salt=TICKET_SALT,
+    )
+    return {
+        "token": token,
+        "expires_in": settings.DIRECT_UPLOAD_TICKET_TTL,
+        "max_bytes": settings.DIRECT_UPLOAD_MAX_BYTES,
+        "upload": get_upload_backend().upload_target(key, content_type, token),
+    }
+
+
+def read_upload_ticket(token):
+    try:
+        return signing.loads(
+            token, salt=TICKET_SALT, max_age=settings.DIRECT_UPLOAD_TICKET_TTL
+        )
+    except signing.SignatureExpired:
+        raise UploadTicketError("This upload ticket has expired.")
+    except signing.BadSignature:
+        raise UploadTicketError("Invalid upload ticket.")
+
+
+def claim_upload(token, user, purpose):
+    """Check a finalize call's ticket and return the uploaded file's name"""
+    ticket = read_upload_ticket(token)
+    if ticket["user"] != user.pk or ticket["purpose"] != purpose:
+        raise UploadTicketError("This upload ticket was issued for something else.")
+
+    backend = get_upload_backend()
+    size = backend.size(ticket["key"])
+    if size is None:
+        raise UploadTicketError("Nothing has been uploaded for this ticket yet.")
+    if size > settings.DIRECT_UPLOAD_MAX_BYTES:
+        backend.delete(ticket["key"])
+        raise UploadTicketError(_too_large())
+    return backend.stored_name(ticket["key"])
+
+
+class UploadTicketSerializer(serializers.Serializer):
+    """Serializer for requesting a direct upload ticket"""
+
+    content_type = serializers.ChoiceField(choices=list(IMAGE_CONTENT_TYPES))
+
+
+class FinalizeUploadSerializer(serializers.Serializer):
+    """Serializer for registering a finished direct upload"""
+
+    token = serializers.CharField()
+
+
+class DirectUploadView(APIView):
+    """Receives uploads for LocalDirectUploadBackend; the ticket is the credential"""
+
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def put(self, request, token):
+        backend = get_upload_backend()
+        if not isinstance(backend, LocalDirectUploadBackend):
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        try:
+            ticket = read_upload_ticket(token)
+        except UploadTicketError as error:
+            return Response({"error": str(error)}, status=status.HTTP_403_FORBIDDEN)
+
+        if request.content_type.split(";")[0].strip() != ticket["type"]:
+            return Response(
+                {"error": f"Content-Type must be {ticket['type']}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        # Read the stream directly: request.body is capped at
+        # DATA_UPLOAD_MAX_MEMORY_SIZE, well below the upload limit
+        stream = request.stream
+        content = stream.read(settings.DIRECT_UPLOAD_MAX_BYTES + 1) if stream else b""
+        if not content:
+            return Response(
+                {"error": "No file was uploaded."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(content) > settings.DIRECT_UPLOAD_MAX_BYTES:
+            return Response({"error": _too_large()}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            backend.receive(ticket["key"], content)
+        except UploadTicketError as error:
+            return Response({"error": str(error)}, status=status.HTTP_409_CONFLICT)
+        return Response(status=status.HTTP_204_NO_CONTENT)
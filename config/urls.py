@@ -19,6 +19,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from config.uploads import DirectUploadView
 from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularRedocView,
@@ -50,6 +51,8 @@ urlpatterns = [
     # Search is available at /api/properties/search/
     path("api/payments/", include("payments.urls")),
     path("api/notifications/", include("notifications.urls")),
+    # Receiver for the local direct-upload backend
+    path("api/uploads/<str:token>/", DirectUploadView.as_view(), name="direct-upload"),
 ]
 
 # Serve media files in development
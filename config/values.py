@@ -0,0 +1,190 @@
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import FileField
+from rest_framework import serializers
+from rest_framework.response import Response
+
+# Fields whose to_representation returns plain database values unchanged
+_PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+    serializers.ReadOnlyField,
+)
+
+
+class Computed:
+    """Read-path stand-in for a method field, computed from row columns"""
+
+    def __init__(self, paths, function):
+        self.paths = paths
+        self.function = function
+
+
+class Nested:
+    """Read-path stand-in for a method field returning a nested serializer"""
+
+    def __init__(self, relation, serializer_class):
+        self.relation = relation
+        self.serializer_class = serializer_class
+
+
+def _model_field(model, source_attrs):
+    field = None
+    for index, name in enumerate(source_attrs):
+        field = model._meta.get_field(name)
+        if index < len(source_attrs) - 1:
+            model = field.related_model
+    return field
+
+
+def _resolves(queryset, path):
+    """Whether a values() path names a field or an annotation on queryset"""
+    names = path.split("__")
+    if names[0] in queryset.query.annotations:
+        return True
+    try:
+        _model_field(queryset.model, names)
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+def _converter(field, model_field):
+    """The per-value conversion DRF would apply to a column's value"""
+    if isinstance(model_field, FileField):
+        return lambda name: field.to_representation(
+            model_field.attr_class(None, model_field, name)
+        )
+    if type(field) in _PASSTHROUGH_FIELDS:
+        return None
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        # The column already holds the primary key
+        return None
+    return field.to_representation
+
+
+class ValuesPlan:
+    """A serializer compiled into a .values() projection and row converters.
+
+    Builds the same dicts as ``serializer.data`` straight from
+    ``queryset.values()`` rows, skipping model instances and DRF's per-field
+    get_attribute machinery. Method fields need a ``values_fields`` entry on
+    the serializer (Computed or Nested); anything else that can't be read
+    from a column raises ImproperlyConfigured.
+    """
+
+    def __init__(self, serializer, prefix=""):
+        self.paths = []
+        self.steps = []
+        model = serializer.Meta.model
+        hooks = getattr(serializer, "values_fields", {})
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if name in hooks:
+                self._add_hook(name, hooks[name], model, prefix)
+            elif isinstance(field, serializers.BaseSerializer):
+                self._add_nested(name, field, model, prefix)
+            else:
+                self._add_column(name, field, model, prefix)
+
+    def _add_column(self, name, field, model, prefix):
+        if (
+            isinstance(field, (serializers.SerializerMethodField, serializers.ManyRelatedField))
+            or field.source == "*"
+        ):
+            raise ImproperlyConfigured(
+                f"{name} needs a values_fields entry for the values read path."
+            )
+        try:
+            model_field = _model_field(model, field.source_attrs)
+        except FieldDoesNotExist:
+            raise ImproperlyConfigured(
+                f"{name} isn't a column; give it a values_fields entry."
+            )
+        path = prefix + "__".join(field.source_attrs)
+        convert = _converter(field, model_field)
+        self.paths.append(path)
+        if convert is None:
+            self.steps.append((name, lambda row: row[path]))
+        else:
+            self.steps.append(
+                (name, lambda row: None if row[path] is None else convert(row[path]))
+            )
+
+    def _add_nested(self, name, field, model, prefix):
+        if isinstance(field, serializers.ListSerializer):
+            raise ImproperlyConfigured(f"{name}: many=True isn't supported.")
+        relation = model._meta.get_field(field.source)
+        plan = ValuesPlan(field, f"{prefix}{field.source}__")
+        self._add_relation(name, relation, plan, prefix)
+
+    def _add_relation(self, name, relation, plan, prefix):
+        key_path = prefix + relation.attname
+        self.paths.append(key_path)
+        self.paths.extend(plan.paths)
+        self.steps.append(
+            (name, lambda row: None if row[key_path] is None else plan.build(row))
+        )
+
+    def _add_hook(self, name, hook, model, prefix):
+        if isinstance(hook, Nested):
+            relation = model._meta.get_field(hook.relation)
+            plan = ValuesPlan(hook.serializer_class(), f"{prefix}{hook.relation}__")
+            self._add_relation(name, relation, plan, prefix)
+            return
+        paths = [prefix + path for path in hook.paths]
+        function = hook.function
+        self.paths.extend(paths)
+        self.steps.append(
+            (name, lambda row: function(*(row.get(path) for path in paths)))
+        )
+
+    def build(self, row):
+        return {name: step(row) for name, step in self.steps}
+
+    def render(self, rows):
+        build = self.build
+        return [build(row) for row in rows]
+
+    def values(self, queryset, extra=()):
+        """queryset.values() over the plan's columns plus any extra ones.
+
+        Annotations that weren't added to this queryset (``distance`` without
+        a location filter, say) are left out and read as None.
+        """
+        paths = [
+            path
+            for path in dict.fromkeys([*self.paths, *extra])
+            if _resolves(queryset, path)
+        ]
+        return queryset.values(*paths)
+
+
+class ValuesListMixin:
+    """list() served through a ValuesPlan instead of model instances"""
+
+    def get_values_extra(self, queryset):
+        """Columns the paginator reads from rows but may not be rendered.
+
+        Cursor pagination takes its ordering from the view's ordering filter
+        when there is one, so the cursor position can be any ordered field or
+        annotation (``search_rank``, ``relevance``, ``base_price``...).
+        """
+        cursor_class = getattr(self.paginator, "cursor_pagination_class", None)
+        if cursor_class is None:
+            return []
+        ordering = cursor_class().get_ordering(self.request, queryset, self)
+        return [field.lstrip("-") for field in ordering]
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        plan = ValuesPlan(self.get_serializer())
+        rows = plan.values(queryset, extra=self.get_values_extra(queryset))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(plan.render(page))
+        return Response(plan.render(rows))
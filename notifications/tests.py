@@ -1,3 +1,48 @@
 from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from .models import Notification
 
-# Create your tests here.
+User = get_user_model()
+
+
+class NotificationPaginationTest(TestCase):
+    """Test page-number and cursor pagination of notifications"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="guest",
+            email="guest@example.com",
+            password="testpass123",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for i in range(25):
+            Notification.objects.create(
+                user=self.user,
+                type=Notification.NotificationType.MESSAGE,
+                title=f"Notification {i}",
+                message="Test message",
+            )
+
+    def test_page_number_pagination_by_default(self):
+        """Clients that don't opt in keep the page-number response"""
+        response = self.client.get("/api/notifications/")
+        self.assertEqual(response.data["count"], 25)
+        self.assertEqual(len(response.data["results"]), 20)
+
+    def test_cursor_pagination_walks_every_notification(self):
+        """Following cursor links returns each notification once, newest first"""
+        response = self.client.get("/api/notifications/", {"pagination": "cursor"})
+        self.assertNotIn("count", response.data)
+        ids = [n["id"] for n in response.data["results"]]
+        response = self.client.get(response.data["next"])
+        ids += [n["id"] for n in response.data["results"]]
+        self.assertIsNone(response.data["next"])
+
+        expected = list(
+            Notification.objects.order_by("-created_at", "-id").values_list(
+                "id", flat=True
+            )
+        )
+        self.assertEqual(ids, expected)
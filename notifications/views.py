@@ -3,6 +3,8 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Q
+from config.pagination import OptionalCursorPagination
+from config.values import ValuesListMixin
 from .models import Notification, NotificationPreference
 from .serializers import (
     NotificationSerializer,
@@ -10,11 +12,12 @@ from .serializers import (
 )
 
 
-class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+class NotificationViewSet(ValuesListMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for notification operations"""
 
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalCursorPagination
 
     def get_queryset(self):
         """Get user's notifications"""
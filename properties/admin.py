@@ -1,5 +1,15 @@
 from django.contrib import admin
-from .models import Property, PropertyPhoto, Availability, BlockedDate
+from django.utils import timezone
+from .cache import invalidate_property_cache
+from .models import (
+    Property,
+    PropertyPhoto,
+    Availability,
+    BlockedDate,
+    AvailabilityIndex,
+    CalendarFeed,
+    SimilarProperty,
+)
 
 
 @admin.register(Property)
@@ -37,9 +47,21 @@ class PropertyAdmin(admin.ModelAdmin):
         return obj.bookings.count()
     booking_count.short_description = "Bookings"
 
+    def _set_status(self, queryset, status):
+        """Update status in one query and retire the cached responses.
+
+        queryset.update skips Property.save, so the cache is invalidated here
+        for each changed property.
+        """
+        property_ids = list(queryset.values_list("id", flat=True))
+        updated = queryset.update(status=status, updated_at=timezone.now())
+        for property_id in property_ids:
+            invalidate_property_cache(property_id)
+        return updated
+
     def approve_properties(self, request, queryset):
         """Approve selected properties"""
-        updated = queryset.update(status=Property.PropertyStatus.ACTIVE)
+        updated = self._set_status(queryset, Property.PropertyStatus.ACTIVE)
         self.message_user(
             request,
             f"{updated} property(ies) approved successfully.",
@@ -48,7 +70,7 @@ class PropertyAdmin(admin.ModelAdmin):
 
     def reject_properties(self, request, queryset):
         """Reject selected properties"""
-        updated = queryset.update(status=Property.PropertyStatus.INACTIVE)
+        updated = self._set_status(queryset, Property.PropertyStatus.INACTIVE)
         self.message_user(
             request,
             f"{updated} property(ies) rejected.",
@@ -57,7 +79,7 @@ class PropertyAdmin(admin.ModelAdmin):
 
     def activate_properties(self, request, queryset):
         """Activate selected properties"""
-        updated = queryset.update(status=Property.PropertyStatus.ACTIVE)
+        updated = self._set_status(queryset, Property.PropertyStatus.ACTIVE)
         self.message_user(
             request,
             f"{updated} property(ies) activated.",
@@ -66,7 +88,7 @@ class PropertyAdmin(admin.ModelAdmin):
 
     def deactivate_properties(self, request, queryset):
         """Deactivate selected properties"""
-        updated = queryset.update(status=Property.PropertyStatus.INACTIVE)
+        updated = self._set_status(queryset, Property.PropertyStatus.INACTIVE)
         self.message_user(
             request,
             f"{updated} property(ies) deactivated.",
@@ -87,7 +109,7 @@ class PropertyPhotoAdmin(admin.ModelAdmin):
 class AvailabilityAdmin(admin.ModelAdmin):
     """Admin interface for Availability model"""
 
-    list_display = ["property", "date", "is_available", "price_override"]
+    list_display = ["property", "date", "end_date", "is_available", "price_override"]
     list_filter = ["is_available", "date"]
     search_fields = ["property__title"]
 
@@ -99,3 +121,31 @@ class BlockedDateAdmin(admin.ModelAdmin):
     list_display = ["property", "start_date", "end_date", "reason", "created_at"]
     list_filter = ["start_date", "end_date", "created_at"]
     search_fields = ["property__title", "reason"]
+
+
+@admin.register(CalendarFeed)
+class CalendarFeedAdmin(admin.ModelAdmin):
+    """Admin interface for CalendarFeed model"""
+
+    list_display = ["property", "name", "url", "last_synced_at", "created_at"]
+    list_filter = ["last_synced_at"]
+    search_fields = ["property__title", "name", "url"]
+    readonly_fields = ["etag", "last_synced_at", "last_error"]
+
+
+@admin.register(AvailabilityIndex)
+class AvailabilityIndexAdmin(admin.ModelAdmin):
+    """Admin interface for AvailabilityIndex model"""
+
+    list_display = ["property", "window_start", "window_end", "updated_at"]
+    search_fields = ["property__title"]
+    readonly_fields = ["property", "window_start", "window_end", "nights", "updated_at"]
+
+
+@admin.register(SimilarProperty)
+class SimilarPropertyAdmin(admin.ModelAdmin):
+    """Admin interface for SimilarProperty model"""
+
+    list_display = ["property", "rank", "similar", "score"]
+    search_fields = ["property__title", "similar__title"]
+    readonly_fields = ["property", "similar", "rank", "score"]
@@ -0,0 +1,84 @@
+import re
+
+# Canonical amenity keys offered in search filters and facets
+KNOWN_AMENITIES = [
+    "wifi",
+    "parking",
+    "pool",
+    "kitchen",
+    "ac",
+    "heating",
+    "washer",
+    "dryer",
+    "tv",
+    "workspace",
+    "gym",
+    "hot_tub",
+    "pets_allowed",
+    "elevator",
+    "security",
+    "generator",
+]
+
+# Common spellings mapped onto the canonical keys
+AMENITY_ALIASES = {
+    "wi_fi": "wifi",
+    "wireless": "wifi",
+    "internet": "wifi",
+    "free_parking": "parking",
+    "swimming_pool": "pool",
+    "air_conditioning": "ac",
+    "aircon": "ac",
+    "a_c": "ac",
+    "washing_machine": "washer",
+    "television": "tv",
+    "dedicated_workspace": "workspace",
+    "jacuzzi": "hot_tub",
+    "pet_friendly": "pets_allowed",
+    "pets": "pets_allowed",
+    "lift": "elevator",
+    "power_backup": "generator",
+}
+
+_TRUE_STRINGS = {"true", "yes", "y", "1", "on"}
+
+
+def normalize_amenity_key(key):
+    """Lowercase snake_case key with common aliases resolved"""
+    key = re.sub(r"[^a-z0-9]+", "_", str(key).strip().lower()).strip("_")
+    return AMENITY_ALIASES.get(key, key)
+
+
+def _as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in _TRUE_STRINGS
+    return bool(value)
+
+
+def normalize_amenities(amenities):
+    """Normalise amenities to a ``{key: bool}`` dict.
+
+    Accepts the stored dict form or a plain list of amenity names, so
+    ``{"Wi-Fi": "yes"}`` and ``["wifi"]`` both become ``{"wifi": True}``.
+    """
+    if amenities is None:
+        return {}
+    if isinstance(amenities, (list, tuple)):
+        amenities = {name: True for name in amenities}
+    if not isinstance(amenities, dict):
+        raise ValueError("Amenities must be an object or a list of names.")
+
+    normalized = {}
+    for key, value in amenities.items():
+        key = normalize_amenity_key(key)
+        if not key:
+            continue
+        # Keep an amenity if any spelling of it is enabled
+        normalized[key] = normalized.get(key, False) or _as_bool(value)
+    return normalized
+
+
+def parse_amenity_list(value):
+    """Parse ``wifi,pool,parking`` into normalised amenity keys"""
+    keys = (normalize_amenity_key(part) for part in (value or "").split(","))
+    return sorted({key for key in keys if key})
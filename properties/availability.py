@@ -0,0 +1,355 @@
+from datetime import timedelta
+from django.db import models, transaction
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+from .cache import invalidate_property_cache
+from .models import Availability, AvailabilityIndex, BlockedDate, Property
+
+ONE_DAY = timedelta(days=1)
+
+
+def _blocking_booking_statuses():
+    """Booking statuses that take nights out of the calendar"""
+    from bookings.models import Booking
+
+    return [Booking.BookingStatus.PENDING, Booking.BookingStatus.CONFIRMED]
+
+
+def build_availability_bitmap(property_id, window_start, window_end):
+    """Return the 0/1 string of bookable nights in [window_start, window_end)"""
+    from bookings.models import Booking
+
+    days = (window_end - window_start).days
+    bits = bytearray(b"0" * days)
+
+    def paint(start, end, bit):
+        start = max((start - window_start).days, 0)
+        end = min((end - window_start).days, days)
+        if start < end:
+            bits[start:end] = bit * (end - start)
+
+    def clear(start, end):
+        paint(start, end, b"0")
+
+    # Runs of nights explicitly opened in the calendar
+    open_runs = Availability.objects.filter(
+        property_id=property_id,
+        date__lt=window_end,
+        end_date__gte=window_start,
+        is_available=True,
+    ).values_list("date", "end_date")
+    for start_date, end_date in open_runs:
+        paint(start_date, end_date + ONE_DAY, b"1")
+
+    # Blocked periods include their end date
+    blocked = BlockedDate.objects.filter(
+        property_id=property_id,
+        start_date__lt=window_end,
+        end_date__gte=window_start,
+    ).values_list("start_date", "end_date")
+    for start_date, end_date in blocked:
+        clear(start_date, end_date + timedelta(days=1))
+
+    # Bookings occupy the nights in [check_in, check_out)
+    booked = Booking.objects.filter(
+        property_obj_id=property_id,
+        status__in=_blocking_booking_statuses(),
+        check_in__lt=window_end,
+        check_out__gt=window_start,
+    ).values_list("check_in", "check_out")
+    for check_in, check_out in booked:
+        clear(check_in, check_out)
+
+    return bits.decode()
+
+
+def refresh_availability_index(property_id, window_start=None):
+    """Rebuild the availability bitmap for a single property"""
+    window_start = window_start or timezone.now().date()
+    window_end = window_start + timedelta(days=AvailabilityIndex.WINDOW_DAYS)
+    index, _ = AvailabilityIndex.objects.update_or_create(
+        property_id=property_id,
+        defaults={
+            "window_start": window_start,
+            "window_end": window_end,
+            "nights": build_availability_bitmap(property_id, window_start, window_end),
+        },
+    )
+    # Date-filtered search results change with the calendar
+    invalidate_property_cache(property_id)
+    return index
+
+
+def create_empty_availability_index(property_id):
+    """Index a new property with every night closed, as its empty calendar is"""
+    window_start = timezone.now().date()
+    return AvailabilityIndex.objects.create(
+        property_id=property_id,
+        window_start=window_start,
+        window_end=window_start + timedelta(days=AvailabilityIndex.WINDOW_DAYS),
+        nights="0" * AvailabilityIndex.WINDOW_DAYS,
+    )
+
+
+def overlap_nights(check_in, check_out):
+    """Nights a calendar run shares with [check_in, check_out), as SQL.
+
+    Only meaningful on runs that overlap the stay.
+    """
+    run_end = models.Func(
+        models.F("end_date"),
+        template="(%(expressions)s + 1)",
+        output_field=models.DateField(),
+    )
+    return models.Func(
+        Least(run_end, models.Value(check_out)),
+        Greatest(models.F("date"), models.Value(check_in)),
+        template="(%(expressions)s)",
+        arg_joiner=" - ",
+        output_field=models.IntegerField(),
+    )
+
+
+def weekday_runs(start_date, end_date, weekdays=None):
+    """Split [start_date, end_date] into runs of days falling on ``weekdays``"""
+    if weekdays is None:
+        return [(start_date, end_date)]
+    runs = []
+    day = start_date
+    while day <= end_date:
+        if day.weekday() in weekdays:
+            if runs and runs[-1][1] + ONE_DAY == day:
+                runs[-1] = (runs[-1][0], day)
+            else:
+                runs.append((day, day))
+        day += ONE_DAY
+    return runs
+
+
+def _paint_run(runs, start, end, is_available, price_override, set_price):
+    """Overwrite [start, end] in a sorted list of calendar runs.
+
+    Runs are ``(date, end_date, is_available, price_override)`` tuples.
+    Runs crossing the edges are split; days no run covered become new runs.
+    """
+    painted = []
+    uncovered = start
+    for run in runs:
+        run_start, run_end, available, price = run
+        if run_end < start or run_start > end:
+            painted.append(run)
+            continue
+        if run_start < start:
+            painted.append((run_start, start - ONE_DAY, available, price))
+        if run_start > uncovered:
+            painted.append(
+                (
+                    uncovered,
+                    run_start - ONE_DAY,
+                    is_available,
+                    price_override if set_price else None,
+                )
+            )
+        painted.append(
+            (
+                max(run_start, start),
+                min(run_end, end),
+                is_available,
+                price_override if set_price else price,
+            )
+        )
+        if run_end > end:
+            painted.append((end + ONE_DAY, run_end, available, price))
+        uncovered = min(run_end, end) + ONE_DAY
+    if uncovered <= end:
+        painted.append(
+            (uncovered, end, is_available, price_override if set_price else None)
+        )
+    return sorted(painted)
+
+
+def _merge_runs(runs):
+    """Join adjacent runs that share availability and price"""
+    merged = []
+    for run in sorted(runs):
+        previous = merged[-1] if merged else None
+        if (
+            previous
+            and previous[1] + ONE_DAY == run[0]
+            and previous[2:] == run[2:]
+        ):
+            merged[-1] = (previous[0], run[1], *run[2:])
+        else:
+            merged.append(run)
+    return merged
+
+
+def _replace_runs(property_id, rows, runs):
+    """Swap calendar rows for runs, leaving rows that didn't change alone"""
+    wanted = set(runs)
+    stale = []
+    for row in rows:
+        key = (row.date, row.end_date, row.is_available, row.price_override)
+        if key in wanted:
+            wanted.discard(key)
+        else:
+            stale.append(row.pk)
+    # Queryset delete and bulk_create skip the per-row index refresh in
+    # Availability.save/delete
+    Availability.objects.filter(pk__in=stale).delete()
+    Availability.objects.bulk_create(
+        Availability(
+            property_id=property_id,
+            date=start,
+            end_date=end,
+            is_available=is_available,
+            price_override=price_override,
+        )
+        for start, end, is_available, price_override in sorted(wanted)
+    )
+    return len(stale), len(wanted)
+
+
+def upsert_availability(property_id, runs, is_available, price_override=None, set_price=True):
+    """Set availability (and price) on inclusive ``(start, end)`` runs of days.
+
+    Calendar rows overlapping the runs are split around them and neighbours
+    that end up alike are merged, so a write touches one row per change
+    rather than one per day. With ``set_price=False`` days keep the price
+    they had. The bitmap is rebuilt once, in the same transaction.
+    """
+    runs = sorted(runs)
+    with transaction.atomic():
+        # Row locks can't cover runs that don't exist yet, so serialise
+        # calendar writes on the property itself
+        Property.objects.select_for_update().only("id").get(pk=property_id)
+        # Include the days either side so equal neighbours can be merged
+        rows = list(
+            Availability.objects.select_for_update()
+            .filter(
+                property_id=property_id,
+                date__lte=runs[-1][1] + ONE_DAY,
+                end_date__gte=runs[0][0] - ONE_DAY,
+            )
+            .order_by("date")
+        )
+        calendar = [
+            (row.date, row.end_date, row.is_available, row.price_override)
+            for row in rows
+        ]
+        for start, end in runs:
+            calendar = _paint_run(
+                calendar, start, end, is_available, price_override, set_price
+            )
+        _replace_runs(property_id, rows, _merge_runs(calendar))
+        refresh_availability_index(property_id)
+    return sum((end - start).days + 1 for start, end in runs)
+
+
+def compact_calendar(property_id):
+    """Merge a property's adjacent, identical calendar rows into runs"""
+    with transaction.atomic():
+        Property.objects.select_for_update().only("id").get(pk=property_id)
+        rows = list(
+            Availability.objects.select_for_update()
+            .filter(property_id=property_id)
+            .order_by("date")
+        )
+        runs = _merge_runs(
+            (row.date, row.end_date, row.is_available, row.price_override)
+            for row in rows
+        )
+        removed, added = _replace_runs(property_id, rows, runs)
+    return removed - added
+
+
+def compact_all_calendars():
+    """Compact every property's calendar; returns the number of rows saved"""
+    property_ids = (
+        Availability.objects.order_by().values_list("property_id", flat=True).distinct()
+    )
+    return sum(compact_calendar(property_id) for property_id in property_ids.iterator())
+
+
+def refresh_all_availability_indexes():
+    """Roll every property's bitmap window forward to today"""
+    window_start = timezone.now().date()
+    property_ids = Property.objects.values_list("id", flat=True)
+    count = 0
+    for property_id in property_ids.iterator():
+        refresh_availability_index(property_id, window_start=window_start)
+        count += 1
+    return count
+
+
+def filter_available_nights(queryset, check_in, check_out):
+    """Keep properties where every night in [check_in, check_out) is free"""
+    nights = (check_out - check_in).days
+    if nights <= 0:
+        return queryset.none()
+
+    # Per candidate property, an EXISTS on the index's unique property_id:
+    # only the candidates' bitmaps are sliced, and the slice covering the
+    # stay must be all ones.
+    covering = AvailabilityIndex.objects.filter(
+        property_id=models.OuterRef("pk"),
+        window_start__lte=check_in,
+        window_end__gte=check_out,
+    )
+    free = covering.alias(
+        is_free=RawSQL(
+            'SUBSTRING("nights" FROM (%s - "window_start") + 1 FOR %s)'
+            " = REPEAT('1', %s)::varbit",
+            (check_in, nights, nights),
+            output_field=models.BooleanField(),
+        )
+    ).filter(is_free=True)
+    # Properties without an index covering the stay (never indexed, a stale
+    # window, or dates outside it) are checked against the calendar rows
+    return queryset.filter(
+        models.Q(models.Exists(free))
+        | (~models.Exists(covering) & _calendar_free(check_in, check_out))
+    )
+
+
+def _calendar_free(check_in, check_out):
+    """Q for every night in [check_in, check_out) open in the calendar rows.
+
+    Nights must also be free of blocked periods and bookings. This is the
+    slow path, for stays the bitmap doesn't cover; each check is correlated
+    on the candidate property so only its rows are read.
+    """
+    from bookings.models import Booking
+
+    nights = (check_out - check_in).days
+    last_night = check_out - timedelta(days=1)
+
+    open_runs = (
+        Availability.objects.filter(
+            property_id=models.OuterRef("pk"),
+            date__lt=check_out,
+            end_date__gte=check_in,
+            is_available=True,
+        )
+        .values("property_id")
+        .annotate(open_nights=models.Sum(overlap_nights(check_in, check_out)))
+        .filter(open_nights=nights)
+    )
+    blocked = BlockedDate.objects.filter(
+        property_id=models.OuterRef("pk"),
+        start_date__lte=last_night,
+        end_date__gte=check_in,
+    )
+    booked = Booking.objects.filter(
+        property_obj_id=models.OuterRef("pk"),
+        status__in=_blocking_booking_statuses(),
+        check_in__lt=check_out,
+        check_out__gt=check_in,
+    )
+
+    return (
+        models.Q(models.Exists(open_runs))
+        & ~models.Exists(blocked)
+        & ~models.Exists(booked)
+    )
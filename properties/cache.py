@@ -0,0 +1,111 @@
+import hashlib
+import time
+from datetime import datetime
+from urllib.parse import urlencode
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.http import quote_etag
+
+GENERATION_KEY = "property-cache-generation"
+
+
+def normalized_query_key(prefix, query_params, ignore=(), extra=(), keep_blank=()):
+    """Build a cache key from request params, independent of their order.
+
+    Blank values and ignored params are dropped and repeated values are
+    sorted, so equivalent query strings share one cache entry. Params in
+    keep_blank mean something even when empty (``?expand=``) and are kept.
+    """
+    items = []
+    for key in sorted(query_params.keys()):
+        if key in ignore:
+            continue
+        values = sorted(v.strip() for v in query_params.getlist(key) if v.strip())
+        if not values and key in keep_blank:
+            values = [""]
+        items.extend((key, value) for value in values)
+    items.extend(extra)
+    digest = hashlib.md5(urlencode(items).encode(), usedforsecurity=False).hexdigest()
+    return f"{prefix}:{digest}"
+
+
+def _generation_key(property_id=None):
+    if property_id is None:
+        return GENERATION_KEY
+    return f"{GENERATION_KEY}:{property_id}"
+
+
+def property_cache_generation(property_id=None):
+    """Current generation of the property listing (or one property's) cache.
+
+    Cached responses are keyed by generation, so bumping it retires them
+    without having to find and delete every key. A missing counter starts
+    from the clock, so one that was evicted never reuses an old value.
+    """
+    return cache.get_or_set(_generation_key(property_id), time.time_ns, None)
+
+
+def bump_property_cache_generation(property_id=None):
+    """Retire cached listings, and the cached detail of property_id if given"""
+    keys = [_generation_key()]
+    if property_id is not None:
+        keys.append(_generation_key(property_id))
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def invalidate_property_cache(property_id=None):
+    """Bump the cache generation once the current transaction commits"""
+    transaction.on_commit(lambda: bump_property_cache_generation(property_id))
+
+
+def _related_stamps(model, prefix):
+    """Latest change and row count of a property's related rows"""
+    related = model.objects.filter(property=OuterRef("pk")).order_by().values("property")
+    return {
+        f"{prefix}_changed": Subquery(
+            related.annotate(latest=Max("updated_at")).values("latest")
+        ),
+        # The count catches deletions, which don't move the latest stamp
+        f"{prefix}_count": Coalesce(
+            Subquery(related.annotate(total=Count("id")).values("total")), 0
+        ),
+    }
+
+
+def property_change_stamps(property_id, related=("photos", "availability")):
+    """Change stamps behind a property's detail and calendar, in one query.
+
+    ``related`` picks which related tables to stamp. Returns None when the
+    property doesn't exist.
+    """
+    from .models import Availability, Property, PropertyPhoto
+
+    models = {"photos": PropertyPhoto, "availability": Availability}
+    annotations = {}
+    for prefix in related:
+        annotations.update(_related_stamps(models[prefix], prefix))
+    try:
+        return (
+            Property.objects.filter(pk=property_id)
+            .order_by()
+            .values("updated_at", "host__updated_at")
+            .annotate(**annotations)
+            .first()
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+def conditional_validators(stamps, names):
+    """ETag and Last-Modified timestamp built from the named change stamps"""
+    values = [stamps[name] for name in names]
+    digest = hashlib.md5(repr(values).encode(), usedforsecurity=False).hexdigest()
+    changed = [value for value in values if isinstance(value, datetime)]
+    last_modified = int(max(changed).timestamp()) if changed else None
+    return quote_etag(digest), last_modified
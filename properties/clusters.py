@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.db.models import Avg, Count, Min, Q
+from django.db.models.functions import Left
+from .geo import GEOHASH_PRECISION, geohash_cell_size
+
+# Web map tiles are 256px wide; clusters aim for cells about 64px across
+TILE_CELLS = 4
+MAX_ZOOM = 22
+
+
+def parse_bbox(value):
+    """``min_lon,min_lat,max_lon,max_lat`` as floats, or None if malformed"""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in value.split(","))
+    except (AttributeError, ValueError):
+        return None
+    if not (
+        -180.0 <= min_lon <= 180.0
+        and -180.0 <= max_lon <= 180.0
+        and -90.0 <= min_lat <= max_lat <= 90.0
+    ):
+        return None
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def filter_bbox(queryset, bbox):
+    """Keep properties inside the box; a box with min_lon > max_lon crosses 180°"""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    queryset = queryset.filter(latitude__gte=min_lat, latitude__lte=max_lat)
+    if min_lon <= max_lon:
+        return queryset.filter(longitude__gte=min_lon, longitude__lte=max_lon)
+    return queryset.filter(Q(longitude__gte=min_lon) | Q(longitude__lte=max_lon))
+
+
+def cluster_precision(zoom):
+    """Geohash precision whose cells are about a quarter tile wide at this zoom"""
+    target = 360.0 / (2**zoom) / TILE_CELLS
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        if geohash_cell_size(precision)[1] >= target:
+            return precision
+    return 1
+
+
+def cluster_properties(queryset, zoom):
+    """Count, centroid and lowest price per geohash cell, in one GROUP BY"""
+    precision = cluster_precision(zoom)
+    rows = (
+        queryset.order_by()
+        .annotate(cell=Left("geohash", precision))
+        .values("cell")
+        .annotate(
+            count=Count("id"),
+            latitude=Avg("latitude"),
+            longitude=Avg("longitude"),
+            min_price=Min("base_price"),
+        )
+        .order_by("cell")
+    )
+    return precision, [
+        {
+            "cell": row["cell"],
+            "count": row["count"],
+            "latitude": round(float(row["latitude"]), 6),
+            "longitude": round(float(row["longitude"]), 6),
+            "min_price": row["min_price"],
+        }
+        for row in rows
+    ]
+
+
+def property_pins(queryset):
+    """Individual pins, or None when the viewport holds more than MAP_MAX_PINS"""
+    limit = settings.MAP_MAX_PINS
+    pins = list(
+        queryset.order_by("id").values(
+            "id", "title", "latitude", "longitude", "base_price"
+        )[: limit + 1]
+    )
+    if len(pins) > limit:
+        return None
+    return pins
+
+
+def map_markers(queryset, bbox, zoom):
+    """Markers for a map viewport: pins at high zoom, otherwise cell clusters"""
+    queryset = filter_bbox(queryset, bbox)
+    if zoom >= settings.MAP_PIN_ZOOM:
+        pins = property_pins(queryset)
+        if pins is not None:
+            return {"zoom": zoom, "precision": None, "clusters": [], "pins": pins}
+    precision, clusters = cluster_properties(queryset, zoom)
+    return {"zoom": zoom, "precision": precision, "clusters": clusters, "pins": []}
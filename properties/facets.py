@@ -0,0 +1,66 @@
+from django.db.models import Count, Q
+from .amenities import KNOWN_AMENITIES
+from .models import Property
+
+# Nightly price buckets as [min, max) pairs; None means unbounded
+PRICE_BUCKETS = [(0, 50), (50, 100), (100, 200), (200, 500), (500, None)]
+
+# Bedroom counts reported individually; larger ones are grouped as "5+"
+MAX_BEDROOM_FACET = 5
+
+FACET_NAMES = ["property_type", "price", "bedrooms", "amenities"]
+
+
+def _price_label(low, high):
+    return f"{low}+" if high is None else f"{low}-{high}"
+
+
+def _facet_aggregates(names):
+    """Conditional COUNT(*) FILTER (...) aggregates for the requested facets"""
+    aggregates = {"total": Count("id")}
+
+    if "property_type" in names:
+        for value, _ in Property.PropertyType.choices:
+            aggregates[f"property_type__{value}"] = Count(
+                "id", filter=Q(property_type=value)
+            )
+
+    if "price" in names:
+        for low, high in PRICE_BUCKETS:
+            condition = Q(base_price__gte=low)
+            if high is not None:
+                condition &= Q(base_price__lt=high)
+            aggregates[f"price__{_price_label(low, high)}"] = Count(
+                "id", filter=condition
+            )
+
+    if "bedrooms" in names:
+        for bedrooms in range(MAX_BEDROOM_FACET):
+            aggregates[f"bedrooms__{bedrooms}"] = Count(
+                "id", filter=Q(bedrooms=bedrooms)
+            )
+        aggregates[f"bedrooms__{MAX_BEDROOM_FACET}+"] = Count(
+            "id", filter=Q(bedrooms__gte=MAX_BEDROOM_FACET)
+        )
+
+    if "amenities" in names:
+        for amenity in KNOWN_AMENITIES:
+            aggregates[f"amenities__{amenity}"] = Count(
+                "id", filter=Q(amenities__contains={amenity: True})
+            )
+
+    return aggregates
+
+
+def compute_facets(queryset, names=None):
+    """Count every facet value over the filtered queryset in one query"""
+    names = [name for name in (names or FACET_NAMES) if name in FACET_NAMES]
+    counts = queryset.order_by().aggregate(**_facet_aggregates(names))
+
+    facets = {"total": counts.pop("total")}
+    for name in names:
+        facets[name] = {}
+    for key, count in counts.items():
+        name, value = key.split("__", 1)
+        facets[name][value] = count
+    return facets
@@ -1,14 +1,16 @@
 import django_filters
-from django.db import models
+from rest_framework.filters import OrderingFilter
 from .models import Property
 
 
 class PropertyFilter(django_filters.FilterSet):
     """Filter for property listings"""
 
-    # Location filters
-    city = django_filters.CharFilter(field_name="city", lookup_expr="icontains")
-    country = django_filters.CharFilter(field_name="country", lookup_expr="icontains")
+    # Location filters (trigram indexed, with a fuzzy fallback for typos)
+    city = django_filters.CharFilter(field_name="city", method="filter_destination")
+    country = django_filters.CharFilter(
+        field_name="country", method="filter_destination"
+    )
 
     # Price filters
     min_price = django_filters.NumberFilter(field_name="base_price", lookup_expr="gte")
@@ -30,7 +32,8 @@ class PropertyFilter(django_filters.FilterSet):
     # Status filter
     status = django_filters.ChoiceFilter(choices=Property.PropertyStatus.choices)
 
-    # Amenities filter (check if amenity exists in JSON field)
+    # Amenities filters (JSONB containment on a GIN index)
+    amenities = django_filters.CharFilter(method="filter_amenities")
     has_wifi = django_filters.BooleanFilter(
         field_name="amenities", method="filter_amenity"
     )
@@ -74,78 +77,126 @@ class PropertyFilter(django_filters.FilterSet):
             "status",
         ]
 
+    def filter_destination(self, queryset, name, value):
+        """Match city/country, suggesting the closest spelling on a miss"""
+        from .search import filter_destination
+
+        return filter_destination(queryset, name, value)
+
     def filter_amenity(self, queryset, name, value):
         """Filter by amenity in JSON field"""
         if value:
             amenity_name = name.replace("has_", "")
-            return queryset.filter(**{f"amenities__{amenity_name}": True})
+            return queryset.filter(amenities__contains={amenity_name: True})
         return queryset
 
+    def filter_amenities(self, queryset, name, value):
+        """Require every amenity in a comma-separated list (wifi,pool,...)"""
+        from .amenities import parse_amenity_list
+
+        keys = parse_amenity_list(value)
+        if not keys:
+            return queryset
+        # A single @> predicate, however many amenities are requested
+        return queryset.filter(amenities__contains={key: True for key in keys})
+
     def filter_available_dates(self, queryset, name, value):
-        """Filter properties available for given dates"""
+        """Filter properties free for every night of the requested stay.
+
+        Matches are annotated with ``stay_price``, the stay's nightly total.
+        """
         from datetime import timedelta
-        from .models import Availability, BlockedDate
+        from .availability import filter_available_nights
+        from .pricing import annotate_stay_price
 
-        if not value:
+        check_in = self.form.cleaned_data.get("check_in")
+        check_out = self.form.cleaned_data.get("check_out")
+
+        # Both bounds describe one stay, so apply it once from check_in
+        if name == "check_out" and check_in:
             return queryset
 
-        # Check availability calendar
-        if name == "check_in":
-            # Properties available on check-in date
-            available_properties = Availability.objects.filter(
-                date=value, is_available=True
-            ).values_list("property_id", flat=True)
-            queryset = queryset.filter(id__in=available_properties)
-
-        elif name == "check_out":
-            # Properties available on check-out date
-            available_properties = Availability.objects.filter(
-                date=value, is_available=True
-            ).values_list("property_id", flat=True)
-            queryset = queryset.filter(id__in=available_properties)
-
-        # Check blocked dates
-        blocked_properties = BlockedDate.objects.filter(
-            start_date__lte=value, end_date__gte=value
-        ).values_list("property_id", flat=True)
-        queryset = queryset.exclude(id__in=blocked_properties)
+        if not check_in:
+            check_in = check_out - timedelta(days=1)
+        if not check_out:
+            check_out = check_in + timedelta(days=1)
 
-        return queryset
+        queryset = filter_available_nights(queryset, check_in, check_out)
+        return annotate_stay_price(queryset, check_in, check_out)
 
     def filter_nearby(self, queryset, name, value):
         """Filter properties within radius of given coordinates"""
-        latitude = self.data.get("latitude")
-        longitude = self.data.get("longitude")
-        radius_km = float(self.data.get("radius_km", 10))
-
-        if latitude and longitude:
-            # Use approximate distance calculation using bounding box
-            # For more accurate results, consider using PostGIS or a geopy library
-            from math import radians, cos
-
-            lat = float(latitude)
-            lon = float(longitude)
-
-            # Convert radius from km to degrees (approximate)
-            # 1 degree latitude ≈ 111 km
-            lat_range = radius_km / 111.0
-            # Longitude range depends on latitude
-            lon_range = radius_km / (111.0 * cos(radians(lat)))
-
-            queryset = queryset.filter(
-                latitude__gte=lat - lat_range,
-                latitude__lte=lat + lat_range,
-                longitude__gte=lon - lon_range,
-                longitude__lte=lon + lon_range,
-            )
-        return queryset
+        from .geo import filter_within_radius
 
-    def filter_search(self, queryset, name, value):
-        """Search in title, description, city, country"""
-        return queryset.filter(
-            models.Q(title__icontains=value)
-            | models.Q(description__icontains=value)
-            | models.Q(city__icontains=value)
-            | models.Q(country__icontains=value)
+        latitude = self.form.cleaned_data.get("latitude")
+        longitude = self.form.cleaned_data.get("longitude")
+        radius_km = self.form.cleaned_data.get("radius_km") or 10
+
+        # The three parameters describe one search, so apply it once
+        if name != "latitude" or latitude is None or longitude is None:
+            return queryset
+
+        return filter_within_radius(
+            queryset, float(latitude), float(longitude), float(radius_km)
         )
 
+    def filter_search(self, queryset, name, value):
+        """Full-text search in title, city, country and description"""
+        from .search import search_properties
+
+        return search_properties(queryset, value)
+
+
+class PropertyOrderingFilter(OrderingFilter):
+    """Ordering filter that also accepts annotations added by PropertyFilter"""
+
+    # Only orderable when the matching filter annotated the queryset
+    annotation_fields = ["distance", "search_rank", "stay_price"]
+
+    # Applied best-first when present and no ordering was requested
+    rank_annotations = ["city_similarity", "country_similarity", "search_rank"]
+
+    def get_ordering(self, request, queryset, view):
+        """Rank matches first unless the client chose an ordering"""
+        ordering = super().get_ordering(request, queryset, view)
+        if request.query_params.get(self.ordering_param):
+            return self._relevance_ordering(ordering)
+        ranks = [
+            f"-{name}"
+            for name in self.rank_annotations
+            if name in queryset.query.annotations
+        ]
+        if ranks:
+            return [*ranks, *(ordering or [])]
+        return ordering
+
+    def _relevance_ordering(self, ordering):
+        """?ordering=relevance means most relevant first, ties broken by id"""
+        if not ordering or not any(term.lstrip("-") == "relevance" for term in ordering):
+            return ordering
+        ordering = [
+            {"relevance": "-relevance", "-relevance": "relevance"}.get(term, term)
+            for term in ordering
+        ]
+        if not any(term.lstrip("-") == "id" for term in ordering):
+            ordering.append("-id")
+        return ordering
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if not ordering:
+            return queryset
+        if any(term.lstrip("-") == "relevance" for term in ordering):
+            from .ranking import annotate_relevance
+
+            queryset = annotate_relevance(queryset)
+        return queryset.order_by(*ordering)
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        valid_fields = super().remove_invalid_fields(queryset, fields, view, request)
+        return [
+            term
+            for term in valid_fields
+            if term.lstrip("-") not in self.annotation_fields
+            or term.lstrip("-") in queryset.query.annotations
+        ]
@@ -0,0 +1,125 @@
+from math import asin, ceil, cos, radians, sin, sqrt
+from django.db import models
+from django.db.models.functions import ASin, Cast, Cos, Least, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.0
+
+# Precision stored on Property.geohash (~4.8m x 4.8m cells)
+GEOHASH_PRECISION = 9
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Encode a coordinate as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lon_range[0] = mid
+            else:
+                bits <<= 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision):
+    """Return the (lat, lon) size in degrees of a cell at this precision"""
+    total_bits = 5 * precision
+    lat_bits = total_bits // 2
+    lon_bits = ceil(total_bits / 2)
+    return 180.0 / (2**lat_bits), 360.0 / (2**lon_bits)
+
+
+def covering_cells(latitude, longitude, radius_km):
+    """Return geohash prefixes whose cells cover the search circle.
+
+    Picks the finest precision whose cells are at least as large as the
+    radius, so the centre cell and its eight neighbours always contain the
+    circle. Returns None when the circle is too large to prefilter.
+    """
+    lat_radius = radius_km / KM_PER_DEGREE
+    cos_lat = cos(radians(latitude))
+    if cos_lat <= 0.01:
+        return None
+    lon_radius = radius_km / (KM_PER_DEGREE * cos_lat)
+
+    precision = None
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        lat_size, lon_size = geohash_cell_size(candidate)
+        if lat_size >= lat_radius and lon_size >= lon_radius:
+            precision = candidate
+            break
+    if precision is None:
+        return None
+
+    lat_size, lon_size = geohash_cell_size(precision)
+    cells = set()
+    for lat_step in (-1, 0, 1):
+        cell_lat = latitude + lat_step * lat_size
+        if not -90.0 <= cell_lat <= 90.0:
+            continue
+        for lon_step in (-1, 0, 1):
+            cell_lon = longitude + lon_step * lon_size
+            cell_lon = (cell_lon + 180.0) % 360.0 - 180.0
+            cells.add(geohash_encode(cell_lat, cell_lon, precision))
+    return sorted(cells)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two coordinates in kilometres"""
+    d_lat = radians(lat2 - lat1)
+    d_lon = radians(lon2 - lon1)
+    a = sin(d_lat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(d_lon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a)))
+
+
+def haversine_expression(latitude, longitude):
+    """Database expression for the distance in km from a coordinate"""
+    lat = Radians(Cast("latitude", models.FloatField()))
+    lon = Radians(Cast("longitude", models.FloatField()))
+    origin_lat = radians(latitude)
+    origin_lon = radians(longitude)
+    a = Power(Sin((lat - origin_lat) / 2), 2) + cos(origin_lat) * Cos(lat) * Power(
+        Sin((lon - origin_lon) / 2), 2
+    )
+    return models.ExpressionWrapper(
+        2 * EARTH_RADIUS_KM * ASin(Least(Sqrt(a), 1.0)),
+        output_field=models.FloatField(),
+    )
+
+
+def filter_within_radius(queryset, latitude, longitude, radius_km):
+    """Keep properties within radius_km and annotate their ``distance``"""
+    cells = covering_cells(latitude, longitude, radius_km)
+    if cells is not None:
+        prefilter = models.Q()
+        for cell in cells:
+            prefilter |= models.Q(geohash__startswith=cell)
+        queryset = queryset.filter(prefilter)
+
+    return queryset.annotate(
+        distance=haversine_expression(latitude, longitude)
+    ).filter(distance__lte=radius_km)
@@ -0,0 +1,99 @@
+from decimal import Decimal
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+
+DEFAULT_PRICE_BUCKETS = 20
+MAX_PRICE_BUCKETS = 50
+PRICE_PERCENTILES = [10, 25, 50, 75, 90]
+
+CENTS = Decimal("0.01")
+
+# Statistics and bucket counts in one statement. The maximum price falls in
+# WIDTH_BUCKET's overflow bucket, so it is folded into the last one.
+_HISTOGRAM_SQL = """
+WITH prices AS ({prices}),
+stats AS (
+    SELECT COUNT(*) AS total,
+        MIN(base_price) AS low,
+        MAX(base_price) AS high,
+        PERCENTILE_CONT(%s::float8[]) WITHIN GROUP (
+            ORDER BY base_price::float8
+        ) AS percentiles
+    FROM prices
+)
+SELECT stats.total, stats.low, stats.high, stats.percentiles,
+    buckets.bucket, buckets.count
+FROM stats
+LEFT JOIN (
+    SELECT CASE WHEN stats.high > stats.low
+            THEN LEAST(WIDTH_BUCKET(prices.base_price, stats.low, stats.high, %s), %s)
+            ELSE 1
+        END AS bucket,
+        COUNT(*) AS count
+    FROM prices CROSS JOIN stats
+    GROUP BY 1
+) AS buckets ON TRUE
+ORDER BY buckets.bucket
+"""
+
+
+def _empty_histogram():
+    return {
+        "total": 0,
+        "min": None,
+        "max": None,
+        "percentiles": {f"p{p}": None for p in PRICE_PERCENTILES},
+        "buckets": [],
+    }
+
+
+def price_histogram(queryset, bucket_count=DEFAULT_PRICE_BUCKETS):
+    """``base_price`` distribution over the filtered queryset in one query.
+
+    Returns the count, min, max and percentiles, plus ``bucket_count``
+    equal-width buckets between min and max (one when every price is equal).
+    """
+    try:
+        prices_sql, prices_params = (
+            queryset.order_by().values("base_price").query.sql_with_params()
+        )
+    except EmptyResultSet:
+        return _empty_histogram()
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            _HISTOGRAM_SQL.format(prices=prices_sql),
+            [
+                *prices_params,
+                [p / 100 for p in PRICE_PERCENTILES],
+                bucket_count,
+                bucket_count,
+            ],
+        )
+        rows = cursor.fetchall()
+
+    total, low, high, percentiles = rows[0][:4]
+    if not total:
+        return _empty_histogram()
+
+    counts = {bucket: count for *_, bucket, count in rows}
+    if high == low:
+        bucket_count = 1
+    width = (high - low) / bucket_count
+    return {
+        "total": total,
+        "min": low,
+        "max": high,
+        "percentiles": {
+            f"p{p}": Decimal(value).quantize(CENTS)
+            for p, value in zip(PRICE_PERCENTILES, percentiles)
+        },
+        "buckets": [
+            {
+                "min": (low + width * index).quantize(CENTS),
+                "max": (low + width * (index + 1)).quantize(CENTS),
+                "count": counts.get(index + 1, 0),
+            }
+            for index in range(bucket_count)
+        ],
+    }
@@ -0,0 +1,304 @@
+import ipaddress
+import re
+import socket
+from datetime import datetime, timedelta
+from email.message import Message
+from urllib.parse import urljoin, urlsplit
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import BlockedDate, CalendarFeed
+
+ICAL_DATE = "%Y%m%d"
+ICAL_PRODID = "-//Zelax Properties//Calendar//EN"
+
+# Exported blocked periods never carry the host's reason or an imported
+# SUMMARY, which may name guests or other channels
+BLOCKED_SUMMARY = "Not available"
+
+# Redirects followed when fetching a feed, each one re-checked
+MAX_FEED_REDIRECTS = 3
+
+
+class CalendarFeedError(Exception):
+    """A feed URL the server won't fetch, or a response it won't read"""
+
+
+def _escape(text):
+    """Escape a TEXT value (RFC 5545 3.3.11)"""
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def _unescape(text):
+    return re.sub(
+        r"\\([\\;,nN])",
+        lambda match: "\n" if match.group(1) in "nN" else match.group(1),
+        text,
+    )
+
+
+def _fold(line):
+    """Split a content line into 75-character pieces joined by CRLF + space"""
+    pieces = [line[i : i + 74] for i in range(0, len(line), 74)] or [""]
+    return "\r\n ".join(pieces) + "\r\n"
+
+
+def _event(uid, start, end, summary, stamp):
+    """A VEVENT covering the nights [start, end)"""
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART;VALUE=DATE:{start.strftime(ICAL_DATE)}",
+        f"DTEND;VALUE=DATE:{end.strftime(ICAL_DATE)}",
+        f"SUMMARY:{_escape(summary)}",
+        "END:VEVENT",
+    ]
+    return "".join(_fold(line) for line in lines)
+
+
+def ical_export(property_obj, domain):
+    """Yield a property's calendar as iCal text, one event at a time.
+
+    Confirmed bookings and blocked periods both export as busy, with no
+    guest details or blocking reasons. BlockedDate.end_date is inclusive, so its DTEND is the
+    day after.
+    """
+    from bookings.models import Booking
+
+    stamp = timezone.now().strftime("%Y%m%dT%H%M%SZ")
+    yield "".join(
+        _fold(line)
+        for line in [
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            f"PRODID:{ICAL_PRODID}",
+            "CALSCALE:GREGORIAN",
+            "METHOD:PUBLISH",
+            f"X-WR-CALNAME:{_escape(property_obj.title)}",
+        ]
+    )
+
+    bookings = (
+        Booking.objects.filter(
+            property_obj_id=property_obj.pk,
+            status=Booking.BookingStatus.CONFIRMED,
+        )
+        .order_by("check_in")
+        .values_list("id", "check_in", "check_out")
+    )
+    for booking_id, check_in, check_out in bookings.iterator():
+        yield _event(
+            f"booking-{booking_id}@{domain}", check_in, check_out, "Reserved", stamp
+        )
+
+    blocked = (
+        BlockedDate.objects.filter(property_id=property_obj.pk)
+        .order_by("start_date")
+        .values_list("id", "start_date", "end_date")
+    )
+    for blocked_id, start_date, end_date in blocked.iterator():
+        yield _event(
+            f"blocked-{blocked_id}@{domain}",
+            start_date,
+            end_date + timedelta(days=1),
+            BLOCKED_SUMMARY,
+            stamp,
+        )
+
+    yield _fold("END:VCALENDAR")
+
+
+def _parse_date(value):
+    """The day of a DATE or DATE-TIME value"""
+    return datetime.strptime(value[:8], ICAL_DATE).date()
+
+
+def parse_ical_periods(text):
+    """Blocked periods in an iCal document as (start, end, summary) tuples.
+
+    ``end`` is inclusive, like BlockedDate.end_date. Cancelled events and
+    events without a start are skipped.
+    """
+    periods = []
+    event = None
+    # Unfold continuation lines first
+    for line in re.sub(r"\r?\n[ \t]", "", text).splitlines():
+        if line == "BEGIN:VEVENT":
+            event = {}
+        elif line == "END:VEVENT":
+            if event is not None:
+                period = _event_period(event)
+                if period:
+                    periods.append(period)
+            event = None
+        elif event is not None and ":" in line:
+            name, value = line.split(":", 1)
+            event[name.split(";", 1)[0].upper()] = value
+
+    return periods
+
+
+def _event_period(event):
+    if "DTSTART" not in event or event.get("STATUS", "").upper() == "CANCELLED":
+        return None
+    try:
+        start = _parse_date(event["DTSTART"])
+        end = _parse_date(event["DTEND"]) if "DTEND" in event else start
+    except ValueError:
+        return None
+    # DTEND is exclusive; an event always blocks at least its first day
+    end = max(end - timedelta(days=1), start)
+    return start, end, _unescape(event.get("SUMMARY", ""))
+
+
+def apply_feed_periods(feed, periods):
+    """Make a feed's BlockedDate rows match its periods with bulk writes.
+
+    Rows whose (start, end) is still in the feed are kept; the rest are
+    deleted, and new periods are created in one INSERT. Periods that have
+    already ended are dropped. Returns ``(removed, added)``.
+    """
+    from .availability import refresh_availability_index
+
+    today = timezone.now().date()
+    wanted = {}
+    for start, end, summary in periods:
+        if end >= today:
+            wanted.setdefault((start, end), summary[:255] or feed.name)
+
+    with transaction.atomic():
+        # Serialise syncs of the same feed
+        CalendarFeed.objects.select_for_update().get(pk=feed.pk)
+        stale = []
+        for blocked_id, start, end in feed.blocked_dates.values_list(
+            "id", "start_date", "end_date"
+        ):
+            if wanted.pop((start, end), None) is None:
+                stale.append(blocked_id)
+
+        # Queryset delete and bulk_create skip BlockedDate.save/delete, so the
+        # index is refreshed once below
+        BlockedDate.objects.filter(pk__in=stale).delete()
+        BlockedDate.objects.bulk_create(
+            BlockedDate(
+                property_id=feed.property_id,
+                feed=feed,
+                start_date=start,
+                end_date=end,
+                reason=reason,
+            )
+            for (start, end), reason in sorted(wanted.items())
+        )
+        if stale or wanted:
+            refresh_availability_index(feed.property_id)
+    return len(stale), len(wanted)
+
+
+def check_feed_url(url):
+    """Raise CalendarFeedError unless url is http(s) on a public address.
+
+    Every address the host name resolves to is checked, so feeds can't
+    reach loopback, private, link-local or other internal addresses.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise CalendarFeedError("Calendar feeds must be http or https URLs.")
+    if settings.CALENDAR_FEED_ALLOW_PRIVATE_ADDRESSES:
+        return
+    try:
+        addresses = socket.getaddrinfo(
+            parts.hostname, parts.port or 443, proto=socket.IPPROTO_TCP
+        )
+    except (socket.gaierror, UnicodeError, ValueError):
+        raise CalendarFeedError(f"Could not resolve {parts.hostname}.")
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split("%", 1)[0])
+        if not address.is_global or address.is_multicast:
+            raise CalendarFeedError(
+                f"{parts.hostname} resolves to a non-public address."
+            )
+
+
+def fetch_feed(url, headers):
+    """GET a feed, re-checking each redirect and capping the body size.
+
+    Returns ``(response, body)``; body is None for a 304.
+    """
+    for _ in range(MAX_FEED_REDIRECTS + 1):
+        check_feed_url(url)
+        response = requests.get(
+            url,
+            headers=headers,
+            timeout=settings.CALENDAR_FEED_TIMEOUT,
+            allow_redirects=False,
+            stream=True,
+        )
+        if not response.is_redirect:
+            break
+        url = urljoin(url, response.headers["Location"])
+        response.close()
+    else:
+        raise CalendarFeedError("Too many redirects.")
+
+    with response:
+        if response.status_code == 304:
+            return response, None
+        response.raise_for_status()
+        limit = settings.CALENDAR_FEED_MAX_BYTES
+        body = bytearray()
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            body += chunk
+            if len(body) > limit:
+                raise CalendarFeedError(f"Feed is larger than {limit} bytes.")
+    return response, bytes(body)
+
+
+def _feed_charset(response):
+    """Charset named in the Content-Type, else UTF-8 as RFC 5545 specifies.
+
+    requests falls back to ISO-8859-1 for any text/* type without one, which
+    mangles non-ASCII event text.
+    """
+    header = Message()
+    header["Content-Type"] = response.headers.get("Content-Type", "")
+    return header.get_content_charset() or "utf-8"
+
+
+def sync_calendar_feed(feed):
+    """Fetch a feed and apply its changes; skipped when the feed's ETag matches"""
+    headers = {"If-None-Match": feed.etag} if feed.etag else {}
+    response, body = fetch_feed(feed.url, headers)
+    feed.last_synced_at = timezone.now()
+    feed.last_error = ""
+    if body is None:
+        feed.save(update_fields=["last_synced_at", "last_error"])
+        return 0, 0
+
+    text = body.decode(_feed_charset(response))
+    result = apply_feed_periods(feed, parse_ical_periods(text))
+    feed.etag = response.headers.get("ETag", "")[:255]
+    feed.save(update_fields=["etag", "last_synced_at", "last_error"])
+    return result
+
+
+def sync_all_calendar_feeds():
+    """Sync every calendar feed, recording failures on the feed"""
+    count = 0
+    for feed in CalendarFeed.objects.iterator():
+        try:
+            sync_calendar_feed(feed)
+        except Exception as error:
+            # One broken feed mustn't stop the others from syncing
+            CalendarFeed.objects.filter(pk=feed.pk).update(
+                last_error=str(error) or error.__class__.__name__
+            )
+            continue
+        count += 1
+    return count
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from properties.availability import compact_all_calendars
+
+
+class Command(BaseCommand):
+    help = "Merge adjacent, identical availability days into calendar runs"
+
+    def handle(self, *args, **options):
+        count = compact_all_calendars()
+        self.stdout.write(
+            self.style.SUCCESS(f"Removed {count} availability row(s).")
+        )
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from properties.availability import refresh_all_availability_indexes
+
+
+class Command(BaseCommand):
+    help = "Rebuild the availability bitmap for every property"
+
+    def handle(self, *args, **options):
+        count = refresh_all_availability_indexes()
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt availability index for {count} property(ies).")
+        )
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:53
+
+import django.db.models.deletion
+import properties.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AvailabilityIndex",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("window_start", models.DateField()),
+                ("window_end", models.DateField()),
+                ("nights", properties.models.BitStringField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "property",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="availability_index",
+                        to="properties.property",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Availability indexes",
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:55
+
+from django.db import migrations, models
+
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def _geohash_encode(latitude, longitude, precision=9):
+    """Frozen copy of properties.geo.geohash_encode at the time of this migration"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, value_range = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (value_range[0] + value_range[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            value_range[0] = mid
+        else:
+            bits <<= 1
+            value_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def backfill_geohash(apps, schema_editor):
+    Property = apps.get_model("properties", "Property")
+    for property_obj in Property.objects.only("id", "latitude", "longitude").iterator():
+        Property.objects.filter(pk=property_obj.pk).update(
+            geohash=_geohash_encode(
+                float(property_obj.latitude), float(property_obj.longitude)
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0002_availability_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="property",
+            name="geohash",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=12
+            ),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
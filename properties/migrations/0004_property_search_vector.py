@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:55
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+def backfill_search_vector(apps, schema_editor):
+    # Frozen copy of properties.search.property_search_vector at the time of
+    # this migration
+    SearchVector = django.contrib.postgres.search.SearchVector
+    Property = apps.get_model("properties", "Property")
+    Property.objects.update(
+        search_vector=SearchVector("title", weight="A", config="english")
+        + SearchVector("city", "country", weight="B", config="english")
+        + SearchVector("description", weight="C", config="english")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0003_property_geohash"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="property",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="property_search_vector_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+    ]
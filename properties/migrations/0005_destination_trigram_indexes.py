@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:56
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0004_property_search_vector"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="property",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper(
+                        django.db.models.functions.comparison.Cast(
+                            "city", output_field=models.TextField()
+                        )
+                    ),
+                    name="gin_trgm_ops",
+                ),
+                name="property_city_trgm_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper(
+                        django.db.models.functions.comparison.Cast(
+                            "country", output_field=models.TextField()
+                        )
+                    ),
+                    name="gin_trgm_ops",
+                ),
+                name="property_country_trgm_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:57
+
+import re
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations
+
+
+# Frozen copies of the properties.amenities helpers at the time of this
+# migration
+AMENITY_ALIASES = {
+    "wi_fi": "wifi",
+    "wireless": "wifi",
+    "internet": "wifi",
+    "free_parking": "parking",
+    "swimming_pool": "pool",
+    "air_conditioning": "ac",
+    "aircon": "ac",
+    "a_c": "ac",
+    "washing_machine": "washer",
+    "television": "tv",
+    "dedicated_workspace": "workspace",
+    "jacuzzi": "hot_tub",
+    "pet_friendly": "pets_allowed",
+    "pets": "pets_allowed",
+    "lift": "elevator",
+    "power_backup": "generator",
+}
+_TRUE_STRINGS = {"true", "yes", "y", "1", "on"}
+
+
+def _normalize_amenities(amenities):
+    """``{key: bool}`` with snake_case keys and aliases resolved, or None"""
+    if amenities is None:
+        return {}
+    if isinstance(amenities, (list, tuple)):
+        amenities = {name: True for name in amenities}
+    if not isinstance(amenities, dict):
+        return None
+
+    normalized = {}
+    for key, value in amenities.items():
+        key = re.sub(r"[^a-z0-9]+", "_", str(key).strip().lower()).strip("_")
+        key = AMENITY_ALIASES.get(key, key)
+        if not key:
+            continue
+        if isinstance(value, str):
+            value = value.strip().lower() in _TRUE_STRINGS
+        normalized[key] = normalized.get(key, False) or bool(value)
+    return normalized
+
+
+def normalize_existing_amenities(apps, schema_editor):
+    Property = apps.get_model("properties", "Property")
+    for property_obj in Property.objects.only("id", "amenities").iterator():
+        amenities = _normalize_amenities(property_obj.amenities)
+        if amenities is None:
+            amenities = {}
+        if amenities != property_obj.amenities:
+            Property.objects.filter(pk=property_obj.pk).update(amenities=amenities)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0005_destination_trigram_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="property",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["amenities"],
+                name="property_amenities_idx",
+                opclasses=["jsonb_path_ops"],
+            ),
+        ),
+        migrations.RunPython(normalize_existing_amenities, migrations.RunPython.noop),
+    ]
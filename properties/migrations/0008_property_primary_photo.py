@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_primary_photo(apps, schema_editor):
+    Property = apps.get_model("properties", "Property")
+    PropertyPhoto = apps.get_model("properties", "PropertyPhoto")
+    for property_id in Property.objects.values_list("id", flat=True).iterator():
+        photo = (
+            PropertyPhoto.objects.filter(property_id=property_id)
+            .order_by("-is_primary", "order", "created_at")
+            .first()
+        )
+        if photo:
+            Property.objects.filter(pk=property_id).update(primary_photo=photo)
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0007_property_rating_aggregates"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="propertyphoto",
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name="property",
+            name="primary_photo",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="properties.propertyphoto",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="propertyphoto",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_primary", True)),
+                fields=("property",),
+                name="unique_primary_photo_per_property",
+            ),
+        ),
+        migrations.RunPython(backfill_primary_photo, migrations.RunPython.noop),
+    ]
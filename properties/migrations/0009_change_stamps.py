@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0008_property_primary_photo"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="availability",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="propertyphoto",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:20
+
+from django.db import migrations, models
+
+
+def backfill_end_date(apps, schema_editor):
+    Availability = apps.get_model("properties", "Availability")
+    # Existing rows each cover a single day
+    Availability.objects.update(end_date=models.F("date"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0009_change_stamps"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="availability",
+            name="end_date",
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_end_date, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="availability",
+            name="end_date",
+            field=models.DateField(blank=True),
+        ),
+        migrations.AddConstraint(
+            model_name="availability",
+            constraint=models.CheckConstraint(
+                condition=models.Q(("end_date__gte", models.F("date"))),
+                name="availability_end_after_start",
+            ),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0010_availability_runs"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CalendarFeed",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(blank=True, max_length=100)),
+                ("url", models.URLField(max_length=500)),
+                ("etag", models.CharField(blank=True, editable=False, max_length=255)),
+                (
+                    "last_synced_at",
+                    models.DateTimeField(blank=True, editable=False, null=True),
+                ),
+                ("last_error", models.TextField(blank=True, editable=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "property",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="calendar_feeds",
+                        to="properties.property",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["created_at"],
+                "unique_together": {("property", "url")},
+            },
+        ),
+        migrations.AddField(
+            model_name="blockeddate",
+            name="feed",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="blocked_dates",
+                to="properties.calendarfeed",
+            ),
+        ),
+    ]
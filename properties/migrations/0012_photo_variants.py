@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0011_calendar_feeds"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="propertyphoto",
+            name="height",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="propertyphoto",
+            name="size",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="propertyphoto",
+            name="variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name="propertyphoto",
+            name="width",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
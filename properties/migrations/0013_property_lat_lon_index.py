@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0012_photo_variants"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                fields=["latitude", "longitude"], name="property_lat_lon_idx"
+            ),
+        ),
+    ]
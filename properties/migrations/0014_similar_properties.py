@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0013_property_lat_lon_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SimilarProperty",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.PositiveSmallIntegerField()),
+                ("score", models.FloatField()),
+                (
+                    "property",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="similar_properties",
+                        to="properties.property",
+                    ),
+                ),
+                (
+                    "similar",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="similar_to",
+                        to="properties.property",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Similar properties",
+                "ordering": ["property", "rank"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("property", "rank"), name="similar_property_rank_unique"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0014_similar_properties"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="property",
+            name="quality_score",
+            field=models.FloatField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+from django.db import migrations
+
+# Frozen copies of AvailabilityIndex.WINDOW_DAYS and the blocking booking
+# statuses at the time of this migration
+WINDOW_DAYS = 548
+BLOCKING_STATUSES = ["pending", "confirmed"]
+
+
+def _bitmap(apps, property_id, window_start, window_end):
+    """0/1 string of bookable nights, as properties.availability built it"""
+    Availability = apps.get_model("properties", "Availability")
+    BlockedDate = apps.get_model("properties", "BlockedDate")
+    Booking = apps.get_model("bookings", "Booking")
+
+    days = (window_end - window_start).days
+    bits = bytearray(b"0" * days)
+
+    def paint(start, end, bit):
+        start = max((start - window_start).days, 0)
+        end = min((end - window_start).days, days)
+        if start < end:
+            bits[start:end] = bit * (end - start)
+
+    open_runs = Availability.objects.filter(
+        property_id=property_id,
+        date__lt=window_end,
+        end_date__gte=window_start,
+        is_available=True,
+    ).values_list("date", "end_date")
+    for start_date, end_date in open_runs:
+        paint(start_date, end_date + timedelta(days=1), b"1")
+
+    blocked = BlockedDate.objects.filter(
+        property_id=property_id,
+        start_date__lt=window_end,
+        end_date__gte=window_start,
+    ).values_list("start_date", "end_date")
+    for start_date, end_date in blocked:
+        paint(start_date, end_date + timedelta(days=1), b"0")
+
+    booked = Booking.objects.filter(
+        property_obj_id=property_id,
+        status__in=BLOCKING_STATUSES,
+        check_in__lt=window_end,
+        check_out__gt=window_start,
+    ).values_list("check_in", "check_out")
+    for check_in, check_out in booked:
+        paint(check_in, check_out, b"0")
+
+    return bits.decode()
+
+
+def backfill_availability_index(apps, schema_editor):
+    """Build the bitmap for every property that doesn't have one yet"""
+    Property = apps.get_model("properties", "Property")
+    AvailabilityIndex = apps.get_model("properties", "AvailabilityIndex")
+
+    window_start = date.today()
+    window_end = window_start + timedelta(days=WINDOW_DAYS)
+    missing = Property.objects.filter(availability_index__isnull=True).values_list(
+        "id", flat=True
+    )
+    AvailabilityIndex.objects.bulk_create(
+        (
+            AvailabilityIndex(
+                property_id=property_id,
+                window_start=window_start,
+                window_end=window_end,
+                nights=_bitmap(apps, property_id, window_start, window_end),
+            )
+            for property_id in list(missing)
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0001_initial"),
+        ("properties", "0015_property_quality_score"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_availability_index, migrations.RunPython.noop),
+    ]
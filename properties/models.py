@@ -1,5 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
+from django.db.models.functions import Cast, Upper
 from accounts.models import User
 
 
@@ -42,7 +45,9 @@ class Property(models.Model):
     latitude = models.DecimalField(max_digits=9, decimal_places=6)
     longitude = models.DecimalField(max_digits=9, decimal_places=6)
     # Note: Location PointField would require GeoDjango/GDAL
-    # For now, we use latitude/longitude for geographic calculations
+    # For now, we use latitude/longitude for geographic calculations,
+    # prefiltered on a geohash cell index
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
 
     # Amenities (stored as JSON)
     amenities = models.JSONField(
@@ -87,6 +92,39 @@ class Property(models.Model):
         default=PropertyStatus.UNDER_REVIEW,
     )
 
+    # Photo shown on list cards, maintained by PropertyPhoto.save/delete
+    primary_photo = models.ForeignKey(
+        "PropertyPhoto",
+        on_delete=models.SET_NULL,
+        related_name="+",
+        blank=True,
+        null=True,
+        editable=False,
+    )
+
+    # Ratings, denormalised from visible guest-to-property reviews
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    cleanliness_sum = models.PositiveIntegerField(default=0, editable=False)
+    cleanliness_count = models.PositiveIntegerField(default=0, editable=False)
+    accuracy_sum = models.PositiveIntegerField(default=0, editable=False)
+    accuracy_count = models.PositiveIntegerField(default=0, editable=False)
+    communication_sum = models.PositiveIntegerField(default=0, editable=False)
+    communication_count = models.PositiveIntegerField(default=0, editable=False)
+    location_sum = models.PositiveIntegerField(default=0, editable=False)
+    location_count = models.PositiveIntegerField(default=0, editable=False)
+    value_sum = models.PositiveIntegerField(default=0, editable=False)
+    value_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Query-independent part of the relevance ordering (rating, price against
+    # the city median, freshness), refreshed by a periodic job and on save
+    # when SCORE_INPUT_FIELDS change
+    quality_score = models.FloatField(default=0, editable=False)
+    SCORE_INPUT_FIELDS = ["base_price", "city", "country", "status"]
+
+    # Full-text search document, maintained on save
+    search_vector = SearchVectorField(null=True, editable=False)
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -97,14 +135,103 @@ class Property(models.Model):
         indexes = [
             models.Index(fields=["status", "property_type"]),
             models.Index(fields=["city", "country"]),
+            GinIndex(fields=["search_vector"], name="property_search_vector_idx"),
+            # Serves amenities @> '{...}' containment filters
+            GinIndex(
+                fields=["amenities"],
+                opclasses=["jsonb_path_ops"],
+                name="property_amenities_idx",
+            ),
+            # Trigram indexes on UPPER(city::text) / UPPER(country::text), the
+            # expressions used by icontains and the "did you mean" fallback
+            GinIndex(
+                OpClass(
+                    Upper(Cast("city", output_field=models.TextField())),
+                    name="gin_trgm_ops",
+                ),
+                name="property_city_trgm_idx",
+            ),
+            GinIndex(
+                OpClass(
+                    Upper(Cast("country", output_field=models.TextField())),
+                    name="gin_trgm_ops",
+                ),
+                name="property_country_trgm_idx",
+            ),
+            # Map viewport (bounding box) queries
+            models.Index(
+                fields=["latitude", "longitude"], name="property_lat_lon_idx"
+            ),
         ]
 
     def __str__(self):
         return self.title
 
+    @property
+    def average_rating(self):
+        """Average overall rating, or None when there are no reviews"""
+        if not self.rating_count:
+            return None
+        return round(self.rating_sum / self.rating_count, 2)
+
+    def refresh_primary_photo(self):
+        """Point primary_photo at the primary photo, else the first photo"""
+        from .cache import invalidate_property_cache
+
+        photo = self.photos.order_by("-is_primary", "order", "created_at").first()
+        Property.objects.filter(pk=self.pk).update(primary_photo=photo)
+        self.primary_photo = photo
+        invalidate_property_cache(self.pk)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_score_inputs = instance._score_inputs()
+        return instance
+
+    def _score_inputs(self):
+        """Current SCORE_INPUT_FIELDS values, without loading deferred ones"""
+        return tuple(self.__dict__.get(name) for name in self.SCORE_INPUT_FIELDS)
+
     def save(self, *args, **kwargs):
-        """Override save method"""
+        """Override save method to keep the geohash and search vector in sync"""
+        from .availability import create_empty_availability_index
+        from .cache import invalidate_property_cache
+        from .geo import geohash_encode
+        from .ranking import refresh_quality_score
+
+        adding = self._state.adding
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geohash_encode(float(self.latitude), float(self.longitude))
         super().save(*args, **kwargs)
+        self.update_search_vector()
+        if adding:
+            # Date searches stay on the bitmap from the start rather than
+            # falling back to the calendar until the first calendar write
+            create_empty_availability_index(self.pk)
+        # New and repriced or moved listings are scored now rather than
+        # ranking with a stale score until the periodic refresh
+        score_inputs = self._score_inputs()
+        if adding or score_inputs != getattr(self, "_loaded_score_inputs", None):
+            self.quality_score = refresh_quality_score(self.pk)
+            self._loaded_score_inputs = score_inputs
+        invalidate_property_cache(self.pk)
+
+    def delete(self, *args, **kwargs):
+        from .cache import invalidate_property_cache
+
+        property_id = self.pk
+        result = super().delete(*args, **kwargs)
+        invalidate_property_cache(property_id)
+        return result
+
+    def update_search_vector(self):
+        """Recompute the stored full-text search document"""
+        from .search import property_search_vector
+
+        Property.objects.filter(pk=self.pk).update(
+            search_vector=property_search_vector()
+        )
 
 
 class PropertyPhoto(models.Model):
@@ -116,43 +243,138 @@ class PropertyPhoto(models.Model):
     image = models.ImageField(upload_to="properties/")
     is_primary = models.BooleanField(default=False)
     order = models.PositiveIntegerField(default=0)
+    # Filled in by the photo processing task
+    width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    size = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["order", "created_at"]
-        unique_together = [["property", "is_primary"]]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["property"],
+                condition=models.Q(is_primary=True),
+                name="unique_primary_photo_per_property",
+            )
+        ]
 
     def __str__(self):
         return f"{self.property.title} - Photo {self.order}"
 
     def save(self, *args, **kwargs):
         """Ensure only one primary photo per property"""
+        from .photos import delete_variants
+        from .tasks import process_property_photo
+
         if self.is_primary:
             PropertyPhoto.objects.filter(
                 property=self.property, is_primary=True
             ).exclude(pk=self.pk).update(is_primary=False)
+        # A new file needs its variants (re)built off the request path
+        image_changed = self._state.adding or not self.image._committed
+        if image_changed and not self._state.adding:
+            # The old image's variants are rebuilt, not overwritten in place
+            stale_variants = self.variants
+            storage = self.image.storage
+            transaction.on_commit(lambda: delete_variants(stale_variants, storage))
+            self.width = self.height = self.size = None
+            self.variants = {}
         super().save(*args, **kwargs)
+        self.property.refresh_primary_photo()
+        if image_changed:
+            transaction.on_commit(lambda: process_property_photo.delay(self.pk))
+
+    def delete(self, *args, **kwargs):
+        property_obj = self.property
+        result = super().delete(*args, **kwargs)
+        property_obj.refresh_primary_photo()
+        return result
 
 
 class Availability(models.Model):
-    """Property availability calendar"""
+    """Property availability calendar.
+
+    Each row is a run of days, ``date`` through ``end_date`` inclusive, that
+    share the same availability and price. Runs of a property never overlap.
+    """
 
     property = models.ForeignKey(
         Property, on_delete=models.CASCADE, related_name="availability"
     )
     date = models.DateField()
+    end_date = models.DateField(blank=True)
     is_available = models.BooleanField(default=True)
     price_override = models.DecimalField(
         max_digits=10, decimal_places=2, blank=True, null=True
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = [["property", "date"]]
         ordering = ["date"]
         indexes = [models.Index(fields=["property", "date", "is_available"])]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(end_date__gte=models.F("date")),
+                name="availability_end_after_start",
+            )
+        ]
+
+    def __str__(self):
+        if self.end_date == self.date:
+            return f"{self.property.title} - {self.date}"
+        return f"{self.property.title} - {self.date} to {self.end_date}"
+
+    def save(self, *args, **kwargs):
+        """Keep the availability index in sync with the calendar"""
+        from .availability import refresh_availability_index
+
+        # A row without an end date covers a single day
+        if self.end_date is None:
+            self.end_date = self.date
+        super().save(*args, **kwargs)
+        refresh_availability_index(self.property_id)
+
+    def delete(self, *args, **kwargs):
+        from .availability import refresh_availability_index
+
+        property_id = self.property_id
+        result = super().delete(*args, **kwargs)
+        refresh_availability_index(property_id)
+        return result
+
+
+class CalendarFeed(models.Model):
+    """External iCal calendar whose events block dates on a property"""
+
+    property = models.ForeignKey(
+        Property, on_delete=models.CASCADE, related_name="calendar_feeds"
+    )
+    name = models.CharField(max_length=100, blank=True)
+    url = models.URLField(max_length=500)
+    etag = models.CharField(max_length=255, blank=True, editable=False)
+    last_synced_at = models.DateTimeField(blank=True, null=True, editable=False)
+    last_error = models.TextField(blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        unique_together = [["property", "url"]]
 
     def __str__(self):
-        return f"{self.property.title} - {self.date}"
+        return f"{self.property.title} - {self.name or self.url}"
+
+    def delete(self, *args, **kwargs):
+        """The feed's blocked dates go with it, so refresh the index"""
+        from .availability import refresh_availability_index
+
+        property_id = self.property_id
+        result = super().delete(*args, **kwargs)
+        refresh_availability_index(property_id)
+        return result
 
 
 class BlockedDate(models.Model):
@@ -164,6 +386,15 @@ class BlockedDate(models.Model):
     start_date = models.DateField()
     end_date = models.DateField()
     reason = models.CharField(max_length=255, blank=True)
+    # Set on periods imported from a calendar feed, which owns them
+    feed = models.ForeignKey(
+        CalendarFeed,
+        on_delete=models.CASCADE,
+        related_name="blocked_dates",
+        blank=True,
+        null=True,
+        editable=False,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -178,3 +409,83 @@ class BlockedDate(models.Model):
 
         if self.end_date < self.start_date:
             raise ValidationError("End date must be after start date.")
+
+    def save(self, *args, **kwargs):
+        """Keep the availability index in sync with blocked periods"""
+        from .availability import refresh_availability_index
+
+        super().save(*args, **kwargs)
+        refresh_availability_index(self.property_id)
+
+    def delete(self, *args, **kwargs):
+        from .availability import refresh_availability_index
+
+        property_id = self.property_id
+        result = super().delete(*args, **kwargs)
+        refresh_availability_index(property_id)
+        return result
+
+
+class BitStringField(models.Field):
+    """PostgreSQL ``bit varying`` column exposed as a string of 0/1 characters"""
+
+    def db_type(self, connection):
+        return "varbit"
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return str(value)
+
+
+class AvailabilityIndex(models.Model):
+    """Bookable nights of a property packed into a rolling bitmap.
+
+    Bit ``i`` of ``nights`` is set when the night starting on
+    ``window_start + i`` days is open in the calendar, not blocked and not
+    taken by a pending or confirmed booking.
+    """
+
+    WINDOW_DAYS = 548  # ~18 months
+
+    property = models.OneToOneField(
+        Property, on_delete=models.CASCADE, related_name="availability_index"
+    )
+    window_start = models.DateField()
+    window_end = models.DateField()
+    nights = BitStringField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Availability indexes"
+
+    def __str__(self):
+        return f"{self.property_id} - {self.window_start} to {self.window_end}"
+
+
+class SimilarProperty(models.Model):
+    """One of a property's precomputed "similar listings", best first.
+
+    Rebuilt nightly by properties.similar.refresh_similar_properties.
+    """
+
+    property = models.ForeignKey(
+        Property, on_delete=models.CASCADE, related_name="similar_properties"
+    )
+    similar = models.ForeignKey(
+        Property, on_delete=models.CASCADE, related_name="similar_to"
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        verbose_name_plural = "Similar properties"
+        ordering = ["property", "rank"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["property", "rank"], name="similar_property_rank_unique"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.property_id} ~ {self.similar_id} (#{self.rank})"
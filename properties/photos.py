@@ -0,0 +1,156 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+from .cache import invalidate_property_cache
+from .models import Property, PropertyPhoto
+
+# Bounding boxes of the pre-sized derivatives; images are never upscaled
+PHOTO_VARIANTS = {
+    "thumb": (320, 320),
+    "card": (800, 600),
+    "hero": (1920, 1080),
+}
+VARIANT_QUALITY = 82
+
+
+def _render_variant(image, size):
+    """JPEG bytes of image scaled to fit within size"""
+    variant = image.copy()
+    variant.thumbnail(size, Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    variant.save(buffer, "JPEG", quality=VARIANT_QUALITY, optimize=True, progressive=True)
+    return variant.size, buffer.getvalue()
+
+
+def process_photo(photo_id):
+    """Record a photo's dimensions and write its thumb/card/hero variants.
+
+    Returns the variants written, or None when the photo or its file is gone.
+    A photo whose file isn't an image, or is a decompression bomb, is
+    deleted. Variants from an earlier run are removed first.
+    """
+    photo = (
+        PropertyPhoto.objects.filter(pk=photo_id)
+        .only("id", "property_id", "image", "variants")
+        .first()
+    )
+    if photo is None or not photo.image:
+        return None
+
+    storage = photo.image.storage
+    try:
+        with photo.image.open("rb") as original:
+            size = original.size
+            image = Image.open(original)
+            image = ImageOps.exif_transpose(image).convert("RGB")
+    except (UnidentifiedImageError, Image.DecompressionBombError):
+        # Direct uploads are only checked here: drop files that aren't images
+        # or would decode to more pixels than Pillow allows
+        storage.delete(photo.image.name)
+        PropertyPhoto.objects.get(pk=photo.pk).delete()
+        return None
+    except OSError:
+        return None
+
+    delete_variants(photo.variants, storage)
+    stem = os.path.splitext(os.path.basename(photo.image.name))[0]
+    variants = {}
+    for name, box in PHOTO_VARIANTS.items():
+        (width, height), content = _render_variant(image, box)
+        path = storage.save(
+            f"properties/variants/{stem}-{name}.jpg", ContentFile(content)
+        )
+        variants[name] = {
+            "name": path,
+            "width": width,
+            "height": height,
+            "size": len(content),
+        }
+
+    # update() skips PropertyPhoto.save, which would enqueue processing again
+    PropertyPhoto.objects.filter(pk=photo.pk).update(
+        width=image.width,
+        height=image.height,
+        size=size,
+        variants=variants,
+        updated_at=timezone.now(),
+    )
+    invalidate_property_cache(photo.property_id)
+    return variants
+
+
+def delete_variants(variants, storage):
+    """Remove a photo's variant files from storage"""
+    for variant in (variants or {}).values():
+        storage.delete(variant["name"])
+
+
+def photo_srcset(variants, storage):
+    """``srcset`` value listing each variant's URL and width"""
+    # Small originals give several variants of the same width; list one
+    by_width = {variant["width"]: variant["name"] for variant in variants.values()}
+    return ", ".join(
+        f"{storage.url(name)} {width}w" for width, name in sorted(by_width.items())
+    )
+
+
+def next_photo_order(property_obj):
+    """``order`` that puts a new photo after the property's existing ones"""
+    last_order = property_obj.photos.aggregate(last=Max("order"))["last"]
+    return 0 if last_order is None else last_order + 1
+
+
+def save_photo_batch(property_obj, files, primary=None):
+    """Store many uploads and create their PropertyPhoto rows together.
+
+    Files go to storage from a bounded thread pool. The rows are then
+    created with one bulk_create after the property's existing photos, and
+    ``primary`` (an index into ``files``) takes over as the primary photo.
+    Everything after the uploads happens in one transaction.
+    """
+    from .tasks import process_property_photo
+
+    field = PropertyPhoto._meta.get_field("image")
+    storage = field.storage
+
+    def upload(file):
+        return storage.save(field.generate_filename(None, file.name), file)
+
+    with ThreadPoolExecutor(
+        max_workers=min(settings.PROPERTY_PHOTO_UPLOAD_WORKERS, len(files))
+    ) as pool:
+        names = list(pool.map(upload, files))
+
+    try:
+        with transaction.atomic():
+            # Lock the property so concurrent batches don't share order values
+            Property.objects.select_for_update().only("id").get(pk=property_obj.pk)
+            if primary is not None:
+                property_obj.photos.filter(is_primary=True).update(is_primary=False)
+            first_order = next_photo_order(property_obj)
+            photos = PropertyPhoto.objects.bulk_create(
+                PropertyPhoto(
+                    property=property_obj,
+                    image=name,
+                    order=first_order + index,
+                    is_primary=index == primary,
+                )
+                for index, name in enumerate(names)
+            )
+            property_obj.refresh_primary_photo()
+    except Exception:
+        for name in names:
+            storage.delete(name)
+        raise
+
+    for photo in photos:
+        transaction.on_commit(
+            lambda photo_id=photo.pk: process_property_photo.delay(photo_id)
+        )
+    return photos
@@ -0,0 +1,190 @@
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from django.db.models import (
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce
+from .availability import overlap_nights
+from .models import Availability, Property
+
+CENT = Decimal("0.01")
+
+# Security deposit held against the nightly total (not part of the total)
+SECURITY_DEPOSIT_RATE = Decimal("0.10")
+
+
+def to_decimal(value):
+    """Decimal from a model value, going through str so floats stay exact"""
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value or 0))
+
+
+def to_money(amount):
+    """Round an amount to cents"""
+    return to_decimal(amount).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _spread_prices(runs, check_in, check_out, prices=None):
+    """Add each night of [check_in, check_out) inside a price run to prices"""
+    prices = {} if prices is None else prices
+    last_night = check_out - timedelta(days=1)
+    for start_date, end_date, price in runs:
+        night = max(start_date, check_in)
+        while night <= min(end_date, last_night):
+            prices[night] = price
+            night += timedelta(days=1)
+    return prices
+
+
+def price_overrides(property_id, check_in, check_out):
+    """Host-set nightly prices in [check_in, check_out), in one query"""
+    runs = Availability.objects.filter(
+        property_id=property_id,
+        date__lt=check_out,
+        end_date__gte=check_in,
+        price_override__isnull=False,
+    ).values_list("date", "end_date", "price_override")
+    return _spread_prices(runs, check_in, check_out)
+
+
+def price_overrides_for_stays(stays):
+    """Overrides for many (property_id, check_in, check_out) stays in one query.
+
+    Returns ``{property_id: {date: price}}``.
+    """
+    bounds = {}
+    for property_id, check_in, check_out in stays:
+        low, high = bounds.get(property_id, (check_in, check_out))
+        bounds[property_id] = (min(low, check_in), max(high, check_out))
+
+    ranges = Q()
+    for property_id, (check_in, check_out) in bounds.items():
+        ranges |= Q(property_id=property_id, date__lt=check_out, end_date__gte=check_in)
+    overrides = {}
+    if not ranges:
+        return overrides
+    rows = Availability.objects.filter(ranges, price_override__isnull=False)
+    for property_id, start_date, end_date, price in rows.values_list(
+        "property_id", "date", "end_date", "price_override"
+    ):
+        _spread_prices(
+            [(start_date, end_date, price)],
+            *bounds[property_id],
+            prices=overrides.setdefault(property_id, {}),
+        )
+    return overrides
+
+
+def load_priced_properties(property_ids):
+    """Properties with just the columns pricing and stay rules need"""
+    return Property.objects.only(
+        "id", "base_price", "cleaning_fee", "service_fee", "min_stay", "max_stay"
+    ).in_bulk(set(property_ids))
+
+
+class StayQuote:
+    """Itemised price of a stay: one rate per night plus the property's fees"""
+
+    def __init__(self, nightly, cleaning_fee, service_fee):
+        self.nightly = nightly
+        self.base_price = sum((night["price"] for night in nightly), Decimal("0.00"))
+        self.cleaning_fee = to_money(cleaning_fee)
+        self.service_fee = to_money(service_fee)
+        self.security_deposit = to_money(self.base_price * SECURITY_DEPOSIT_RATE)
+        self.total_price = self.base_price + self.cleaning_fee + self.service_fee
+
+    @property
+    def nights(self):
+        return len(self.nightly)
+
+    def as_dict(self):
+        return {
+            "base_price": str(self.base_price),
+            "cleaning_fee": str(self.cleaning_fee),
+            "service_fee": str(self.service_fee),
+            "security_deposit": str(self.security_deposit),
+            "total_price": str(self.total_price),
+            "nights": self.nights,
+            "nightly": [
+                {
+                    "date": night["date"].isoformat(),
+                    "price": str(night["price"]),
+                    "is_override": night["is_override"],
+                }
+                for night in self.nightly
+            ],
+        }
+
+
+def quote_stay(property_obj, check_in, check_out, overrides=None):
+    """Price every night of [check_in, check_out) exactly, in Decimal.
+
+    A night costs the price_override of the Availability run covering it
+    when the host set one and the property's base_price otherwise. Pass
+    ``overrides`` ({date: price}) to reuse rows already fetched for several
+    properties.
+    """
+    if overrides is None:
+        overrides = price_overrides(property_obj.pk, check_in, check_out)
+    base_rate = to_money(property_obj.base_price)
+
+    nightly = []
+    night = check_in
+    while night < check_out:
+        override = overrides.get(night)
+        nightly.append(
+            {
+                "date": night,
+                "price": base_rate if override is None else to_money(override),
+                "is_override": override is not None,
+            }
+        )
+        night += timedelta(days=1)
+    return StayQuote(nightly, property_obj.cleaning_fee, property_obj.service_fee)
+
+
+def stay_price_expression(check_in, check_out):
+    """quote_stay's nightly total as a SQL expression, for search results"""
+    nights = max((check_out - check_in).days, 0)
+    overrides = (
+        Availability.objects.filter(
+            property=OuterRef("pk"),
+            date__lt=check_out,
+            end_date__gte=check_in,
+            price_override__isnull=False,
+        )
+        .order_by()
+        .values("property")
+    )
+    run_nights = overlap_nights(check_in, check_out)
+    override_total = Subquery(
+        overrides.annotate(
+            total=Sum(
+                ExpressionWrapper(
+                    F("price_override") * run_nights,
+                    output_field=DecimalField(max_digits=12, decimal_places=2),
+                )
+            )
+        ).values("total")
+    )
+    override_nights = Subquery(
+        overrides.annotate(count=Sum(run_nights)).values("count")
+    )
+    return ExpressionWrapper(
+        F("base_price") * (nights - Coalesce(override_nights, 0))
+        + Coalesce(override_total, Value(Decimal("0.00"))),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def annotate_stay_price(queryset, check_in, check_out):
+    """Annotate each property with ``stay_price``, the nightly total of the stay"""
+    return queryset.annotate(stay_price=stay_price_expression(check_in, check_out))
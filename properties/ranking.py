@@ -0,0 +1,124 @@
+from django.conf import settings
+from django.db.models import Aggregate, F, FloatField, Value
+from django.db.models.functions import Cast, Upper
+from django.utils import timezone
+from .cache import invalidate_property_cache
+from .models import Property
+
+# Ratings are shrunk towards this average until a listing has a few reviews
+RATING_PRIOR_MEAN = 3.5
+RATING_PRIOR_COUNT = 5
+MAX_RATING = 5
+# Age at which a listing's freshness has halved
+FRESHNESS_HALF_LIFE_DAYS = 90
+# Distance at which the distance component has halved
+RELEVANCE_DISTANCE_SCALE_KM = 5.0
+
+
+class Median(Aggregate):
+    """PERCENTILE_CONT(0.5) over the expression"""
+
+    function = "PERCENTILE_CONT"
+    template = "%(function)s(0.5) WITHIN GROUP (ORDER BY %(expressions)s)"
+    output_field = FloatField()
+
+
+def quality_score(row, median_price, now):
+    """Weighted rating, price against the city median, and freshness of a listing"""
+    weights = settings.PROPERTY_RELEVANCE_WEIGHTS
+    rating = (row["rating_sum"] + RATING_PRIOR_MEAN * RATING_PRIOR_COUNT) / (
+        row["rating_count"] + RATING_PRIOR_COUNT
+    )
+    price = float(row["base_price"])
+    # 0.5 at the median, towards 1 for cheaper listings and 0 for dearer ones
+    price_score = median_price / (median_price + price) if price else 1.0
+    age_days = (now - row["created_at"]).total_seconds() / 86400
+    freshness = 0.5 ** (max(age_days, 0) / FRESHNESS_HALF_LIFE_DAYS)
+    return (
+        weights["rating"] * rating / MAX_RATING
+        + weights["price"] * price_score
+        + weights["freshness"] * freshness
+    )
+
+
+def refresh_quality_scores():
+    """Recompute ``quality_score`` for every active property.
+
+    City medians come from one grouped query; scores are written with
+    bulk_update, which leaves ``updated_at`` alone. Returns the number of
+    properties scored.
+    """
+    active = Property.objects.filter(
+        status=Property.PropertyStatus.ACTIVE
+    ).annotate(region=Upper("country"), town=Upper("city"))
+    medians = {
+        (row["region"], row["town"]): row["median"]
+        for row in active.order_by()
+        .values("region", "town")
+        .annotate(median=Median("base_price"))
+    }
+
+    now = timezone.now()
+    batch = []
+    count = 0
+    rows = active.values(
+        "id", "region", "town", "base_price", "rating_sum", "rating_count", "created_at"
+    )
+    for row in rows.iterator(chunk_size=1000):
+        median_price = medians[(row["region"], row["town"])]
+        batch.append(
+            Property(id=row["id"], quality_score=quality_score(row, median_price, now))
+        )
+        if len(batch) == 1000:
+            count += Property.objects.bulk_update(batch, ["quality_score"])
+            batch = []
+    if batch:
+        count += Property.objects.bulk_update(batch, ["quality_score"])
+
+    invalidate_property_cache()
+    return count
+
+
+def refresh_quality_score(property_id):
+    """Score one property against its city's current median price.
+
+    The median comes from the active listings of the city, or is the
+    property's own price when it is the first. Returns the score stored.
+    """
+    row = (
+        Property.objects.filter(pk=property_id)
+        .annotate(region=Upper("country"), town=Upper("city"))
+        .values(
+            "region", "town", "base_price", "rating_sum", "rating_count", "created_at"
+        )
+        .get()
+    )
+    median_price = (
+        Property.objects.filter(status=Property.PropertyStatus.ACTIVE)
+        .annotate(region=Upper("country"), town=Upper("city"))
+        .filter(region=row["region"], town=row["town"])
+        .aggregate(median=Median("base_price"))["median"]
+    )
+    if median_price is None:
+        median_price = float(row["base_price"])
+    score = quality_score(row, median_price, timezone.now())
+    Property.objects.filter(pk=property_id).update(quality_score=score)
+    return score
+
+
+def annotate_relevance(queryset):
+    """Annotate ``relevance``: the stored quality score plus the request's parts.
+
+    Text rank and distance only count when the search or location filter
+    annotated them.
+    """
+    weights = settings.PROPERTY_RELEVANCE_WEIGHTS
+    annotations = queryset.query.annotations
+    relevance = F("quality_score")
+    if "search_rank" in annotations:
+        relevance += weights["text"] * Cast("search_rank", FloatField())
+    if "distance" in annotations:
+        relevance += weights["distance"] / (
+            1 + F("distance") / Value(RELEVANCE_DISTANCE_SCALE_KM)
+        )
+    return queryset.annotate(relevance=relevance)
@@ -0,0 +1,112 @@
+import re
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramSimilarity,
+)
+from django.db import connection
+from django.db.models import F, Q, TextField
+from django.db.models.functions import Cast, Upper
+
+# Text search configuration used for both the stored vector and queries
+SEARCH_CONFIG = "english"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def property_search_vector():
+    """Weighted tsvector expression: title > city/country > description"""
+    return (
+        SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("city", "country", weight="B", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def build_search_query(text):
+    """Build a prefix-matching tsquery from free text, or None if empty.
+
+    Every word must match and each one may be a prefix, so results keep
+    narrowing as the user types. Text made only of stopwords (e.g. "the")
+    normalises to an empty tsquery, which matches nothing, so it also
+    returns None.
+    """
+    tokens = _TOKEN_RE.findall(text or "")
+    if not tokens:
+        return None
+    raw_query = " & ".join(f"{token}:*" for token in tokens)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT numnode(to_tsquery(%s::regconfig, %s))", [SEARCH_CONFIG, raw_query]
+        )
+        if not cursor.fetchone()[0]:
+            return None
+    return SearchQuery(raw_query, search_type="raw", config=SEARCH_CONFIG)
+
+
+def search_properties(queryset, text):
+    """Full-text search on the stored vector, annotated with ``search_rank``.
+
+    Text the full-text parser can't use (only stopwords or punctuation)
+    falls back to a substring match on the same fields.
+    """
+    query = build_search_query(text)
+    if query is None:
+        if not text:
+            return queryset
+        return queryset.filter(
+            Q(title__icontains=text)
+            | Q(description__icontains=text)
+            | Q(city__icontains=text)
+            | Q(country__icontains=text)
+        )
+    return queryset.filter(search_vector=query).annotate(
+        search_rank=SearchRank(F("search_vector"), query)
+    )
+
+
+def destination_expression(field_name):
+    """UPPER(field::text), the expression icontains compares on PostgreSQL.
+
+    The trigram GIN indexes on Property are built on this expression so
+    both substring and similarity matches can use them.
+    """
+    return Upper(Cast(field_name, output_field=TextField()))
+
+
+def filter_destination(queryset, field_name, value):
+    """Substring match on a destination field with a "did you mean" fallback.
+
+    When nothing contains the typed text (usually a misspelling), fall back
+    to trigram-similar destinations annotated with ``<field>_similarity`` so
+    the closest spellings rank first.
+    """
+    matches = queryset.filter(**{f"{field_name}__icontains": value})
+    if matches.exists():
+        return matches
+
+    expression = destination_expression(field_name)
+    term = value.upper()
+    return (
+        queryset.alias(**{f"{field_name}_upper": expression})
+        .filter(**{f"{field_name}_upper__trigram_similar": term})
+        .annotate(**{f"{field_name}_similarity": TrigramSimilarity(expression, term)})
+    )
+
+
+def destination_suggestions(queryset):
+    """Closest spelling for each destination filter that fell back to trigrams"""
+    suggestions = {}
+    for field_name in ["city", "country"]:
+        similarity = f"{field_name}_similarity"
+        if similarity not in queryset.query.annotations:
+            continue
+        value = (
+            queryset.order_by(f"-{similarity}")
+            .values_list(field_name, flat=True)
+            .first()
+        )
+        if value is not None:
+            suggestions[field_name] = value
+    return suggestions
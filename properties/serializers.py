@@ -1,17 +1,52 @@
+from datetime import date, timedelta
 from rest_framework import serializers
+from config.serializers import ExpandableFieldsMixin
+from config.uploads import FinalizeUploadSerializer
+from config.values import Computed, Nested
 from django.core.exceptions import ValidationError
-from django.core.files.images import get_image_dimensions
+from PIL import Image
 from accounts.serializers import UserPublicSerializer
-from .models import Property, PropertyPhoto, Availability, BlockedDate
+from .models import (
+    Property,
+    PropertyPhoto,
+    Availability,
+    AvailabilityIndex,
+    BlockedDate,
+    CalendarFeed,
+)
+from .availability import weekday_runs
+from .photos import photo_srcset
+from .pricing import to_money
+
+
+def format_stay_price(price):
+    """Stay total as a cents string, like the serializers' DecimalFields"""
+    return None if price is None else str(to_money(price))
 
 
 class PropertyPhotoSerializer(serializers.ModelSerializer):
     """Serializer for property photos"""
 
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = PropertyPhoto
-        fields = ["id", "image", "is_primary", "order"]
-        read_only_fields = ["id"]
+        fields = ["id", "image", "is_primary", "order", "width", "height", "srcset"]
+        read_only_fields = ["id", "width", "height"]
+
+    # Variants are stored names; URLs come from the photo storage
+    values_fields = {
+        "srcset": Computed(
+            ["variants"],
+            lambda variants: photo_srcset(
+                variants or {}, PropertyPhoto._meta.get_field("image").storage
+            ),
+        )
+    }
+
+    def get_srcset(self, obj):
+        """Empty until the processing task has built the variants"""
+        return photo_srcset(obj.variants, obj.image.storage)
 
     def validate_image(self, value):
         """Validate image file and ensure it has a proper filename with extension"""
@@ -64,10 +99,11 @@ class PropertyPhotoSerializer(serializers.ModelSerializer):
                         f"File extension '{ext}' is not allowed. Allowed extensions: {', '.join(allowed_extensions)}"
                     )
 
-        # Validate that it's actually an image
+        # Validate that it's actually an image. Image.open only parses the
+        # header; dimensions and variants come from the processing task.
         try:
             value.seek(0)
-            get_image_dimensions(value)
+            Image.open(value)
             value.seek(0)  # Reset for saving
         except Exception as e:
             raise serializers.ValidationError(f"Invalid image file: {str(e)}")
@@ -75,13 +111,50 @@ class PropertyPhotoSerializer(serializers.ModelSerializer):
         return value
 
 
-class PropertyListSerializer(serializers.ModelSerializer):
+# Largest number of photos one batch upload may carry
+MAX_BATCH_PHOTOS = 30
+
+
+class PropertyPhotoBatchSerializer(serializers.Serializer):
+    """Serializer for uploading several photos at once.
+
+    ``primary`` is the index of the upload to make the primary photo.
+    """
+
+    images = serializers.ListField(
+        child=serializers.ImageField(), allow_empty=False, max_length=MAX_BATCH_PHOTOS
+    )
+    primary = serializers.IntegerField(required=False, min_value=0)
+
+    def validate_images(self, value):
+        # Same filename and size checks as single uploads
+        photo_serializer = PropertyPhotoSerializer()
+        return [photo_serializer.validate_image(image) for image in value]
+
+    def validate(self, attrs):
+        if attrs.get("primary", 0) >= len(attrs["images"]):
+            raise serializers.ValidationError(
+                {"primary": "Must be the index of one of the images."}
+            )
+        return attrs
+
+
+class PhotoFinalizeSerializer(FinalizeUploadSerializer):
+    """Serializer for registering a directly uploaded property photo"""
+
+    is_primary = serializers.BooleanField(default=False)
+    order = serializers.IntegerField(required=False, min_value=0)
+
+
+class PropertyListSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     """Serializer for property list view"""
 
     primary_photo = serializers.SerializerMethodField()
     host = UserPublicSerializer(read_only=True)
     average_rating = serializers.SerializerMethodField()
     review_count = serializers.SerializerMethodField()
+    distance_km = serializers.SerializerMethodField()
+    stay_price = serializers.SerializerMethodField()
 
     class Meta:
         model = Property
@@ -100,25 +173,49 @@ class PropertyListSerializer(serializers.ModelSerializer):
             "bedrooms",
             "beds",
             "bathrooms",
+            "distance_km",
+            "stay_price",
         ]
 
+    # The method fields below, computed from columns for the values read path
+    values_fields = {
+        "primary_photo": Nested("primary_photo", PropertyPhotoSerializer),
+        "average_rating": Computed(
+            ["rating_sum", "rating_count"],
+            lambda total, count: round(total / count, 2) if count else None,
+        ),
+        "review_count": Computed(["rating_count"], lambda count: count),
+        "distance_km": Computed(
+            ["distance"],
+            lambda distance: None if distance is None else round(distance, 2),
+        ),
+        "stay_price": Computed(["stay_price"], format_stay_price),
+    }
+
     def get_primary_photo(self, obj):
-        primary = obj.photos.filter(is_primary=True).first()
-        if primary:
-            return PropertyPhotoSerializer(primary).data
-        # Return first photo if no primary
-        first_photo = obj.photos.first()
-        if first_photo:
-            return PropertyPhotoSerializer(first_photo).data
+        # Denormalised pointer (primary photo, else first photo); querysets
+        # should select_related("primary_photo") to avoid a query per row
+        if obj.primary_photo:
+            return PropertyPhotoSerializer(obj.primary_photo).data
         return None
 
     def get_average_rating(self, obj):
-        # This will be calculated from reviews
-        return None
+        # Stored on the property and kept up to date by Review.save
+        return obj.average_rating
 
     def get_review_count(self, obj):
-        # This will be calculated from reviews
-        return 0
+        return obj.rating_count
+
+    def get_stay_price(self, obj):
+        # Only set when the list was filtered by check_in/check_out
+        return format_stay_price(getattr(obj, "stay_price", None))
+
+    def get_distance_km(self, obj):
+        # Only set when the list was filtered by latitude/longitude
+        distance = getattr(obj, "distance", None)
+        if distance is None:
+            return None
+        return round(distance, 2)
 
 
 class PropertyDetailSerializer(serializers.ModelSerializer):
@@ -195,19 +292,122 @@ class PropertyCreateUpdateSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id"]
 
+    def validate_amenities(self, value):
+        """Store amenities as canonical {key: bool} pairs"""
+        from .amenities import normalize_amenities
+
+        try:
+            return normalize_amenities(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
     def create(self, validated_data):
         validated_data["host"] = self.context["request"].user
         return super().create(validated_data)
 
 
 class AvailabilitySerializer(serializers.ModelSerializer):
-    """Serializer for availability calendar"""
+    """Serializer for availability calendar runs (``end_date`` defaults to ``date``)"""
 
     class Meta:
         model = Availability
-        fields = ["id", "date", "is_available", "price_override"]
+        fields = ["id", "date", "end_date", "is_available", "price_override"]
         read_only_fields = ["id"]
 
+    def validate(self, attrs):
+        instance = self.instance
+        start_date = attrs.get("date", getattr(instance, "date", None))
+        end_date = attrs.get("end_date") or (
+            instance.end_date if instance and "date" not in attrs else start_date
+        )
+        if end_date < start_date:
+            raise serializers.ValidationError("End date must be on or after date.")
+        attrs["end_date"] = end_date
+
+        if instance:
+            property_id = instance.property_id
+        else:
+            property_id = self.context["view"].kwargs.get("property_pk")
+        overlapping = Availability.objects.filter(
+            property_id=property_id, date__lte=end_date, end_date__gte=start_date
+        )
+        if instance:
+            overlapping = overlapping.exclude(pk=instance.pk)
+        if overlapping.exists():
+            raise serializers.ValidationError(
+                "These dates overlap another calendar range. "
+                "Use the availability range endpoint to change them."
+            )
+        return attrs
+
+
+def expand_availability(runs, start_date=None, end_date=None):
+    """One entry per day for serialized calendar runs, within [start_date, end_date]"""
+    days = []
+    for run in runs:
+        day = date.fromisoformat(run["date"])
+        last = date.fromisoformat(run["end_date"])
+        if start_date:
+            day = max(day, start_date)
+        if end_date:
+            last = min(last, end_date)
+        while day <= last:
+            days.append(
+                {
+                    "id": run["id"],
+                    "date": day.isoformat(),
+                    "is_available": run["is_available"],
+                    "price_override": run["price_override"],
+                }
+            )
+            day += timedelta(days=1)
+    return days
+
+
+class AvailabilityRangeSerializer(serializers.Serializer):
+    """Serializer for setting availability over a date range.
+
+    ``start_date`` and ``end_date`` are inclusive. ``weekdays`` (0 = Monday)
+    limits the write to those days of the week, which splits it into one
+    run per week. Leaving out
+    ``price_override`` keeps the prices already set on existing days.
+    """
+
+    MAX_DAYS = AvailabilityIndex.WINDOW_DAYS
+
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    weekdays = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6),
+        required=False,
+        allow_empty=False,
+        max_length=7,
+    )
+    is_available = serializers.BooleanField(default=True)
+    price_override = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=0, required=False, allow_null=True
+    )
+
+    def validate(self, attrs):
+        start_date = attrs["start_date"]
+        end_date = attrs["end_date"]
+        if end_date < start_date:
+            raise serializers.ValidationError(
+                "End date must be on or after start date."
+            )
+
+        weekdays = attrs.get("weekdays")
+        if weekdays is not None and (end_date - start_date).days >= self.MAX_DAYS:
+            raise serializers.ValidationError(
+                f"A range with weekdays can cover at most {self.MAX_DAYS} days."
+            )
+        attrs["runs"] = weekday_runs(
+            start_date, end_date, None if weekdays is None else set(weekdays)
+        )
+        if not attrs["runs"]:
+            raise serializers.ValidationError("No days in the range match weekdays.")
+        return attrs
+
 
 class BlockedDateSerializer(serializers.ModelSerializer):
     """Serializer for blocked dates"""
@@ -224,3 +424,26 @@ class BlockedDateSerializer(serializers.ModelSerializer):
             )
         return attrs
 
+
+class CalendarFeedSerializer(serializers.ModelSerializer):
+    """Serializer for iCal feeds imported into blocked dates"""
+
+    class Meta:
+        model = CalendarFeed
+        fields = ["id", "name", "url", "last_synced_at", "last_error", "created_at"]
+        read_only_fields = ["id", "last_synced_at", "last_error", "created_at"]
+
+    def validate_url(self, value):
+        from .ical import CalendarFeedError, check_feed_url
+
+        try:
+            check_feed_url(value)
+        except CalendarFeedError as error:
+            raise serializers.ValidationError(str(error))
+        return value
+
+    def update(self, instance, validated_data):
+        # A cached ETag belongs to the old URL
+        if validated_data.get("url", instance.url) != instance.url:
+            instance.etag = ""
+        return super().update(instance, validated_data)
@@ -0,0 +1,133 @@
+from itertools import groupby
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Upper
+from .amenities import KNOWN_AMENITIES
+from .models import Property, SimilarProperty
+
+# Columns scaled to z-scores within a city before comparing
+NUMERIC_FEATURES = [
+    "base_price",
+    "max_guests",
+    "bedrooms",
+    "bathrooms",
+    "latitude",
+    "longitude",
+]
+# Weights of the one-hot parts relative to one standard deviation
+PROPERTY_TYPE_WEIGHT = 1.0
+AMENITY_WEIGHT = 0.5
+
+
+def feature_matrix(rows):
+    """One row per property: z-scored numeric columns, type and amenity one-hot"""
+    numeric = np.array(
+        [[float(row[name]) for name in NUMERIC_FEATURES] for row in rows]
+    )
+    # Prices are compared on a log scale, so 50 vs 100 counts like 500 vs 1000
+    numeric[:, 0] = np.log1p(numeric[:, 0])
+    spread = numeric.std(axis=0)
+    numeric = np.divide(
+        numeric - numeric.mean(axis=0),
+        spread,
+        out=np.zeros_like(numeric),
+        where=spread > 0,
+    )
+
+    types = [value for value, _ in Property.PropertyType.choices]
+    type_columns = PROPERTY_TYPE_WEIGHT * np.array(
+        [[row["property_type"] == value for value in types] for row in rows],
+        dtype=float,
+    )
+    amenity_columns = AMENITY_WEIGHT * np.array(
+        [
+            [bool((row["amenities"] or {}).get(name)) for name in KNOWN_AMENITIES]
+            for row in rows
+        ],
+        dtype=float,
+    )
+    return np.hstack([numeric, type_columns, amenity_columns])
+
+
+def nearest_neighbours(matrix, k, block_size=None):
+    """Top-k (index, distance) pairs for each row, nearest first.
+
+    Squared distances come from one matrix product per block of rows, so
+    memory stays at ``block_size x n`` however large the city is.
+    """
+    block_size = block_size or settings.SIMILAR_PROPERTIES_BLOCK_SIZE
+    count = len(matrix)
+    k = min(k, count - 1)
+    if k <= 0:
+        return [[] for _ in range(count)]
+
+    norms = np.einsum("ij,ij->i", matrix, matrix)
+    neighbours = []
+    for first in range(0, count, block_size):
+        block = matrix[first : first + block_size]
+        squared = norms[first : first + block_size, None] + norms - 2 * block @ matrix.T
+        np.maximum(squared, 0, out=squared)
+        rows = np.arange(len(block))
+        squared[rows, rows + first] = np.inf
+
+        nearest = np.argpartition(squared, k - 1, axis=1)[:, :k]
+        distances = np.take_along_axis(squared, nearest, axis=1)
+        # Order each row's k candidates by distance, then index for ties
+        order = np.lexsort((nearest, distances), axis=1)
+        nearest = np.take_along_axis(nearest, order, axis=1)
+        distances = np.sqrt(np.take_along_axis(distances, order, axis=1))
+        neighbours.extend(
+            list(zip(indexes.tolist(), row_distances.tolist()))
+            for indexes, row_distances in zip(nearest, distances)
+        )
+    return neighbours
+
+
+def _replace_similar(rows, k):
+    """Recompute and store the neighbours of one city's properties"""
+    ids = [row["id"] for row in rows]
+    neighbours = nearest_neighbours(feature_matrix(rows), k)
+    with transaction.atomic():
+        SimilarProperty.objects.filter(property_id__in=ids).delete()
+        SimilarProperty.objects.bulk_create(
+            [
+                SimilarProperty(
+                    property_id=property_id,
+                    similar_id=ids[other_index],
+                    rank=rank,
+                    score=round(1 / (1 + distance), 6),
+                )
+                for property_id, row_neighbours in zip(ids, neighbours)
+                for rank, (other_index, distance) in enumerate(row_neighbours, start=1)
+            ],
+            batch_size=1000,
+        )
+
+
+def refresh_similar_properties(k=None):
+    """Rebuild the top-k similar listings of every active property.
+
+    Properties are only compared with others in the same city and country,
+    one city at a time. Returns the number of properties processed.
+    """
+    k = k or settings.SIMILAR_PROPERTIES_COUNT
+    rows = (
+        Property.objects.filter(status=Property.PropertyStatus.ACTIVE)
+        .annotate(region=Upper("country"), town=Upper("city"))
+        .order_by("region", "town", "id")
+        .values("id", "region", "town", "property_type", "amenities", *NUMERIC_FEATURES)
+    )
+    count = 0
+    for _, city_rows in groupby(
+        rows.iterator(chunk_size=2000), key=lambda row: (row["region"], row["town"])
+    ):
+        city_rows = list(city_rows)
+        _replace_similar(city_rows, k)
+        count += len(city_rows)
+
+    # Listings that are no longer active keep no recommendations
+    SimilarProperty.objects.exclude(
+        property__status=Property.PropertyStatus.ACTIVE
+    ).delete()
+    return count
@@ -0,0 +1,36 @@
+from celery import shared_task
+from .availability import refresh_all_availability_indexes
+from .ical import sync_all_calendar_feeds
+from .photos import process_photo
+from .ranking import refresh_quality_scores
+from .similar import refresh_similar_properties
+
+
+@shared_task
+def refresh_availability_indexes():
+    """Roll every property's availability bitmap forward to today"""
+    return refresh_all_availability_indexes()
+
+
+@shared_task
+def sync_calendar_feeds():
+    """Pull every configured iCal feed into BlockedDate"""
+    return sync_all_calendar_feeds()
+
+
+@shared_task
+def process_property_photo(photo_id):
+    """Build a newly uploaded photo's pre-sized variants"""
+    return process_photo(photo_id)
+
+
+@shared_task
+def refresh_similar():
+    """Rebuild every active property's "similar listings" table"""
+    return refresh_similar_properties()
+
+
+@shared_task
+def refresh_quality():
+    """Recompute the stored part of every property's relevance score"""
+    return refresh_quality_scores()
@@ -1,10 +1,74 @@
 from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.contrib.auth import get_user_model
-from .models import Property, PropertyPhoto, Availability
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient
+import os
+import shutil
+import tempfile
+import threading
+from types import SimpleNamespace
+from unittest import mock
+from cloudinary.exceptions import NotFound
+from cloudinary.utils import api_sign_request
+from datetime import date, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import BytesIO
+import numpy as np
+from PIL import Image
+from bookings.models import Booking
+from .availability import (
+    compact_calendar,
+    filter_available_nights,
+    upsert_availability,
+)
+from .filters import PropertyFilter
+from .models import (
+    Property,
+    PropertyPhoto,
+    Availability,
+    AvailabilityIndex,
+    BlockedDate,
+    CalendarFeed,
+    SimilarProperty,
+)
+from .ical import (
+    CalendarFeedError,
+    parse_ical_periods,
+    sync_all_calendar_feeds,
+    sync_calendar_feed,
+)
+from .photos import process_photo
+from .pricing import annotate_stay_price, quote_stay
+from .serializers import PropertyPhotoSerializer
+from .similar import nearest_neighbours
+from .tasks import refresh_quality, refresh_similar
 
 User = get_user_model()
 
 
+def create_property(host, **fields):
+    """A listing with test defaults, overridden by ``fields``"""
+    defaults = {
+        "title": "Test Property",
+        "description": "Test Description",
+        "address": "123 Test St",
+        "city": "Test City",
+        "country": "Test Country",
+        "latitude": 6.5244,
+        "longitude": 3.3792,
+        "base_price": 100.00,
+        "max_guests": 4,
+        "bedrooms": 2,
+        "beds": 2,
+        "bathrooms": 1.0,
+    }
+    return Property.objects.create(host=host, **{**defaults, **fields})
+
+
 class PropertyModelTest(TestCase):
     """Test Property model"""
 
@@ -42,3 +106,1586 @@ class PropertyModelTest(TestCase):
     def test_property_price_calculation(self):
         """Test property price fields"""
         self.assertEqual(self.property.base_price, 100.00)
+
+
+class AvailabilityIndexTest(TestCase):
+    """Test the availability bitmap used by date searches"""
+
+    def setUp(self):
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        self.property = create_property(
+            self.host,
+            property_type=Property.PropertyType.APARTMENT,
+        )
+        self.start = date.today() + timedelta(days=10)
+        for offset in range(7):
+            Availability.objects.create(
+                property=self.property, date=self.start + timedelta(days=offset)
+            )
+
+    def search(self, check_in, check_out):
+        return PropertyFilter(
+            data={"check_in": check_in, "check_out": check_out},
+            queryset=Property.objects.all(),
+        ).qs
+
+    def test_every_night_open(self):
+        """A stay inside the open calendar matches"""
+        results = self.search(self.start, self.start + timedelta(days=7))
+        self.assertIn(self.property, results)
+
+    def test_gap_in_the_middle_of_stay(self):
+        """A closed night between check-in and check-out excludes the property"""
+        night = Availability.objects.get(
+            property=self.property, date=self.start + timedelta(days=3)
+        )
+        night.is_available = False
+        night.save()
+        results = self.search(self.start, self.start + timedelta(days=7))
+        self.assertNotIn(self.property, results)
+
+    def test_blocked_dates_and_bookings(self):
+        """Blocked periods and bookings take nights out of the index"""
+        blocked = BlockedDate.objects.create(
+            property=self.property,
+            start_date=self.start + timedelta(days=1),
+            end_date=self.start + timedelta(days=1),
+        )
+        self.assertNotIn(
+            self.property, self.search(self.start, self.start + timedelta(days=3))
+        )
+        blocked.delete()
+        self.assertIn(
+            self.property, self.search(self.start, self.start + timedelta(days=3))
+        )
+
+        Booking.objects.create(
+            property_obj=self.property,
+            guest=self.host,
+            check_in=self.start + timedelta(days=4),
+            check_out=self.start + timedelta(days=6),
+            guest_count=1,
+            base_price=200,
+            total_price=200,
+        )
+        self.assertIn(
+            self.property, self.search(self.start, self.start + timedelta(days=4))
+        )
+        self.assertNotIn(
+            self.property, self.search(self.start, self.start + timedelta(days=5))
+        )
+
+    def test_new_property_starts_with_an_empty_index(self):
+        """A new listing is indexed with every night closed"""
+        new_property = create_property(self.host, title="New Property")
+        index = AvailabilityIndex.objects.get(property=new_property)
+        self.assertEqual(index.nights, "0" * AvailabilityIndex.WINDOW_DAYS)
+        self.assertNotIn(
+            new_property, self.search(self.start, self.start + timedelta(days=1))
+        )
+
+    def test_unindexed_properties_use_the_calendar(self):
+        """A missing or stale bitmap falls back to the calendar rows"""
+        stay = (self.start, self.start + timedelta(days=7))
+        AvailabilityIndex.objects.filter(property=self.property).update(
+            window_start=self.start + timedelta(days=1)
+        )
+        self.assertIn(self.property, self.search(*stay))
+
+        AvailabilityIndex.objects.filter(property=self.property).delete()
+        self.assertIn(self.property, self.search(*stay))
+        self.assertNotIn(
+            self.property, self.search(self.start, self.start + timedelta(days=8))
+        )
+
+
+class NearbySearchTest(TestCase):
+    """Test radius search on the geohash index"""
+
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        # Lagos Island, Ikeja (~15km away) and Ibadan (~110km away)
+        self.island = self.create_property("Island", 6.4550, 3.3941)
+        self.ikeja = self.create_property("Ikeja", 6.6018, 3.3515)
+        self.ibadan = self.create_property("Ibadan", 7.3775, 3.9470)
+
+    def create_property(self, title, latitude, longitude):
+        return create_property(
+            self.host,
+            title=title,
+            city=title,
+            country="Nigeria",
+            latitude=latitude,
+            longitude=longitude,
+            status=Property.PropertyStatus.ACTIVE,
+        )
+
+    def test_geohash_set_on_save(self):
+        """Coordinates are encoded into the geohash column"""
+        self.assertEqual(len(self.island.geohash), 9)
+        self.assertTrue(self.island.geohash.startswith("s1"))
+
+    def test_radius_and_distance_ordering(self):
+        """Only properties inside the radius are returned, nearest first"""
+        response = self.client.get(
+            "/api/properties/",
+            {
+                "latitude": 6.4550,
+                "longitude": 3.3941,
+                "radius_km": 20,
+                "ordering": "distance",
+            },
+        )
+        results = response.data["results"]
+        self.assertEqual([r["title"] for r in results], ["Island", "Ikeja"])
+        self.assertEqual(results[0]["distance_km"], 0)
+        self.assertAlmostEqual(results[1]["distance_km"], 17, delta=2)
+
+    def test_distance_ordering_without_coordinates(self):
+        """ordering=distance is ignored when no location was given"""
+        response = self.client.get("/api/properties/", {"ordering": "distance"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data["results"][0]["distance_km"])
+
+
+class FullTextSearchTest(TestCase):
+    """Test full-text property search"""
+
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        self.beach_title = self.create_property(
+            "Beach house", "Quiet place near the shops", "Lekki"
+        )
+        self.beach_description = self.create_property(
+            "Family home", "Short walk to the beach", "Ikeja"
+        )
+        self.other = self.create_property("City loft", "Downtown views", "Abuja")
+
+    def create_property(self, title, description, city):
+        return create_property(
+            self.host,
+            title=title,
+            description=description,
+            city=city,
+            country="Nigeria",
+            status=Property.PropertyStatus.ACTIVE,
+        )
+
+    def test_search_ranks_title_matches_first(self):
+        """Title matches outrank description matches"""
+        response = self.client.get("/api/properties/", {"search": "beach"})
+        titles = [r["title"] for r in response.data["results"]]
+        self.assertEqual(titles, ["Beach house", "Family home"])
+
+    def test_stopword_search_matches_substrings(self):
+        """A search made only of stopwords falls back to a substring match"""
+        response = self.client.get("/api/properties/", {"search": "the"})
+        titles = [r["title"] for r in response.data["results"]]
+        self.assertCountEqual(titles, ["Beach house", "Family home"])
+
+    def test_search_matches_prefixes(self):
+        """Partially typed words still match"""
+        response = self.client.get("/api/properties/", {"search": "lek"})
+        titles = [r["title"] for r in response.data["results"]]
+        self.assertEqual(titles, ["Beach house"])
+
+
+class DestinationMatchTest(TestCase):
+    """Test city/country matching with the trigram fallback"""
+
+    def setUp(self):
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        for city in ["Lagos", "Abuja", "Accra"]:
+            create_property(
+                self.host,
+                title=f"Stay in {city}",
+                city=city,
+                country="Nigeria",
+            )
+
+    def test_substring_match(self):
+        """Partial city names still match case-insensitively"""
+        qs = PropertyFilter(data={"city": "lag"}, queryset=Property.objects.all()).qs
+        self.assertEqual([p.city for p in qs], ["Lagos"])
+
+    def test_misspelled_city_falls_back_to_similar(self):
+        """A misspelt destination returns the closest spelling"""
+        qs = PropertyFilter(data={"city": "Lagoss"}, queryset=Property.objects.all()).qs
+        self.assertEqual([p.city for p in qs], ["Lagos"])
+        self.assertGreater(qs[0].city_similarity, 0.3)
+
+    def test_fallback_reports_suggestion(self):
+        """Fuzzy matches tell the client which spelling was used"""
+        cache.clear()
+        Property.objects.update(status=Property.PropertyStatus.ACTIVE)
+        response = self.client.get("/api/properties/", {"city": "Lagoss"})
+        self.assertEqual(response.data["did_you_mean"], {"city": "Lagos"})
+        self.assertEqual(response.data["count"], 1)
+
+        response = self.client.get("/api/properties/", {"city": "lag"})
+        self.assertNotIn("did_you_mean", response.data)
+
+
+class AmenityFilterTest(TestCase):
+    """Test amenity normalisation and containment filtering"""
+
+    def setUp(self):
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.host)
+        self.payload = {
+            "title": "Test Property",
+            "description": "Test Description",
+            "property_type": Property.PropertyType.APARTMENT,
+            "address": "123 Test St",
+            "city": "Test City",
+            "country": "Test Country",
+            "latitude": "6.524400",
+            "longitude": "3.379200",
+            "base_price": "100.00",
+            "max_guests": 4,
+            "bedrooms": 2,
+            "beds": 2,
+            "bathrooms": "1.0",
+        }
+
+    def create_property(self, amenities):
+        response = self.client.post(
+            "/api/properties/", {**self.payload, "amenities": amenities}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        return Property.objects.get(id=response.data["id"])
+
+    def test_amenity_keys_normalised_on_save(self):
+        """Amenity spellings are stored as canonical boolean keys"""
+        property_obj = self.create_property(
+            {"Wi-Fi": True, "Swimming Pool": "yes", "Air Conditioning": False}
+        )
+        self.assertEqual(
+            property_obj.amenities, {"wifi": True, "pool": True, "ac": False}
+        )
+
+    def test_multi_amenity_filter(self):
+        """Every listed amenity must be present"""
+        full = self.create_property(["wifi", "pool", "parking"])
+        partial = self.create_property(["wifi", "pool"])
+        qs = PropertyFilter(
+            data={"amenities": "WiFi, pool,parking"}, queryset=Property.objects.all()
+        ).qs
+        self.assertEqual(list(qs), [full])
+        qs = PropertyFilter(
+            data={"amenities": "wifi,pool"}, queryset=Property.objects.all()
+        ).qs
+        self.assertCountEqual(qs, [full, partial])
+
+
+class FacetCountTest(TestCase):
+    """Test facet counts for property searches"""
+
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        listings = [
+            (Property.PropertyType.APARTMENT, 40, 1, {"wifi": True}),
+            (Property.PropertyType.APARTMENT, 150, 2, {"wifi": True, "pool": True}),
+            (Property.PropertyType.VILLA, 600, 6, {"pool": True}),
+        ]
+        for property_type, price, bedrooms, amenities in listings:
+            create_property(
+                self.host,
+                property_type=property_type,
+                city="Lagos",
+                country="Nigeria",
+                base_price=price,
+                bedrooms=bedrooms,
+                beds=bedrooms,
+                amenities=amenities,
+                status=Property.PropertyStatus.ACTIVE,
+            )
+
+    def test_facets_in_one_query(self):
+        """All facets are counted with a single aggregate query"""
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/properties/facets/", {"min_guests": 2})
+        data = response.data
+        self.assertEqual(data["total"], 3)
+        self.assertEqual(data["property_type"]["apartment"], 2)
+        self.assertEqual(data["property_type"]["villa"], 1)
+        self.assertEqual(data["price"]["0-50"], 1)
+        self.assertEqual(data["price"]["500+"], 1)
+        self.assertEqual(data["bedrooms"]["5+"], 1)
+        self.assertEqual(data["amenities"]["wifi"], 2)
+        self.assertEqual(data["amenities"]["pool"], 2)
+
+    def test_facets_follow_filters(self):
+        """Facets are computed over the filtered listings only"""
+        response = self.client.get(
+            "/api/properties/facets/",
+            {"property_type": "apartment", "facets": "price"},
+        )
+        self.assertEqual(response.data["total"], 2)
+        self.assertEqual(set(response.data), {"total", "price"})
+
+    def test_property_changes_refresh_cached_facets(self):
+        """Saving a listing retires the cached facet counts"""
+        self.assertEqual(self.client.get("/api/properties/facets/").data["total"], 3)
+        villa = Property.objects.get(property_type=Property.PropertyType.VILLA)
+        villa.status = Property.PropertyStatus.INACTIVE
+        with self.captureOnCommitCallbacks(execute=True):
+            villa.save()
+        self.assertEqual(self.client.get("/api/properties/facets/").data["total"], 2)
+
+
+class PriceHistogramTest(TestCase):
+    """Test the price distribution endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        listings = [
+            (Property.PropertyType.APARTMENT, 50),
+            (Property.PropertyType.APARTMENT, 100),
+            (Property.PropertyType.APARTMENT, 150),
+            (Property.PropertyType.VILLA, 450),
+        ]
+        for property_type, price in listings:
+            create_property(
+                self.host,
+                property_type=property_type,
+                city="Lagos",
+                country="Nigeria",
+                base_price=price,
+                status=Property.PropertyStatus.ACTIVE,
+            )
+
+    def test_histogram_in_one_query(self):
+        """Buckets, range and percentiles come from a single query"""
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                "/api/properties/price-histogram/", {"buckets": 4}
+            )
+        data = response.data
+        self.assertEqual(data["total"], 4)
+        self.assertEqual(data["min"], Decimal("50.00"))
+        self.assertEqual(data["max"], Decimal("450.00"))
+        self.assertEqual(data["percentiles"]["p50"], Decimal("125.00"))
+        self.assertEqual(
+            [(b["min"], b["count"]) for b in data["buckets"]],
+            [
+                (Decimal("50.00"), 2),
+                (Decimal("150.00"), 1),
+                (Decimal("250.00"), 0),
+                (Decimal("350.00"), 1),
+            ],
+        )
+        # Served from the cache the second time
+        with self.assertNumQueries(0):
+            self.client.get("/api/properties/price-histogram/", {"buckets": 4})
+
+    def test_histogram_follows_filters(self):
+        """Only listings matching the filters are counted"""
+        response = self.client.get(
+            "/api/properties/price-histogram/", {"property_type": "villa"}
+        )
+        data = response.data
+        self.assertEqual(data["total"], 1)
+        self.assertEqual(len(data["buckets"]), 1)
+        self.assertEqual(data["buckets"][0]["count"], 1)
+
+        response = self.client.get(
+            "/api/properties/price-histogram/", {"min_price": 1000}
+        )
+        self.assertEqual(response.data["total"], 0)
+        self.assertEqual(response.data["buckets"], [])
+
+
+class MapClusterTest(TestCase):
+    """Test clustered map markers for a viewport"""
+
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        # Two listings on Lagos Island, one in Ikeja, one in Abuja
+        listings = [
+            ("Island", 6.4550, 3.3941, 120, Property.PropertyType.APARTMENT),
+            ("Island 2", 6.4552, 3.3943, 80, Property.PropertyType.VILLA),
+            ("Ikeja", 6.6018, 3.3515, 60, Property.PropertyType.APARTMENT),
+            ("Abuja", 9.0765, 7.3986, 200, Property.PropertyType.APARTMENT),
+        ]
+        for title, latitude, longitude, price, property_type in listings:
+            create_property(
+                self.host,
+                title=title,
+                property_type=property_type,
+                city="Lagos",
+                country="Nigeria",
+                latitude=latitude,
+                longitude=longitude,
+                base_price=price,
+                status=Property.PropertyStatus.ACTIVE,
+            )
+        self.lagos_bbox = "3.2,6.3,3.5,6.7"
+
+    def test_clusters_in_one_query(self):
+        """Listings in the viewport are grouped per cell with one query"""
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                "/api/properties/map/", {"bbox": self.lagos_bbox, "zoom": 10}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["pins"], [])
+        clusters = response.data["clusters"]
+        self.assertEqual(sum(cluster["count"] for cluster in clusters), 3)
+        island = max(clusters, key=lambda cluster: cluster["count"])
+        self.assertEqual(island["count"], 2)
+        self.assertEqual(island["min_price"], Decimal("80.00"))
+        self.assertAlmostEqual(island["latitude"], 6.4551, places=4)
+
+    def test_pins_at_high_zoom_follow_filters(self):
+        """High zooms list individual listings, narrowed by the search filters"""
+        response = self.client.get(
+            "/api/properties/map/",
+            {"bbox": self.lagos_bbox, "zoom": 16, "property_type": "apartment"},
+        )
+        self.assertEqual(response.data["clusters"], [])
+        titles = sorted(pin["title"] for pin in response.data["pins"])
+        self.assertEqual(titles, ["Ikeja", "Island"])
+
+    def test_invalid_viewport(self):
+        """A malformed bbox or zoom is rejected"""
+        response = self.client.get("/api/properties/map/", {"bbox": "1,2,3", "zoom": 5})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(
+            "/api/properties/map/", {"bbox": self.lagos_bbox, "zoom": "far"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class SimilarPropertyTest(TestCase):
+    """Test the precomputed similar listings"""
+
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        self.flat = self.create_property("Flat", "Lagos", "apartment", 100, 2)
+        self.twin = self.create_property("Twin flat", "lagos", "apartment", 110, 2)
+        self.villa = self.create_property("Villa", "Lagos", "villa", 900, 6)
+        self.abuja = self.create_property("Abuja flat", "Abuja", "apartment", 100, 2)
+
+    def create_property(self, title, city, property_type, price, bedrooms):
+        return create_property(
+            self.host,
+            title=title,
+            property_type=property_type,
+            city=city,
+            country="Nigeria",
+            base_price=price,
+            max_guests=bedrooms * 2,
+            bedrooms=bedrooms,
+            beds=bedrooms,
+            amenities={"wifi": True},
+            status=Property.PropertyStatus.ACTIVE,
+        )
+
+    def test_neighbours_ranked_within_city(self):
+        """The closest listing in the same city ranks first"""
+        self.assertEqual(refresh_similar(), 4)
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/properties/{self.flat.id}/similar/")
+        self.assertEqual(
+            [row["title"] for row in response.data], ["Twin flat", "Villa"]
+        )
+        self.assertFalse(SimilarProperty.objects.filter(property=self.abuja).exists())
+
+    def test_blocks_match_full_scan(self):
+        """Block-wise top-k agrees with a brute-force scan of every pair"""
+        matrix = np.random.default_rng(7).normal(size=(23, 5))
+        expected = []
+        for index, vector in enumerate(matrix):
+            distances = np.linalg.norm(matrix - vector, axis=1)
+            distances[index] = np.inf
+            expected.append(np.argsort(distances, kind="stable")[:4].tolist())
+        for block_size in (1, 5, 64):
+            neighbours = nearest_neighbours(matrix, 4, block_size=block_size)
+            self.assertEqual(
+                [[other for other, _ in row] for row in neighbours], expected
+            )
+
+    def test_inactive_listings_dropped(self):
+        """Listings that go inactive leave the table on the next run"""
+        self.twin.status = Property.PropertyStatus.INACTIVE
+        self.twin.save()
+        refresh_similar()
+        response = self.client.get(f"/api/properties/{self.flat.id}/similar/")
+        self.assertEqual([row["title"] for row in response.data], ["Villa"])
+        self.assertFalse(SimilarProperty.objects.filter(similar=self.twin).exists())
+
+
+class RelevanceOrderingTest(TestCase):
+    """Test ?ordering=relevance"""
+
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        # A well-reviewed bargain far from the search point, and an
+        # unreviewed, pricier listing right next to it
+        self.favourite = self.create_property("Favourite", 6.6018, 3.3515, 80, 50, 10)
+        self.nearby = self.create_property("Nearby", 6.4550, 3.3941, 120, 0, 0)
+
+    def create_property(
+        self, title, latitude, longitude, price, rating_sum, rating_count
+    ):
+        return create_property(
+            self.host,
+            title=title,
+            city="Lagos",
+            country="Nigeria",
+            latitude=latitude,
+            longitude=longitude,
+            base_price=price,
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            status=Property.PropertyStatus.ACTIVE,
+        )
+
+    def titles(self, params):
+        response = self.client.get("/api/properties/", params)
+        return [row["title"] for row in response.data["results"]]
+
+    def test_stored_score_orders_listings(self):
+        """Rating and price against the city median decide without a query"""
+        self.assertEqual(refresh_quality(), 2)
+        self.favourite.refresh_from_db()
+        self.nearby.refresh_from_db()
+        self.assertGreater(self.favourite.quality_score, self.nearby.quality_score)
+        self.assertEqual(self.titles({"ordering": "relevance"}), ["Favourite", "Nearby"])
+        self.assertEqual(self.titles({"ordering": "-relevance"}), ["Nearby", "Favourite"])
+        self.assertEqual(
+            self.titles({"search": "nearby", "ordering": "relevance"}), ["Nearby"]
+        )
+
+    def test_saves_score_new_and_repriced_listings(self):
+        """A new or repriced listing is scored without waiting for the job"""
+        self.assertGreater(self.favourite.quality_score, 0)
+        self.assertEqual(self.titles({"ordering": "relevance"}), ["Favourite", "Nearby"])
+
+        self.nearby.base_price = 20
+        self.nearby.save()
+        self.nearby.refresh_from_db()
+        repriced = self.nearby.quality_score
+        self.assertEqual(refresh_quality(), 2)
+        self.nearby.refresh_from_db()
+        self.assertAlmostEqual(self.nearby.quality_score, repriced, places=6)
+
+    def test_cursor_pages_most_relevant_first(self):
+        """Cursor pagination orders relevance the same way as page numbers"""
+        refresh_quality()
+        self.assertEqual(
+            self.titles({"ordering": "relevance", "pagination": "cursor"}),
+            ["Favourite", "Nearby"],
+        )
+
+    def test_distance_blended_per_request(self):
+        """A location search adds closeness on top of the stored score"""
+        refresh_quality()
+        params = {
+            "latitude": 6.4550,
+            "longitude": 3.3941,
+            "radius_km": 50,
+            "ordering": "relevance",
+        }
+        self.assertEqual(self.titles(params), ["Nearby", "Favourite"])
+
+
+class PrimaryPhotoTest(TestCase):
+    """Test the denormalised primary photo pointer"""
+
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        self.properties = [
+            create_property(
+                self.host,
+                title=f"Property {i}",
+                status=Property.PropertyStatus.ACTIVE,
+            )
+            for i in range(5)
+        ]
+        for property_obj in self.properties:
+            for order in range(3):
+                PropertyPhoto.objects.create(
+                    property=property_obj,
+                    image=f"properties/{property_obj.pk}-{order}.jpg",
+                    order=order,
+                )
+
+    def test_pointer_follows_primary_flag(self):
+        """The pointer tracks the primary photo, falling back to the first"""
+        property_obj = self.properties[0]
+        first, second, third = property_obj.photos.all()
+        property_obj.refresh_from_db()
+        self.assertEqual(property_obj.primary_photo, first)
+
+        third.is_primary = True
+        third.save()
+        property_obj.refresh_from_db()
+        self.assertEqual(property_obj.primary_photo, third)
+
+        third.delete()
+        property_obj.refresh_from_db()
+        self.assertEqual(property_obj.primary_photo, first)
+
+    def test_list_query_count(self):
+        """Listing properties doesn't query photos per row"""
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/properties/")
+        self.assertEqual(len(response.data["results"]), 5)
+        for result in response.data["results"]:
+            self.assertIsNotNone(result["primary_photo"])
+
+
+class ResponseCacheTest(TestCase):
+    """Test the anonymous property response cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        self.property = create_property(
+            self.host,
+            title="Cached Property",
+            status=Property.PropertyStatus.ACTIVE,
+        )
+
+    def test_repeat_requests_skip_database(self):
+        """Equivalent anonymous searches are served from the cache"""
+        first = self.client.get("/api/properties/?min_guests=2&city=Test")
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/properties/?city=Test&min_guests=2")
+        self.assertEqual(second.data, first.data)
+
+        self.client.get(f"/api/properties/{self.property.pk}/")
+        # Only the ETag stamps are read; the body comes from the cache
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/properties/{self.property.pk}/")
+        self.assertEqual(response.data["title"], "Cached Property")
+
+    def test_saves_invalidate_cached_responses(self):
+        """Property and calendar changes retire cached responses"""
+        self.client.get("/api/properties/")
+        self.client.get(f"/api/properties/{self.property.pk}/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.property.title = "Renamed Property"
+            self.property.save()
+        response = self.client.get("/api/properties/")
+        self.assertEqual(response.data["results"][0]["title"], "Renamed Property")
+        response = self.client.get(f"/api/properties/{self.property.pk}/")
+        self.assertEqual(response.data["title"], "Renamed Property")
+
+        check_in = date.today() + timedelta(days=10)
+        for offset in range(2):
+            Availability.objects.create(
+                property=self.property, date=check_in + timedelta(days=offset)
+            )
+        params = {"check_in": check_in, "check_out": check_in + timedelta(days=2)}
+        self.assertEqual(self.client.get("/api/properties/", params).data["count"], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            BlockedDate.objects.create(
+                property=self.property, start_date=check_in, end_date=check_in
+            )
+        self.assertEqual(self.client.get("/api/properties/", params).data["count"], 0)
+
+    def test_admin_status_actions_invalidate_cached_responses(self):
+        """Bulk status changes in the admin retire cached responses"""
+        self.client.get("/api/properties/")
+        self.client.get(f"/api/properties/{self.property.pk}/")
+
+        admin_user = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="testpass123"
+        )
+        admin_client = APIClient()
+        admin_client.force_login(admin_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            admin_client.post(
+                "/admin/properties/property/",
+                {
+                    "action": "deactivate_properties",
+                    "_selected_action": [self.property.pk],
+                },
+            )
+        self.assertEqual(self.client.get("/api/properties/").data["count"], 0)
+        response = self.client.get(f"/api/properties/{self.property.pk}/")
+        self.assertEqual(response.data["status"], Property.PropertyStatus.INACTIVE)
+
+    def test_authenticated_requests_bypass_cache(self):
+        """Hosts see their own changes immediately"""
+        client = APIClient()
+        client.force_authenticate(self.host)
+        client.get("/api/properties/")
+        Property.objects.filter(pk=self.property.pk).update(title="Updated Title")
+        response = client.get("/api/properties/")
+        self.assertEqual(response.data["results"][0]["title"], "Updated Title")
+
+
+class ConditionalGetTest(TestCase):
+    """Test ETag / Last-Modified handling on property reads"""
+
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        self.property = create_property(
+            self.host,
+            title="Conditional Property",
+            status=Property.PropertyStatus.ACTIVE,
+        )
+        self.url = f"/api/properties/{self.property.pk}/"
+
+    def test_detail_not_modified(self):
+        """A matching ETag gets a 304 from a single query"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("Last-Modified", response)
+        etag = response["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        PropertyPhoto.objects.create(property=self.property, image="properties/a.jpg")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_host_edit_refreshes_cached_detail(self):
+        """Editing the host changes both the ETag and the cached body"""
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+
+        self.host.first_name = "Renamed"
+        self.host.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["host"]["first_name"], "Renamed")
+
+    def test_availability_not_modified(self):
+        """The calendar ETag changes when a night is added or removed"""
+        url = f"{self.url}availability/"
+        night = Availability.objects.create(
+            property=self.property, date=date.today() + timedelta(days=3)
+        )
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        night.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [])
+
+
+class AvailabilityRangeTest(TestCase):
+    """Test the bulk availability range endpoint"""
+
+    def setUp(self):
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        self.property = create_property(self.host, title="Range Property")
+        self.url = f"/api/properties/{self.property.pk}/availability/range/"
+        self.client = APIClient()
+        self.client.force_authenticate(self.host)
+        self.start = date.today() + timedelta(days=7)
+
+    def test_upsert_range(self):
+        """Existing days are updated in place and keep their price when omitted"""
+        Availability.objects.create(
+            property=self.property, date=self.start, price_override=150.00
+        )
+        response = self.client.post(
+            self.url,
+            {
+                "start_date": self.start,
+                "end_date": self.start + timedelta(days=13),
+                "is_available": False,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 14)
+
+        # The priced first day stays its own run; the rest is one run
+        runs = Availability.objects.filter(property=self.property)
+        self.assertEqual(
+            list(runs.values_list("date", "end_date", "price_override")),
+            [
+                (self.start, self.start, 150),
+                (self.start + timedelta(days=1), self.start + timedelta(days=13), None),
+            ],
+        )
+        self.assertFalse(runs.filter(is_available=True).exists())
+        index = AvailabilityIndex.objects.get(property=self.property)
+        self.assertNotIn("1", index.nights)
+
+    def test_weekday_mask_and_query_count(self):
+        """Only masked weekdays are written, in the same queries for any length"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        counts = []
+        # The first write also creates the property's index row
+        for weeks in (1, 2, 8):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    self.url,
+                    {
+                        "start_date": self.start,
+                        "end_date": self.start + timedelta(days=7 * weeks - 1),
+                        "weekdays": [5, 6],
+                        "price_override": "180.00",
+                    },
+                    format="json",
+                )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data["count"], 2 * weeks)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[1], counts[2])
+        # One Saturday-Sunday run per week
+        runs = Availability.objects.filter(property=self.property)
+        self.assertEqual(runs.count(), 8)
+        self.assertTrue(
+            all(run.date.weekday() == 5 and run.end_date.weekday() == 6 for run in runs)
+        )
+        self.assertFalse(runs.exclude(price_override=180).exists())
+
+    def test_requires_owner(self):
+        """Other hosts can't write to the calendar"""
+        other = User.objects.create_user(
+            username="other",
+            email="other@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        self.client.force_authenticate(other)
+        response = self.client.post(
+            self.url,
+            {"start_date": self.start, "end_date": self.start},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Availability.objects.exists())
+
+
+class CalendarRunTest(TestCase):
+    """Test run-length calendar writes, reads and pricing"""
+
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        self.property = create_property(
+            self.host,
+            title="Calendar Property",
+            status=Property.PropertyStatus.ACTIVE,
+        )
+        self.start = date.today() + timedelta(days=7)
+        self.end = self.start + timedelta(days=29)
+        upsert_availability(self.property.id, [(self.start, self.end)], True)
+
+    def runs(self):
+        return list(
+            Availability.objects.filter(property=self.property).values_list(
+                "date", "end_date", "price_override"
+            )
+        )
+
+    def test_split_and_merge(self):
+        """Writing inside a run splits it; writing it back merges the pieces"""
+        middle = (self.start + timedelta(days=10), self.start + timedelta(days=19))
+        self.assertEqual(self.runs(), [(self.start, self.end, None)])
+
+        upsert_availability(self.property.id, [middle], True, Decimal("150.00"))
+        self.assertEqual(
+            self.runs(),
+            [
+                (self.start, middle[0] - timedelta(days=1), None),
+                (middle[0], middle[1], Decimal("150.00")),
+                (middle[1] + timedelta(days=1), self.end, None),
+            ],
+        )
+
+        upsert_availability(self.property.id, [middle], True, None)
+        self.assertEqual(self.runs(), [(self.start, self.end, None)])
+
+    def test_upsert_locks_property_first(self):
+        """Writers serialise on the property row before reading the runs"""
+        later = self.end + timedelta(days=40)
+        with CaptureQueriesContext(connection) as queries:
+            upsert_availability(self.property.id, [(later, later)], True)
+        first = queries.captured_queries[1]["sql"]
+        self.assertIn('FROM "properties_property"', first)
+        self.assertIn("FOR UPDATE", first)
+
+    def test_compact_day_rows(self):
+        """Adjacent identical single-day rows compact into one run"""
+        first = self.end + timedelta(days=1)
+        for offset in range(3):
+            Availability.objects.create(
+                property=self.property, date=first + timedelta(days=offset)
+            )
+        self.assertEqual(compact_calendar(self.property.id), 3)
+        self.assertEqual(
+            self.runs(), [(self.start, first + timedelta(days=2), None)]
+        )
+
+    def test_read_expands_on_request(self):
+        """The calendar returns runs, and single days with ?days=true"""
+        url = f"/api/properties/{self.property.pk}/availability/"
+        response = self.client.get(url)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["end_date"], self.end.isoformat())
+
+        response = self.client.get(
+            url,
+            {
+                "days": "true",
+                "start_date": self.start + timedelta(days=5),
+                "end_date": self.start + timedelta(days=8),
+            },
+        )
+        self.assertEqual(
+            [day["date"] for day in response.data],
+            [(self.start + timedelta(days=d)).isoformat() for d in range(5, 9)],
+        )
+
+    def test_read_rejects_malformed_dates(self):
+        """An unparsable start_date or end_date is a 400, not the full calendar"""
+        url = f"/api/properties/{self.property.pk}/availability/"
+        for params in [{"start_date": "tomorrow"}, {"end_date": "2026-02-30"}]:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_runs_price_and_search(self):
+        """Quotes, stay_price and date search read nights inside runs"""
+        priced = (self.start + timedelta(days=2), self.start + timedelta(days=3))
+        upsert_availability(self.property.id, [priced], True, Decimal("150.00"))
+        check_in = self.start + timedelta(days=1)
+        check_out = self.start + timedelta(days=5)
+
+        quote = quote_stay(self.property, check_in, check_out)
+        self.assertEqual(quote.base_price, Decimal("500.00"))
+        annotated = annotate_stay_price(Property.objects.all(), check_in, check_out)
+        self.assertEqual(annotated.get().stay_price, Decimal("500.00"))
+
+        # Past the bitmap window, search falls back to summing run overlaps
+        far = self.start + timedelta(days=AvailabilityIndex.WINDOW_DAYS)
+        upsert_availability(self.property.id, [(far, far + timedelta(days=9))], True)
+        queryset = filter_available_nights(
+            Property.objects.all(), far + timedelta(days=2), far + timedelta(days=6)
+        )
+        self.assertTrue(queryset.exists())
+        queryset = filter_available_nights(
+            Property.objects.all(), far + timedelta(days=8), far + timedelta(days=12)
+        )
+        self.assertFalse(queryset.exists())
+
+
+class FeedStubHandler(BaseHTTPRequestHandler):
+    """Serves the test's iCal document, honouring If-None-Match"""
+
+    def do_GET(self):
+        if self.path == "/redirect.ics":
+            self.send_response(302)
+            self.send_header("Location", "file:///etc/passwd")
+            self.end_headers()
+            return
+        body = self.server.feed_body.encode()
+        etag = f'"{hash(body)}"'
+        self.server.requests.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/calendar")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(CALENDAR_FEED_ALLOW_PRIVATE_ADDRESSES=True)
+class CalendarSyncTest(TestCase):
+    """Test iCal export and feed import"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = HTTPServer(("127.0.0.1", 0), FeedStubHandler)
+        cls.server.feed_body = ""
+        cls.server.requests = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        self.guest = User.objects.create_user(
+            username="guest",
+            email="guest@example.com",
+            password="testpass123",
+            role=User.Role.GUEST,
+        )
+        self.property = create_property(
+            self.host,
+            title="Synced Property",
+            status=Property.PropertyStatus.ACTIVE,
+        )
+        self.start = date.today() + timedelta(days=10)
+        self.feed = CalendarFeed.objects.create(
+            property=self.property,
+            name="Other channel",
+            url=f"http://127.0.0.1:{self.server.server_port}/feed.ics",
+        )
+        self.server.requests.clear()
+
+    def feed_body(self, *periods):
+        events = "".join(
+            "BEGIN:VEVENT\r\n"
+            f"UID:{start}\r\n"
+            f"DTSTART;VALUE=DATE:{start:%Y%m%d}\r\n"
+            f"DTEND;VALUE=DATE:{end:%Y%m%d}\r\n"
+            "SUMMARY:Reserved\\, channel\r\n"
+            "END:VEVENT\r\n"
+            for start, end in periods
+        )
+        return f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\n{events}END:VCALENDAR\r\n"
+
+    def day(self, offset):
+        return self.start + timedelta(days=offset)
+
+    def test_export(self):
+        """Confirmed bookings and blocked dates export as all-day events"""
+        Booking.objects.create(
+            property_obj=self.property,
+            guest=self.guest,
+            check_in=self.day(0),
+            check_out=self.day(3),
+            guest_count=2,
+            status=Booking.BookingStatus.CONFIRMED,
+        )
+        Booking.objects.create(
+            property_obj=self.property,
+            guest=self.guest,
+            check_in=self.day(5),
+            check_out=self.day(6),
+            guest_count=2,
+        )
+        BlockedDate.objects.create(
+            property=self.property,
+            start_date=self.day(10),
+            end_date=self.day(11),
+            reason="Family visit",
+        )
+
+        response = self.client.get(f"/api/properties/{self.property.pk}/ical/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/calendar"))
+        body = b"".join(response.streaming_content).decode()
+        self.assertEqual(body.count("BEGIN:VEVENT"), 2)
+        self.assertNotIn(self.guest.email, body)
+        self.assertNotIn("Family visit", body)
+        self.assertEqual(
+            parse_ical_periods(body),
+            [
+                (self.day(0), self.day(2), "Reserved"),
+                (self.day(10), self.day(11), "Not available"),
+            ],
+        )
+
+    def test_import_defaults_to_utf8(self):
+        """A feed without a charset is read as UTF-8"""
+        self.server.feed_body = self.feed_body(
+            (self.day(0), self.day(3))
+        ).replace("Reserved\\, channel", "Réservé")
+        sync_calendar_feed(self.feed)
+        self.assertEqual(BlockedDate.objects.get(feed=self.feed).reason, "Réservé")
+
+    def test_import_applies_only_changes(self):
+        """A sync deletes and creates just the periods that changed"""
+        upsert_availability(self.property.id, [(self.day(0), self.day(40))], True)
+        manual = BlockedDate.objects.create(
+            property=self.property, start_date=self.day(30), end_date=self.day(31)
+        )
+        self.server.feed_body = self.feed_body(
+            (self.day(0), self.day(3)), (self.day(7), self.day(9))
+        )
+        self.assertEqual(sync_calendar_feed(self.feed), (0, 2))
+        kept = BlockedDate.objects.get(feed=self.feed, start_date=self.day(0))
+        self.assertEqual(kept.end_date, self.day(2))
+        self.assertEqual(kept.reason, "Reserved, channel")
+
+        self.server.feed_body = self.feed_body(
+            (self.day(0), self.day(3)), (self.day(14), self.day(15))
+        )
+        self.assertEqual(sync_calendar_feed(self.feed), (1, 1))
+        self.assertEqual(
+            list(
+                BlockedDate.objects.filter(property=self.property).values_list(
+                    "start_date", flat=True
+                )
+            ),
+            [self.day(0), self.day(14), self.day(30)],
+        )
+        self.assertTrue(BlockedDate.objects.filter(pk=kept.pk).exists())
+        self.assertTrue(BlockedDate.objects.filter(pk=manual.pk).exists())
+
+        # The bitmap follows the imported periods
+        offset = (self.start - date.today()).days
+        nights = AvailabilityIndex.objects.get(property=self.property).nights
+        self.assertEqual(nights[offset : offset + 16], "0001111111111101")
+
+    def test_unchanged_feed_is_skipped(self):
+        """The feed's ETag turns repeat syncs into a 304 with no writes"""
+        self.server.feed_body = self.feed_body((self.day(0), self.day(3)))
+        sync_calendar_feed(self.feed)
+        with self.assertNumQueries(1):
+            self.assertEqual(sync_calendar_feed(self.feed), (0, 0))
+        self.assertEqual(self.server.requests[-1], self.feed.etag)
+        self.assertIsNotNone(self.feed.last_synced_at)
+
+
+    def test_internal_and_non_http_urls_refused(self):
+        """Feeds can't reach internal addresses or other schemes"""
+        with override_settings(CALENDAR_FEED_ALLOW_PRIVATE_ADDRESSES=False):
+            with self.assertRaises(CalendarFeedError):
+                sync_calendar_feed(self.feed)
+            client = APIClient()
+            client.force_authenticate(self.host)
+            response = client.post(
+                f"/api/properties/{self.property.pk}/calendar-feeds/",
+                {"name": "Metadata", "url": "http://169.254.169.254/latest/"},
+            )
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.server.requests, [])
+
+        self.feed.url = self.feed.url.replace("feed.ics", "redirect.ics")
+        with self.assertRaises(CalendarFeedError):
+            sync_calendar_feed(self.feed)
+
+    def test_oversized_feed_refused(self):
+        """Bodies over CALENDAR_FEED_MAX_BYTES are not read"""
+        self.server.feed_body = self.feed_body((self.day(0), self.day(3)))
+        with override_settings(CALENDAR_FEED_MAX_BYTES=64):
+            with self.assertRaises(CalendarFeedError):
+                sync_calendar_feed(self.feed)
+        self.assertFalse(BlockedDate.objects.filter(feed=self.feed).exists())
+
+    def test_failing_feed_does_not_stop_the_run(self):
+        """A feed that fails to parse is recorded and the others still sync"""
+        other = CalendarFeed.objects.create(
+            property=self.property, name="Second channel", url=self.feed.url + "?2"
+        )
+        self.server.feed_body = self.feed_body((self.day(0), self.day(3)))
+        with mock.patch(
+            "properties.ical.parse_ical_periods",
+            side_effect=[ValueError("bad calendar"), []],
+        ):
+            self.assertEqual(sync_all_calendar_feeds(), 1)
+        errors = set(
+            CalendarFeed.objects.filter(pk__in=[self.feed.pk, other.pk]).values_list(
+                "last_error", flat=True
+            )
+        )
+        self.assertEqual(errors, {"bad calendar", ""})
+
+
+class PhotoPipelineTest(TestCase):
+    """Test the asynchronous photo variant pipeline"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        self.property = create_property(self.host, title="Photo Property")
+        self.client = APIClient()
+        self.client.force_authenticate(self.host)
+        self.url = f"/api/properties/{self.property.pk}/photos/"
+
+    def image_file(self, width, height, name="room.jpg"):
+        buffer = BytesIO()
+        Image.new("RGB", (width, height), "teal").save(buffer, "JPEG")
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+    def upload(self, width, height):
+        image = self.image_file(width, height)
+        return self.client.post(self.url, {"image": image}, format="multipart")
+
+    def upload_batch(self, images, **data):
+        return self.client.post(
+            f"{self.url}batch/", {"images": images, **data}, format="multipart"
+        )
+
+    def test_upload_only_enqueues(self):
+        """The request stores the original; variants are built after commit"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.upload(1200, 800)
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(response.data["width"])
+        self.assertEqual(response.data["srcset"], "")
+
+        photo = PropertyPhoto.objects.get(pk=response.data["id"])
+        self.assertEqual(photo.variants, {})
+        for callback in callbacks:
+            callback()
+        photo.refresh_from_db()
+        self.assertEqual(set(photo.variants), {"thumb", "card", "hero"})
+
+    def test_variants_and_srcset(self):
+        """The task stores sizes and the serializer lists every variant"""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.upload(2400, 1600)
+        photo = PropertyPhoto.objects.get(pk=response.data["id"])
+
+        self.assertEqual((photo.width, photo.height), (2400, 1600))
+        self.assertEqual(photo.size, photo.image.size)
+        self.assertEqual(
+            {name: (v["width"], v["height"]) for name, v in photo.variants.items()},
+            {"thumb": (320, 213), "card": (800, 533), "hero": (1620, 1080)},
+        )
+        for variant in photo.variants.values():
+            self.assertEqual(variant["size"], photo.image.storage.size(variant["name"]))
+
+        srcset = PropertyPhotoSerializer(photo).data["srcset"]
+        self.assertEqual(
+            [entry.split(" ")[1] for entry in srcset.split(", ")],
+            ["320w", "800w", "1620w"],
+        )
+
+    def test_small_original_is_not_upscaled(self):
+        """Variants of a small photo keep its size and appear once in srcset"""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.upload(200, 100)
+        photo = PropertyPhoto.objects.get(pk=response.data["id"])
+        srcset = PropertyPhotoSerializer(photo).data["srcset"]
+        self.assertEqual(srcset.count(","), 0)
+        self.assertTrue(srcset.endswith(" 200w"))
+
+    def test_reprocessing_replaces_variants(self):
+        """Rebuilding or replacing a photo removes its old variant files"""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.upload(1200, 800)
+        photo = PropertyPhoto.objects.get(pk=response.data["id"])
+        storage = photo.image.storage
+        process_photo(photo.pk)
+        photo.refresh_from_db()
+        self.assertEqual(len(storage.listdir("properties/variants")[1]), 3)
+        for variant in photo.variants.values():
+            self.assertTrue(storage.exists(variant["name"]))
+
+        photo.image = self.image_file(600, 400, "garden.jpg")
+        with self.captureOnCommitCallbacks(execute=True):
+            photo.save()
+        photo.refresh_from_db()
+        self.assertEqual(
+            sorted(storage.listdir("properties/variants")[1]),
+            sorted(os.path.basename(v["name"]) for v in photo.variants.values()),
+        )
+
+    def test_decompression_bomb_is_dropped(self):
+        """A photo that decodes to too many pixels is deleted, not retried"""
+        with self.captureOnCommitCallbacks():
+            response = self.upload(64, 64)
+        with mock.patch.object(Image, "MAX_IMAGE_PIXELS", 100):
+            self.assertIsNone(process_photo(response.data["id"]))
+        self.assertFalse(PropertyPhoto.objects.filter(pk=response.data["id"]).exists())
+
+    def test_batch_upload(self):
+        """A batch is appended in order and can take over the primary photo"""
+        first = PropertyPhoto.objects.create(
+            property=self.property, image="properties/first.jpg", is_primary=True
+        )
+        response = self.upload_batch(
+            [self.image_file(400, 300, f"room-{i}.jpg") for i in range(3)], primary=1
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([photo["order"] for photo in response.data], [1, 2, 3])
+        self.assertEqual(
+            [photo["is_primary"] for photo in response.data], [False, True, False]
+        )
+        first.refresh_from_db()
+        self.assertFalse(first.is_primary)
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.primary_photo_id, response.data[1]["id"])
+        for photo in PropertyPhoto.objects.exclude(pk=first.pk):
+            self.assertTrue(photo.image.storage.exists(photo.image.name))
+
+    def test_batch_queries_do_not_grow(self):
+        """A batch costs the same queries for two photos as for six"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        counts = []
+        for size in (2, 6):
+            images = [self.image_file(64, 64, f"room-{i}.jpg") for i in range(size)]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.upload_batch(images)
+            self.assertEqual(response.status_code, 201)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(PropertyPhoto.objects.count(), 8)
+
+    def test_batch_rejects_bad_files(self):
+        """One invalid file fails the whole batch before anything is stored"""
+        bad = SimpleUploadedFile("notes.jpg", b"not an image", content_type="image/jpeg")
+        response = self.upload_batch([self.image_file(64, 64), bad])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PropertyPhoto.objects.exists())
+
+
+class DirectUploadTest(TestCase):
+    """Test ticketed direct-to-storage photo uploads"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        self.property = create_property(self.host, title="Upload Property")
+        self.client = APIClient()
+        self.client.force_authenticate(self.host)
+        self.url = f"/api/properties/{self.property.pk}/photos/"
+
+    def ticket(self):
+        response = self.client.post(
+            f"{self.url}upload-ticket/", {"content_type": "image/jpeg"}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.data
+
+    def put(self, ticket, content):
+        # The upload carries no credentials besides the ticket
+        return APIClient().put(
+            ticket["upload"]["url"], content, content_type="image/jpeg"
+        )
+
+    def finalize(self, ticket, **data):
+        return self.client.post(
+            f"{self.url}finalize/", {"token": ticket["token"], **data}, format="json"
+        )
+
+    def jpeg(self):
+        buffer = BytesIO()
+        Image.new("RGB", (640, 480), "teal").save(buffer, "JPEG")
+        return buffer.getvalue()
+
+    def test_ticket_upload_finalize(self):
+        """A photo uploaded with a ticket is registered and processed once"""
+        ticket = self.ticket()
+        self.assertEqual(self.finalize(ticket).status_code, 400)
+
+        self.assertEqual(self.put(ticket, self.jpeg()).status_code, 204)
+        self.assertEqual(self.put(ticket, self.jpeg()).status_code, 409)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.finalize(ticket, is_primary=True)
+        self.assertEqual(response.status_code, 201)
+        photo = PropertyPhoto.objects.get(pk=response.data["id"])
+        self.assertTrue(photo.is_primary)
+        self.assertEqual((photo.width, photo.height), (640, 480))
+        self.assertEqual(self.finalize(ticket).status_code, 400)
+
+    def test_ticket_is_bound_to_user_and_property(self):
+        """Tickets can't be redeemed by another host, elsewhere, or late"""
+        ticket = self.ticket()
+        self.put(ticket, self.jpeg())
+
+        other = User.objects.create_user(
+            username="other",
+            email="other@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        other_property = create_property(
+            other,
+            title="Other Property",
+            address="1 Other St",
+            latitude=6.5,
+            longitude=3.3,
+            base_price=80.00,
+            max_guests=2,
+            bedrooms=1,
+            beds=1,
+        )
+        client = APIClient()
+        client.force_authenticate(other)
+        response = client.post(
+            f"/api/properties/{other_property.pk}/photos/finalize/",
+            {"token": ticket["token"]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+        with override_settings(DIRECT_UPLOAD_TICKET_TTL=-1):
+            response = self.finalize(ticket)
+        self.assertEqual(response.data["error"], "This upload ticket has expired.")
+        self.assertFalse(PropertyPhoto.objects.exists())
+
+    def test_cloudinary_ticket_finalize(self):
+        """With Cloudinary, clients post a signed upload found by public id"""
+        config = SimpleNamespace(cloud_name="demo", api_key="key", api_secret="secret")
+        uploaded = {}
+
+        def resource(public_id):
+            if public_id not in uploaded:
+                raise NotFound(f"Resource not found - {public_id}")
+            return {"public_id": public_id, "bytes": uploaded[public_id]}
+
+        with override_settings(
+            DIRECT_UPLOAD_BACKEND="config.uploads.CloudinaryDirectUploadBackend"
+        ), mock.patch("cloudinary.config", return_value=config), mock.patch(
+            "cloudinary.api.resource", side_effect=resource
+        ), mock.patch("cloudinary.uploader.destroy") as destroy:
+            ticket = self.ticket()
+            upload = ticket["upload"]
+            self.assertEqual(upload["method"], "POST")
+            self.assertIn("/demo/image/upload", upload["url"])
+            fields = upload["fields"]
+            public_id = fields["public_id"]
+            self.assertRegex(public_id, r"^media/properties/[0-9a-f]{32}$")
+            self.assertEqual(
+                fields["signature"],
+                api_sign_request(
+                    {"public_id": public_id, "timestamp": fields["timestamp"]},
+                    "secret",
+                ),
+            )
+            self.assertEqual(self.finalize(ticket).status_code, 400)
+
+            # The client posts the file to Cloudinary
+            uploaded[public_id] = 2048
+            response = self.finalize(ticket)
+            self.assertEqual(response.status_code, 201)
+            photo = PropertyPhoto.objects.get(pk=response.data["id"])
+            self.assertEqual(photo.image.name, public_id)
+
+            big = self.ticket()
+            uploaded[big["upload"]["fields"]["public_id"]] = 11 * 1024 * 1024
+            self.assertEqual(self.finalize(big).status_code, 400)
+            destroy.assert_called_once_with(
+                big["upload"]["fields"]["public_id"], invalidate=True
+            )
+
+    def test_non_image_is_dropped(self):
+        """The processing task deletes a registered upload that isn't an image"""
+        ticket = self.ticket()
+        self.put(ticket, b"definitely not a jpeg")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.finalize(ticket)
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(PropertyPhoto.objects.exists())
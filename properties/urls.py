@@ -5,6 +5,7 @@ from .views import (
     PropertyPhotoViewSet,
     AvailabilityViewSet,
     BlockedDateViewSet,
+    CalendarFeedViewSet,
 )
 
 router = DefaultRouter()
@@ -14,7 +15,7 @@ app_name = "properties"
 
 urlpatterns = [
     path("", include(router.urls)),
-    # Nested routes for property photos, availability, and blocked dates
+    # Nested routes for property photos, availability, blocked dates and feeds
     path(
         "<int:property_pk>/photos/",
         PropertyPhotoViewSet.as_view({"get": "list", "post": "create"}),
@@ -32,6 +33,11 @@ urlpatterns = [
         AvailabilityViewSet.as_view({"get": "list", "post": "create"}),
         name="property-availability",
     ),
+    path(
+        "<int:property_pk>/availability/range/",
+        AvailabilityViewSet.as_view({"post": "upsert_range"}),
+        name="property-availability-range",
+    ),
     path(
         "<int:property_pk>/availability/<int:pk>/",
         AvailabilityViewSet.as_view(
@@ -51,6 +57,18 @@ urlpatterns = [
         ),
         name="property-blocked-date-detail",
     ),
+    path(
+        "<int:property_pk>/calendar-feeds/",
+        CalendarFeedViewSet.as_view({"get": "list", "post": "create"}),
+        name="property-calendar-feeds",
+    ),
+    path(
+        "<int:property_pk>/calendar-feeds/<int:pk>/",
+        CalendarFeedViewSet.as_view(
+            {"get": "retrieve", "put": "update", "patch": "partial_update", "delete": "destroy"}
+        ),
+        name="property-calendar-feed-detail",
+    ),
     # Search endpoint
     path("search/", PropertyViewSet.as_view({"get": "list"}), name="property-search"),
 ]
@@ -1,37 +1,83 @@
 from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.parsers import MultiPartParser, FormParser
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from django.conf import settings
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date
+from django.utils.http import http_date
+from config.pagination import OptionalCursorPagination
+from config.serializers import EXPAND_PARAM, select_related_for
+from config.uploads import (
+    UploadTicketError,
+    UploadTicketSerializer,
+    claim_upload,
+    issue_upload_ticket,
+)
+from config.values import ValuesListMixin, ValuesPlan
 from accounts.permissions import IsHost, IsOwner
-from .models import Property, PropertyPhoto, Availability, BlockedDate
+from .models import Property, PropertyPhoto, Availability, BlockedDate, CalendarFeed
 from .serializers import (
     PropertyListSerializer,
     PropertyDetailSerializer,
     PropertyCreateUpdateSerializer,
     PropertyPhotoSerializer,
+    PropertyPhotoBatchSerializer,
+    PhotoFinalizeSerializer,
     AvailabilitySerializer,
+    AvailabilityRangeSerializer,
+    expand_availability,
     BlockedDateSerializer,
+    CalendarFeedSerializer,
+)
+from .filters import PropertyFilter, PropertyOrderingFilter
+from .search import destination_suggestions
+from .cache import (
+    conditional_validators,
+    normalized_query_key,
+    property_cache_generation,
+    property_change_stamps,
 )
-from .filters import PropertyFilter
+from .facets import compute_facets
+from .clusters import MAX_ZOOM, map_markers, parse_bbox
+from .histogram import DEFAULT_PRICE_BUCKETS, MAX_PRICE_BUCKETS, price_histogram
+from .availability import upsert_availability
+from .ical import ical_export
+from .photos import next_photo_order, save_photo_batch
+
+
+# Change stamps that decide whether a client's copy is still current
+DETAIL_STAMPS = ["updated_at", "host__updated_at", "photos_changed", "photos_count"]
+AVAILABILITY_STAMPS = ["availability_changed", "availability_count"]
 
 
-class PropertyViewSet(viewsets.ModelViewSet):
+class PropertyViewSet(ValuesListMixin, viewsets.ModelViewSet):
     """ViewSet for property CRUD operations"""
 
     queryset = Property.objects.all()
     permission_classes = [AllowAny]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    # ?search= is handled by PropertyFilter's full-text search
+    filter_backends = [DjangoFilterBackend, PropertyOrderingFilter]
     filterset_class = PropertyFilter
-    search_fields = ["title", "description", "city", "country"]
-    ordering_fields = ["created_at", "base_price"]
-    ordering = ["-created_at"]
+    ordering_fields = [
+        "created_at",
+        "base_price",
+        "distance",
+        "search_rank",
+        "stay_price",
+        "relevance",
+    ]
+    ordering = ["-created_at", "-id"]
+    pagination_class = OptionalCursorPagination
 
     def get_serializer_class(self):
-        if self.action == "list":
+        if self.action in ["list", "similar"]:
             return PropertyListSerializer
         elif self.action in ["create", "update", "partial_update"]:
             return PropertyCreateUpdateSerializer
@@ -47,12 +93,231 @@ class PropertyViewSet(viewsets.ModelViewSet):
         """Filter queryset based on status"""
         queryset = super().get_queryset()
         # Only show active properties to non-owners
-        if self.action == "list" and not (
+        if self.action in ["list", "facets", "map", "price_histogram"] and not (
             self.request.user.is_authenticated
             and self.request.user.is_host
         ):
             queryset = queryset.filter(status=Property.PropertyStatus.ACTIVE)
-        return queryset.select_related("host").prefetch_related("photos")
+        if self.action == "list":
+            return select_related_for(
+                queryset, PropertyListSerializer, self.request, "host", "primary_photo"
+            )
+        queryset = queryset.select_related("host", "primary_photo")
+        if self.action in ["facets", "map", "price_histogram"]:
+            return queryset
+        return queryset.prefetch_related("photos")
+
+    # Closest spellings when a city/country filter fell back to fuzzy matching
+    did_you_mean = None
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action == "list":
+            self.did_you_mean = destination_suggestions(queryset)
+        return queryset
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.did_you_mean:
+            response.data["did_you_mean"] = self.did_you_mean
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        cache_key = normalized_query_key(
+            "property-list",
+            request.query_params,
+            keep_blank=[EXPAND_PARAM],
+            extra=[
+                ("host", request.get_host()),
+                ("generation", property_cache_generation()),
+            ],
+        )
+        return self._cached_response(
+            cache_key, lambda: super(PropertyViewSet, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        validators = self._conditional_validators(pk, DETAIL_STAMPS, ["photos"])
+        not_modified = self._not_modified(request, validators)
+        if not_modified is not None:
+            return not_modified
+
+        if request.user.is_authenticated:
+            response = super().retrieve(request, *args, **kwargs)
+        else:
+            # The ETag covers changes the generation misses, such as edits
+            # to the host, so the cached body always matches the validators
+            extra = [("generation", property_cache_generation(pk))]
+            if validators is not None:
+                extra.append(("etag", validators[0]))
+            cache_key = normalized_query_key(
+                f"property-detail:{pk}", request.query_params, extra=extra
+            )
+            response = self._cached_response(
+                cache_key,
+                lambda: super(PropertyViewSet, self).retrieve(request, *args, **kwargs),
+            )
+        return self._with_validators(response, validators)
+
+    def _cached_response(self, cache_key, get_response):
+        """Serve anonymous reads from the cache, storing successful responses.
+
+        Keys carry the property cache generation, which model saves bump, so
+        stale entries are never read again and simply expire.
+        """
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data)
+        response = get_response()
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(cache_key, response.data, settings.PROPERTY_RESPONSE_CACHE_TIMEOUT)
+        return response
+
+    def _conditional_validators(self, pk, stamp_names, related):
+        stamps = property_change_stamps(pk, related)
+        if stamps is None:
+            return None
+        return conditional_validators(stamps, stamp_names)
+
+    def _not_modified(self, request, validators):
+        """A 304 when If-None-Match/If-Modified-Since show the copy is current"""
+        if validators is None:
+            return None
+        etag, last_modified = validators
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            return None
+        return self._with_validators(response, validators)
+
+    def _with_validators(self, response, validators):
+        """Add ETag, Last-Modified and Cache-Control to a successful read"""
+        if validators is None or response.status_code not in (200, 304):
+            return response
+        etag, last_modified = validators
+        response.headers["ETag"] = etag
+        if last_modified is not None:
+            response.headers["Last-Modified"] = http_date(last_modified)
+        patch_cache_control(
+            response, public=True, max_age=settings.PROPERTY_HTTP_CACHE_MAX_AGE
+        )
+        return response
+
+    @action(
+        detail=False,
+        methods=["get"],
+        permission_classes=[AllowAny],
+        url_path="facets",
+    )
+    def facets(self, request):
+        """Facet counts for the current filters (?facets=property_type,price,...)"""
+        names = [
+            name.strip()
+            for name in request.query_params.get("facets", "").split(",")
+            if name.strip()
+        ]
+        scope = "all" if request.user.is_authenticated and request.user.is_host else "active"
+        cache_key = normalized_query_key(
+            "property-facets",
+            request.query_params,
+            ignore=["page", "page_size", "ordering", "fields", "expand"],
+            extra=[("scope", scope), ("generation", property_cache_generation())],
+        )
+        data = cache.get(cache_key)
+        if data is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            data = compute_facets(queryset, names)
+            cache.set(cache_key, data, settings.PROPERTY_FACETS_CACHE_TIMEOUT)
+        return Response(data)
+
+    @action(
+        detail=True,
+        methods=["get"],
+        permission_classes=[AllowAny],
+        url_path="similar",
+    )
+    def similar(self, request, pk=None):
+        """Active listings most like this one, from the nightly similarity table"""
+        queryset = Property.objects.filter(
+            similar_to__property_id=pk,
+            status=Property.PropertyStatus.ACTIVE,
+        ).order_by("similar_to__rank")
+        plan = ValuesPlan(self.get_serializer())
+        return Response(plan.render(plan.values(queryset)))
+
+    @action(
+        detail=False,
+        methods=["get"],
+        permission_classes=[AllowAny],
+        url_path="map",
+    )
+    def map(self, request):
+        """Clusters or pins for a viewport (?bbox=min_lon,min_lat,max_lon,max_lat&zoom=)"""
+        bbox = parse_bbox(request.query_params.get("bbox"))
+        if bbox is None:
+            return Response(
+                {"error": "bbox must be min_lon,min_lat,max_lon,max_lat."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            zoom = int(request.query_params.get("zoom", ""))
+        except ValueError:
+            zoom = -1
+        if not 0 <= zoom <= MAX_ZOOM:
+            return Response(
+                {"error": f"zoom must be an integer from 0 to {MAX_ZOOM}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        scope = "all" if request.user.is_authenticated and request.user.is_host else "active"
+        cache_key = normalized_query_key(
+            "property-map",
+            request.query_params,
+            ignore=["page", "page_size", "ordering", "fields", "expand"],
+            extra=[("scope", scope), ("generation", property_cache_generation())],
+        )
+        data = cache.get(cache_key)
+        if data is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            data = map_markers(queryset, bbox, zoom)
+            cache.set(cache_key, data, settings.PROPERTY_FACETS_CACHE_TIMEOUT)
+        return Response(data)
+
+    @action(
+        detail=False,
+        methods=["get"],
+        permission_classes=[AllowAny],
+        url_path="price-histogram",
+    )
+    def price_histogram(self, request):
+        """Price distribution for the current filters (?buckets=20)"""
+        try:
+            buckets = int(request.query_params.get("buckets", DEFAULT_PRICE_BUCKETS))
+        except ValueError:
+            buckets = 0
+        if not 1 <= buckets <= MAX_PRICE_BUCKETS:
+            return Response(
+                {"error": f"buckets must be an integer from 1 to {MAX_PRICE_BUCKETS}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        scope = "all" if request.user.is_authenticated and request.user.is_host else "active"
+        cache_key = normalized_query_key(
+            "property-price-histogram",
+            request.query_params,
+            ignore=["page", "page_size", "ordering", "fields", "expand"],
+            extra=[("scope", scope), ("generation", property_cache_generation())],
+        )
+        data = cache.get(cache_key)
+        if data is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            data = price_histogram(queryset, buckets)
+            cache.set(cache_key, data, settings.PROPERTY_FACETS_CACHE_TIMEOUT)
+        return Response(data)
 
     @action(
         detail=True,
@@ -62,18 +327,58 @@ class PropertyViewSet(viewsets.ModelViewSet):
     )
     def availability(self, request, pk=None):
         """Get availability calendar for a property"""
+        window = {}
+        for name in ["start_date", "end_date"]:
+            value = request.query_params.get(name) or ""
+            try:
+                window[name] = parse_date(value) if value else None
+            except ValueError:
+                window[name] = None
+            if value and window[name] is None:
+                return Response(
+                    {"error": f"{name} must be a date (YYYY-MM-DD)."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        start_date, end_date = window["start_date"], window["end_date"]
+
+        validators = self._conditional_validators(
+            pk, AVAILABILITY_STAMPS, ["availability"]
+        )
+        not_modified = self._not_modified(request, validators)
+        if not_modified is not None:
+            return not_modified
+
         property_obj = self.get_object()
-        start_date = request.query_params.get("start_date")
-        end_date = request.query_params.get("end_date")
 
+        # Runs overlapping the requested window
         availability = property_obj.availability.all()
         if start_date:
-            availability = availability.filter(date__gte=start_date)
+            availability = availability.filter(end_date__gte=start_date)
         if end_date:
             availability = availability.filter(date__lte=end_date)
 
-        serializer = AvailabilitySerializer(availability, many=True)
-        return Response(serializer.data)
+        data = AvailabilitySerializer(availability, many=True).data
+        if request.query_params.get("days", "").lower() == "true":
+            data = expand_availability(data, start_date, end_date)
+        return self._with_validators(Response(data), validators)
+
+    @action(
+        detail=True,
+        methods=["get"],
+        permission_classes=[AllowAny],
+        url_path="ical",
+    )
+    def ical(self, request, pk=None):
+        """Export the property's bookings and blocked dates as an iCal feed"""
+        property_obj = self.get_object()
+        response = StreamingHttpResponse(
+            ical_export(property_obj, request.get_host()),
+            content_type="text/calendar; charset=utf-8",
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="property-{property_obj.pk}.ics"'
+        )
+        return response
 
     @action(
         detail=True,
@@ -98,6 +403,99 @@ class PropertyViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(
+        detail=True,
+        methods=["post"],
+        permission_classes=[IsAuthenticated, IsHost],
+        url_path="photos/upload-ticket",
+    )
+    def photo_upload_ticket(self, request, pk=None):
+        """Issue a signed ticket to upload a photo straight to storage"""
+        property_obj = self.get_object()
+        if property_obj.host != request.user:
+            return Response(
+                {"error": "You don't have permission to upload photos for this property."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        serializer = UploadTicketSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ticket = issue_upload_ticket(
+            request.user,
+            f"property-photo:{property_obj.pk}",
+            PropertyPhoto._meta.get_field("image").upload_to,
+            serializer.validated_data["content_type"],
+        )
+        return Response(ticket, status=status.HTTP_201_CREATED)
+
+    @action(
+        detail=True,
+        methods=["post"],
+        permission_classes=[IsAuthenticated, IsHost],
+        url_path="photos/finalize",
+    )
+    def finalize_photo_upload(self, request, pk=None):
+        """Register a photo uploaded with a ticket; it is checked and resized async"""
+        property_obj = self.get_object()
+        if property_obj.host != request.user:
+            return Response(
+                {"error": "You don't have permission to upload photos for this property."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        serializer = PhotoFinalizeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            name = claim_upload(
+                data["token"], request.user, f"property-photo:{property_obj.pk}"
+            )
+        except UploadTicketError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        if PropertyPhoto.objects.filter(image=name).exists():
+            return Response(
+                {"error": "This upload has already been registered."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        photo = PropertyPhoto.objects.create(
+            property=property_obj,
+            image=name,
+            is_primary=data["is_primary"],
+            order=data["order"] if "order" in data else next_photo_order(property_obj),
+        )
+        return Response(
+            PropertyPhotoSerializer(photo).data, status=status.HTTP_201_CREATED
+        )
+
+    @action(
+        detail=True,
+        methods=["post"],
+        permission_classes=[IsAuthenticated, IsHost],
+        url_path="photos/batch",
+        parser_classes=[MultiPartParser, FormParser],
+    )
+    def upload_photo_batch(self, request, pk=None):
+        """Upload several photos in one multipart request (repeat ``images``)"""
+        property_obj = self.get_object()
+        if property_obj.host != request.user:
+            return Response(
+                {"error": "You don't have permission to upload photos for this property."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        serializer = PropertyPhotoBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        photos = save_photo_batch(
+            property_obj,
+            serializer.validated_data["images"],
+            primary=serializer.validated_data.get("primary"),
+        )
+        return Response(
+            PropertyPhotoSerializer(photos, many=True).data,
+            status=status.HTTP_201_CREATED,
+        )
+
 
 class PropertyPhotoViewSet(viewsets.ModelViewSet):
     """ViewSet for property photos"""
@@ -141,6 +539,33 @@ class AvailabilityViewSet(viewsets.ModelViewSet):
             )
         serializer.save(property=property_obj)
 
+    def upsert_range(self, request, property_pk=None):
+        """Set availability and price for every day in a date range"""
+        property_obj = get_object_or_404(Property, id=property_pk)
+        if property_obj.host != request.user:
+            return Response(
+                {"error": "You don't have permission to manage availability for this property."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        serializer = AvailabilityRangeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        count = upsert_availability(
+            property_obj.id,
+            data["runs"],
+            data["is_available"],
+            price_override=data.get("price_override"),
+            set_price="price_override" in data,
+        )
+        return Response(
+            {
+                "count": count,
+                "start_date": data["runs"][0][0],
+                "end_date": data["runs"][-1][1],
+            }
+        )
+
 
 class BlockedDateViewSet(viewsets.ModelViewSet):
     """ViewSet for blocked dates"""
@@ -161,3 +586,27 @@ class BlockedDateViewSet(viewsets.ModelViewSet):
                 "You don't have permission to block dates for this property."
             )
         serializer.save(property=property_obj)
+
+
+class CalendarFeedViewSet(viewsets.ModelViewSet):
+    """ViewSet for iCal feeds synced into a property's blocked dates"""
+
+    queryset = CalendarFeed.objects.all()
+    serializer_class = CalendarFeedSerializer
+    permission_classes = [IsAuthenticated, IsHost]
+
+    def get_queryset(self):
+        # Feed URLs often embed a secret, so only the owner sees them
+        property_id = self.kwargs.get("property_pk")
+        return CalendarFeed.objects.filter(
+            property_id=property_id, property__host=self.request.user
+        )
+
+    def perform_create(self, serializer):
+        property_id = self.kwargs.get("property_pk")
+        property_obj = get_object_or_404(Property, id=property_id)
+        if property_obj.host != self.request.user:
+            raise PermissionDenied(
+                "You don't have permission to manage calendar feeds for this property."
+            )
+        serializer.save(property=property_obj)
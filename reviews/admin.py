@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Review
+from .models import Review, rebuild_property_ratings
 
 
 @admin.register(Review)
@@ -42,7 +42,9 @@ class ReviewAdmin(admin.ModelAdmin):
 
     def approve_reviews(self, request, queryset):
         """Approve selected reviews"""
+        property_ids = set(queryset.values_list("property_id", flat=True))
         updated = queryset.update(is_visible=True, is_moderated=True)
+        rebuild_property_ratings(property_ids)
         self.message_user(
             request,
             f"{updated} review(s) approved and made visible.",
@@ -51,7 +53,9 @@ class ReviewAdmin(admin.ModelAdmin):
 
     def hide_reviews(self, request, queryset):
         """Hide selected reviews"""
+        property_ids = set(queryset.values_list("property_id", flat=True))
         updated = queryset.update(is_visible=False)
+        rebuild_property_ratings(property_ids)
         self.message_user(
             request,
             f"{updated} review(s) hidden.",
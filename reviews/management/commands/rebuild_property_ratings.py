@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from reviews.models import rebuild_property_ratings
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored rating aggregates on every property"
+
+    def handle(self, *args, **options):
+        count = rebuild_property_ratings()
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt ratings for {count} property(ies).")
+        )
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:00
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+RATING_FIELDS = [
+    "rating",
+    "cleanliness",
+    "accuracy",
+    "communication",
+    "location",
+    "value",
+]
+
+
+def rebuild_property_ratings(apps, schema_editor):
+    Property = apps.get_model("properties", "Property")
+    Review = apps.get_model("reviews", "Review")
+
+    aggregates = {}
+    for name in RATING_FIELDS:
+        aggregates[f"{name}_sum"] = Sum(name)
+        aggregates[f"{name}_count"] = Count(name)
+
+    rows = (
+        Review.objects.filter(review_type="guest_to_property", is_visible=True)
+        .values("property_id")
+        .annotate(**aggregates)
+        .order_by()
+    )
+    for row in rows:
+        property_id = row.pop("property_id")
+        Property.objects.filter(pk=property_id).update(
+            **{name: value or 0 for name, value in row.items()}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reviews", "0001_initial"),
+        ("properties", "0007_property_rating_aggregates"),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_property_ratings, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, Sum
 from django.core.validators import MinValueValidator, MaxValueValidator
 from accounts.models import User
+from properties.cache import invalidate_property_cache
 from properties.models import Property
 from bookings.models import Booking
 
@@ -108,18 +110,112 @@ class Review(models.Model):
             self.reviewee = self.booking.guest
 
         self.full_clean()
-        super().save(*args, **kwargs)
-
+        with transaction.atomic():
+            # Swap this review's old contribution for the new one, so edits,
+            # hiding and moderation all keep the property's ratings exact
+            previous = None
+            if self.pk:
+                previous = (
+                    Review.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values(*RATING_SNAPSHOT_FIELDS)
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            if previous:
+                apply_rating_delta(
+                    previous["property_id"], _rating_values(previous), sign=-1
+                )
+            apply_rating_delta(
+                self.property_id, _rating_values(self.rating_snapshot()), sign=1
+            )
+
+    def delete(self, *args, **kwargs):
+        """Remove this review from the property's stored ratings"""
+        with transaction.atomic():
+            apply_rating_delta(
+                self.property_id, _rating_values(self.rating_snapshot()), sign=-1
+            )
+            return super().delete(*args, **kwargs)
+
+    def rating_snapshot(self):
+        """Fields that decide what this review adds to the property's ratings"""
+        return {name: getattr(self, name) for name in RATING_SNAPSHOT_FIELDS}
+
+
+# Category ratings stored as <category>_sum / <category>_count on Property
+RATING_CATEGORIES = ["cleanliness", "accuracy", "communication", "location", "value"]
+RATING_SNAPSHOT_FIELDS = [
+    "property_id",
+    "review_type",
+    "is_visible",
+    "rating",
+    *RATING_CATEGORIES,
+]
+
+
+def _rating_values(review):
+    """Ratings a review contributes to its property, or {} if it doesn't count"""
+    if (
+        review["review_type"] != Review.ReviewType.GUEST_TO_PROPERTY
+        or not review["is_visible"]
+    ):
+        return {}
+    values = {"rating": review["rating"]}
+    for category in RATING_CATEGORIES:
+        if review[category] is not None:
+            values[category] = review[category]
+    return values
+
+
+def apply_rating_delta(property_id, values, sign):
+    """Add (sign=1) or remove (sign=-1) ratings with one atomic UPDATE"""
+    if not values:
+        return
+    updates = {}
+    for name, value in values.items():
+        updates[f"{name}_sum"] = F(f"{name}_sum") + sign * value
+        updates[f"{name}_count"] = F(f"{name}_count") + sign
+    Property.objects.filter(pk=property_id).update(**updates)
+    invalidate_property_cache(property_id)
+
+
+def rebuild_property_ratings(property_ids=None):
+    """Recompute stored ratings from visible guest reviews.
+
+    Used after bulk moderation, which bypasses Review.save, and by the
+    rebuild_property_ratings management command.
+    """
+    aggregates = {"rating_sum": Sum("rating"), "rating_count": Count("rating")}
+    for category in RATING_CATEGORIES:
+        aggregates[f"{category}_sum"] = Sum(category)
+        aggregates[f"{category}_count"] = Count(category)
 
-def calculate_average_rating(property_obj):
-    """Calculate average rating for a property"""
     reviews = Review.objects.filter(
-        property=property_obj,
-        review_type=Review.ReviewType.GUEST_TO_PROPERTY,
-        is_visible=True,
+        review_type=Review.ReviewType.GUEST_TO_PROPERTY, is_visible=True
     )
-    if not reviews.exists():
-        return None
+    properties = Property.objects.all()
+    if property_ids is not None:
+        reviews = reviews.filter(property_id__in=property_ids)
+        properties = properties.filter(id__in=property_ids)
+
+    stats = {
+        row.pop("property_id"): row
+        for row in reviews.values("property_id").annotate(**aggregates).order_by()
+    }
+    empty = {name: 0 for name in aggregates}
+    count = 0
+    for property_id in properties.values_list("id", flat=True).iterator():
+        values = {
+            name: value or 0 for name, value in stats.get(property_id, empty).items()
+        }
+        Property.objects.filter(pk=property_id).update(**values)
+        invalidate_property_cache(property_id)
+        count += 1
+    return count
+
 
-    total_rating = sum(review.rating for review in reviews)
-    return round(total_rating / reviews.count(), 2)
+def calculate_average_rating(property_obj):
+    """Calculate average rating for a property"""
+    property_obj.refresh_from_db(fields=["rating_sum", "rating_count"])
+    return property_obj.average_rating
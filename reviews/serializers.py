@@ -1,11 +1,12 @@
 from rest_framework import serializers
+from config.serializers import ExpandableFieldsMixin
 from accounts.serializers import UserPublicSerializer
 from properties.serializers import PropertyListSerializer
 from bookings.serializers import BookingSerializer
 from .models import Review
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     """Serializer for review list/detail"""
 
     reviewer = UserPublicSerializer(read_only=True)
@@ -1,3 +1,105 @@
 from django.test import TestCase
+from django.contrib.auth import get_user_model
+from datetime import date, timedelta
+from bookings.models import Booking
+from properties.models import Property
+from properties.serializers import PropertyListSerializer
+from .models import Review, rebuild_property_ratings
 
-# Create your tests here.
+User = get_user_model()
+
+
+class PropertyRatingAggregateTest(TestCase):
+    """Test the rating aggregates stored on Property"""
+
+    def setUp(self):
+        self.host = User.objects.create_user(
+            username="host",
+            email="host@example.com",
+            password="testpass123",
+            role=User.Role.HOST,
+        )
+        self.property = Property.objects.create(
+            title="Test Property",
+            description="Test Description",
+            property_type=Property.PropertyType.APARTMENT,
+            host=self.host,
+            address="123 Test St",
+            city="Test City",
+            country="Test Country",
+            latitude=6.5244,
+            longitude=3.3792,
+            base_price=100.00,
+            max_guests=4,
+            bedrooms=2,
+            beds=2,
+            bathrooms=1.0,
+        )
+
+    def create_review(self, username, rating, **categories):
+        guest = User.objects.create_user(
+            username=username,
+            email=f"{username}@example.com",
+            password="testpass123",
+        )
+        booking = Booking.objects.create(
+            property_obj=self.property,
+            guest=guest,
+            check_in=date.today() - timedelta(days=10),
+            check_out=date.today() - timedelta(days=8),
+            guest_count=1,
+            status=Booking.BookingStatus.COMPLETED,
+            base_price=200,
+            total_price=200,
+        )
+        return Review.objects.create(
+            booking=booking,
+            reviewer=guest,
+            reviewee=self.host,
+            property=self.property,
+            review_type=Review.ReviewType.GUEST_TO_PROPERTY,
+            rating=rating,
+            **categories,
+        )
+
+    def test_reviews_update_stored_ratings(self):
+        """Creating, hiding and deleting reviews keeps the sums exact"""
+        first = self.create_review("guest1", 5, cleanliness=4)
+        second = self.create_review("guest2", 3)
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.rating_sum, 8)
+        self.assertEqual(self.property.rating_count, 2)
+        self.assertEqual(self.property.cleanliness_sum, 4)
+        self.assertEqual(self.property.cleanliness_count, 1)
+        self.assertEqual(self.property.average_rating, 4.0)
+
+        second.is_visible = False
+        second.save()
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.average_rating, 5.0)
+
+        first.delete()
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.rating_count, 0)
+        self.assertIsNone(self.property.average_rating)
+
+    def test_rebuild_matches_incremental_updates(self):
+        """The rebuild recomputes the same values from the reviews"""
+        self.create_review("guest1", 4, value=5)
+        self.create_review("guest2", 2, value=3)
+        Property.objects.filter(pk=self.property.pk).update(rating_sum=0, value_sum=0)
+        rebuild_property_ratings([self.property.pk])
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.rating_sum, 6)
+        self.assertEqual(self.property.value_sum, 8)
+
+    def test_list_serializer_reads_stored_ratings(self):
+        """PropertyListSerializer needs no extra rating queries"""
+        self.create_review("guest1", 4)
+        property_obj = Property.objects.select_related("host").get(pk=self.property.pk)
+        serializer = PropertyListSerializer()
+        with self.assertNumQueries(0):
+            average_rating = serializer.get_average_rating(property_obj)
+            review_count = serializer.get_review_count(property_obj)
+        self.assertEqual(average_rating, 4.0)
+        self.assertEqual(review_count, 1)
@@ -4,10 +4,22 @@ from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.db.models import Avg, Count
 from accounts.models import User
+from config.serializers import select_related_for
 from properties.models import Property
 from .models import Review
 from .serializers import ReviewSerializer, ReviewCreateSerializer
 
+# Relations rendered by ReviewSerializer
+REVIEW_RELATED = [
+    "reviewer",
+    "reviewee",
+    "property__host",
+    "property__primary_photo",
+    "booking__guest",
+    "booking__property_obj__host",
+    "booking__property_obj__primary_photo",
+]
+
 
 class ReviewViewSet(viewsets.ModelViewSet):
     """ViewSet for review operations"""
@@ -16,10 +28,10 @@ class ReviewViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Filter reviews based on visibility"""
-        queryset = Review.objects.filter(is_visible=True).select_related(
-            "reviewer", "reviewee", "property", "booking"
+        queryset = Review.objects.filter(is_visible=True)
+        return select_related_for(
+            queryset, ReviewSerializer, self.request, *REVIEW_RELATED
         )
-        return queryset
 
     def get_serializer_class(self):
         if self.action == "create":
@@ -49,11 +61,14 @@ class PropertyReviewsView(generics.ListAPIView):
         property_id = self.kwargs.get("property_id")
         if not property_id:
             return Review.objects.none()
-        return Review.objects.filter(
+        queryset = Review.objects.filter(
             property_id=property_id,
             review_type=Review.ReviewType.GUEST_TO_PROPERTY,
             is_visible=True,
-        ).select_related("reviewer", "property")
+        )
+        return select_related_for(
+            queryset, ReviewSerializer, self.request, *REVIEW_RELATED
+        )
 
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
@@ -100,6 +115,7 @@ class UserReviewsView(generics.ListAPIView):
         user_id = self.kwargs.get("user_id")
         if not user_id:
             return Review.objects.none()
-        return Review.objects.filter(
-            reviewee_id=user_id, is_visible=True
-        ).select_related("reviewer", "reviewee", "property")
+        queryset = Review.objects.filter(reviewee_id=user_id, is_visible=True)
+        return select_related_for(
+            queryset, ReviewSerializer, self.request, *REVIEW_RELATED
+        )
@@ -13,6 +13,12 @@ from .serializers import (
     WishlistItemSerializer,
 )
 
+# Nested PropertyListSerializer reads host and primary_photo for every item
+WISHLIST_PREFETCH = [
+    "items__property__host",
+    "items__property__primary_photo",
+]
+
 
 class WishlistViewSet(viewsets.ModelViewSet):
     """ViewSet for wishlist operations"""
@@ -28,8 +34,8 @@ class WishlistViewSet(viewsets.ModelViewSet):
             # Users see their own wishlists and public wishlists
             return Wishlist.objects.filter(
                 models.Q(user=user) | models.Q(is_public=True)
-            ).prefetch_related("items__property").distinct()
-        return Wishlist.objects.filter(user=user).prefetch_related("items__property")
+            ).prefetch_related(*WISHLIST_PREFETCH).distinct()
+        return Wishlist.objects.filter(user=user).prefetch_related(*WISHLIST_PREFETCH)
 
     def get_serializer_class(self):
         if self.action == "create":